@@ -0,0 +1,80 @@
+"""Benchmark for the result cache of ContactsDB.
+
+Runs a dashboard like workload, the same few city and age queries over and over
+with a write every write_every lookups, with and without the result cache.
+
+Usage:
+    python -m benchmarks.cache_bench --rows 100000 --lookups 2000 --write_every 100
+
+Author: Shobhit Khinvasara
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import CITIES, create_contacts_db
+
+QUERIES = [
+    ([["city", "is", city]], ["name", "phone_number"]) for city in CITIES[:3]
+] + [([["age", "greater_than", 80]], ["name", "email"])]
+
+
+def time_lookups(contacts_db, lookups, write_every):
+    """Time the workload on a database.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        lookups (int): Number of finds.
+        write_every (int): Number of finds between writes. 0 for no writes.
+
+    Returns:
+        float: Seconds.
+    """
+    start = time.perf_counter()
+    for index in range(lookups):
+        if write_every and index % write_every == 0:
+            contacts_db.update("Contacts", 1, {"age": 18 + index % 70})
+
+        filters, fields = QUERIES[index % len(QUERIES)]
+        contacts_db.find("Contacts", filters, fields)
+
+    return time.perf_counter() - start
+
+
+def run(rows, lookups, write_every):
+    """Run the benchmark and print lookups per second with and without the cache.
+
+    Args:
+        rows (int): Number of rows in the table.
+        lookups (int): Number of finds per run.
+        write_every (int): Number of finds between writes.
+    """
+    contacts_db = create_contacts_db(":memory:", "Contacts", rows)
+    uncached_time = time_lookups(contacts_db, lookups, write_every)
+    contacts_db.set_result_cache({"max_bytes": 256 * 1024 * 1024})
+    cached_time = time_lookups(contacts_db, lookups, write_every)
+    stats = contacts_db.result_cache_stats()
+    contacts_db.close_conn()
+
+    print("rows: {0}, lookups: {1}, write every: {2}".format(rows, lookups, write_every))
+    print("uncached: {0:>10.0f} lookups/s".format(lookups / uncached_time))
+    print("cached:   {0:>10.0f} lookups/s".format(lookups / cached_time))
+    print("speedup:  {0:>10.2f}x".format(uncached_time / cached_time))
+    print("hit rate: {0:>10.2f}".format(stats["hit_rate"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", help="Number of rows in the table.", type=int, default=100000
+    )
+    parser.add_argument(
+        "--lookups", help="Number of finds to time.", type=int, default=2000
+    )
+    parser.add_argument(
+        "--write_every",
+        help="Number of finds between writes, 0 for no writes.",
+        type=int,
+        default=100,
+    )
+    args = parser.parse_args()
+    run(args.rows, args.lookups, args.write_every)
@@ -0,0 +1,88 @@
+"""Benchmark for repeated ContactsDB.find lookups.
+
+Compares the parameterized, memoized filter compiler against building a new SQL
+string with the filter values spliced in for every lookup (the previous approach).
+
+Usage:
+    python -m benchmarks.find_bench --rows 100000 --lookups 20000
+
+Author: Shobhit Khinvasara
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import create_contacts_db
+
+
+def literal_find(contacts_db, table_name, filters, fields):
+    """Find records by building a literal SQL string, like find used to.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        table_name (string): Table Name.
+        filters (list): List of [field, "equals", int] or [field, "is", str] filters.
+        fields (list): List of fields.
+
+    Returns:
+        list: List of dicts for every record found.
+    """
+    all_fields = contacts_db.get_table_fields(table_name)
+    fltr_list = []
+    for fltr in filters:
+        if isinstance(fltr[2], str) and all_fields[fltr[0]] == "TEXT":
+            fltr_list.append(fltr[0] + "='" + fltr[2] + "'")
+        else:
+            fltr_list.append(fltr[0] + "=" + str(fltr[2]))
+
+    sql_command = "SELECT {0} FROM {1} WHERE {2};".format(
+        ", ".join(fields), table_name, " AND ".join(fltr_list)
+    )
+    return_data = []
+    for row in contacts_db.conn.execute(sql_command):
+        data_dict = {}
+        for index in range(len(fields)):
+            data_dict[fields[index]] = row[index]
+
+        return_data.append(data_dict)
+
+    return return_data
+
+
+def run(rows, lookups):
+    """Run the benchmark and print lookups per second for both paths.
+
+    Args:
+        rows (int): Number of rows in the table.
+        lookups (int): Number of lookups per path.
+    """
+    contacts_db = create_contacts_db(":memory:", "Contacts", rows)
+    fields = ["id", "name", "phone_number"]
+    ids = [(i * 7919) % rows + 1 for i in range(lookups)]
+
+    start = time.perf_counter()
+    for _id in ids:
+        literal_find(contacts_db, "Contacts", [["id", "equals", _id]], fields)
+    literal_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _id in ids:
+        contacts_db.find("Contacts", [["id", "equals", _id]], fields)
+    compiled_time = time.perf_counter() - start
+
+    contacts_db.close_conn()
+    print("rows: {0}, lookups: {1}".format(rows, lookups))
+    print("literal SQL:   {0:>10.0f} lookups/s".format(lookups / literal_time))
+    print("compiled find: {0:>10.0f} lookups/s".format(lookups / compiled_time))
+    print("speedup:       {0:>10.2f}x".format(literal_time / compiled_time))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", help="Number of rows in the table.", type=int, default=100000
+    )
+    parser.add_argument(
+        "--lookups", help="Number of lookups to time.", type=int, default=20000
+    )
+    args = parser.parse_args()
+    run(args.rows, args.lookups)
@@ -0,0 +1,87 @@
+"""Benchmark for contains filters answered by LIKE scans versus full-text search.
+
+Usage:
+    python -m benchmarks.fulltext_bench --rows 1000000 --tokenizer unicode61
+
+Author: Shobhit Khinvasara
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import create_contacts_db
+
+SEARCHES = [
+    [["name", "contains", "Patel 12"]],
+    [["name", "contains", "Novak"]],
+    [["address", "contains", "Maple"]],
+    [["phone_number", "contains", "236"]],
+    [["email", "contains", "riya.singh99"]],
+]
+
+
+def time_searches(contacts_db, repeat):
+    """Time the searches.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        repeat (int): Number of times every search is run.
+
+    Returns:
+        tuple: (seconds per search, list of result counts)
+    """
+    counts = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        counts = [len(contacts_db.find("Contacts", f, ["id"])) for f in SEARCHES]
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(SEARCHES)), counts
+
+
+def run(rows, repeat, tokenizer):
+    """Run the benchmark and print the time per search for both paths.
+
+    Args:
+        rows (int): Number of rows in the table.
+        repeat (int): Number of times every search is run.
+        tokenizer (string): Tokenizer of the full-text index.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "contacts.db")
+        contacts_db = create_contacts_db(db_path, "Contacts", rows)
+
+        like_time, like_counts = time_searches(contacts_db, repeat)
+
+        start = time.perf_counter()
+        contacts_db.enable_fulltext("Contacts", tokenizer=tokenizer)
+        build_time = time.perf_counter() - start
+
+        fts_time, fts_counts = time_searches(contacts_db, repeat)
+        contacts_db.close_conn()
+
+    print("rows: {0}, tokenizer: {1}".format(rows, tokenizer))
+    print("full-text index build: {0:>10.2f} s".format(build_time))
+    print("LIKE scan:             {0:>10.2f} ms/search".format(like_time * 1000))
+    print("full-text MATCH:       {0:>10.2f} ms/search".format(fts_time * 1000))
+    print("speedup:               {0:>10.2f}x".format(like_time / fts_time))
+    print("matches (LIKE):        {0}".format(like_counts))
+    print("matches (full-text):   {0}".format(fts_counts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", help="Number of rows in the table.", type=int, default=1000000
+    )
+    parser.add_argument(
+        "--repeat", help="Number of times every search is run.", type=int, default=3
+    )
+    parser.add_argument(
+        "--tokenizer",
+        help='Tokenizer of the full-text index: "unicode61" or "trigram".',
+        type=str,
+        default="unicode61",
+    )
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.tokenizer)
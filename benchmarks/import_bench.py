@@ -0,0 +1,115 @@
+"""Benchmark for importing a large CSV file.
+
+Compares ContactsDB.import_csv, which parses and inserts in one process, against
+the parallel import pipeline, which parses byte ranges of the file in worker
+processes while the calling process inserts.
+
+Usage:
+    python -m benchmarks.import_bench --rows 1000000 --workers 4
+
+Author: Shobhit Khinvasara
+"""
+import os
+import csv
+import time
+import argparse
+import tempfile
+
+from benchmarks.synthetic import contact_fields, generate_contacts
+from include.contacts_db import ContactsDB
+from include.contacts_import import parallel_import
+
+
+def write_csv(path, rows, width):
+    """Write a CSV file of synthetic contacts.
+
+    Args:
+        path (string): Path to the CSV file.
+        rows (int): Number of records.
+        width (int): Number of fields per record.
+    """
+    fields = list(contact_fields(width).keys())
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(fields)
+        for record in generate_contacts(rows, width):
+            writer.writerow([record[field] for field in fields])
+
+
+def time_import(temp_dir, name, width, load):
+    """Time loading the CSV file into a new database.
+
+    Args:
+        temp_dir (string): Directory of the databases.
+        name (string): Name of the database file.
+        width (int): Number of fields per record.
+        load (function): Function called with the ContactsDB, returns (inserted, rejected).
+
+    Returns:
+        tuple: (seconds, inserted)
+    """
+    contacts_db = ContactsDB(os.path.join(temp_dir, name), profile="bulk-load")
+    contacts_db.create_table("Contacts", contact_fields(width))
+    start = time.perf_counter()
+    inserted, _ = load(contacts_db)
+    elapsed = time.perf_counter() - start
+    contacts_db.close_conn()
+    return elapsed, inserted
+
+
+def run(rows, width, workers, batch_size):
+    """Run the benchmark and print rows per second for both paths.
+
+    Args:
+        rows (int): Number of rows in the file.
+        width (int): Number of fields per record.
+        workers (int): Number of worker processes of the pipeline.
+        batch_size (int): Number of rows committed per transaction.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = os.path.join(temp_dir, "contacts.csv")
+        write_csv(csv_path, rows, width)
+
+        single_time, single_rows = time_import(
+            temp_dir,
+            "single.db",
+            width,
+            lambda contacts_db: contacts_db.import_csv("Contacts", csv_path, batch_size),
+        )
+        parallel_time, parallel_rows = time_import(
+            temp_dir,
+            "parallel.db",
+            width,
+            lambda contacts_db: parallel_import(
+                contacts_db, "Contacts", csv_path, workers=workers, batch_size=batch_size
+            ),
+        )
+
+    print("rows: {0}, width: {1}, workers: {2}".format(rows, width, workers))
+    print("single process: {0:>10.0f} rows/s".format(single_rows / single_time))
+    print("parallel:       {0:>10.0f} rows/s".format(parallel_rows / parallel_time))
+    print("speedup:        {0:>10.2f}x".format(single_time / parallel_time))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", help="Number of rows in the file.", type=int, default=1000000
+    )
+    parser.add_argument(
+        "--width", help="Number of fields per record.", type=int, default=6
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes.",
+        type=int,
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--batch_size",
+        help="Number of rows committed per transaction.",
+        type=int,
+        default=10000,
+    )
+    args = parser.parse_args()
+    run(args.rows, args.width, args.workers, args.batch_size)
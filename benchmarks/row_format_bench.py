@@ -0,0 +1,76 @@
+"""Benchmark for the row formats of ContactsDB.find.
+
+Times find over the whole table for every row format, and measures the memory the
+returned records take with tracemalloc in a separate run, since tracing slows the
+allocations down.
+
+Usage:
+    python -m benchmarks.row_format_bench --rows 1000000
+
+Author: Shobhit Khinvasara
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.synthetic import create_contacts_db
+from include.contacts_db import ROW_FORMATS
+
+
+def measure(contacts_db, row_format):
+    """Time find for a row format and measure the memory of its records.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        row_format (str): Row format, see ROW_FORMATS.
+
+    Returns:
+        tuple: (seconds, bytes) for finding all records.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    records = contacts_db.find("Contacts", row_format=row_format)
+    elapsed = time.perf_counter() - start
+    del records
+
+    gc.collect()
+    tracemalloc.start()
+    records = contacts_db.find("Contacts", row_format=row_format)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return elapsed, size
+
+
+def run(rows, width):
+    """Run the benchmark and print time and memory for every row format.
+
+    Args:
+        rows (int): Number of rows in the table.
+        width (int): Number of fields per record.
+    """
+    contacts_db = create_contacts_db(":memory:", "Contacts", rows, width)
+    print("rows: {0}, width: {1}".format(rows, width))
+    print("{0:<8} {1:>10} {2:>12} {3:>12}".format("format", "seconds", "MB", "rows/s"))
+    for row_format in ROW_FORMATS:
+        elapsed, size = measure(contacts_db, row_format)
+        print(
+            "{0:<8} {1:>10.3f} {2:>12.1f} {3:>12.0f}".format(
+                row_format, elapsed, size / 1024 / 1024, rows / elapsed
+            )
+        )
+
+    contacts_db.close_conn()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", help="Number of rows in the table.", type=int, default=1000000
+    )
+    parser.add_argument(
+        "--width", help="Number of fields per record.", type=int, default=6
+    )
+    args = parser.parse_args()
+    run(args.rows, args.width)
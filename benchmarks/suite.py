@@ -0,0 +1,302 @@
+"""Benchmark suite for ContactsDB operations with baseline comparison.
+
+Times add, find with every filter condition, update, delete, list_data and the
+tabular renderer on synthetic tables of every size and width, in memory and in a
+database file. Results are written as JSON, and compared against a saved baseline
+where every benchmark slower than the threshold is flagged as a regression.
+
+Usage:
+    python -m benchmarks.suite --sizes 10000,100000 --output results.json
+    python -m benchmarks.suite --sizes 10000,100000 --baseline results.json --threshold 0.2
+
+Exits with status 1 if a regression was found.
+
+Author: Shobhit Khinvasara
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import sqlite3
+import tempfile
+import contextlib
+import statistics
+
+from benchmarks.synthetic import generate_contacts, populate
+from contacts_cl import ContactsCL
+from include.contacts_db import INTEGER_CONDITIONS, STRING_CONDITIONS
+
+STORAGES = ("memory", "file")
+
+
+def time_runs(function, repeat):
+    """Time a function.
+
+    Args:
+        function (function): Function to time, called without arguments.
+        repeat (int): Number of runs.
+
+    Returns:
+        dict: Dictionary with the median "ms" and "min_ms" of a run and "runs".
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "ms": round(statistics.median(times), 4),
+        "min_ms": round(min(times), 4),
+        "runs": repeat,
+    }
+
+
+def run_case(contacts_cl, rows, width, repeat, ops):
+    """Run all benchmarks on one populated table.
+
+    Args:
+        contacts_cl (ContactsCL): Command line instance of the database.
+        rows (int): Number of rows in the table.
+        width (int): Number of fields per record.
+        repeat (int): Number of runs per benchmark.
+        ops (int): Number of add, update and delete calls per run.
+
+    Returns:
+        dict: {benchmark: timing} where add, update and delete are timed per call.
+    """
+    contacts_db = contacts_cl.contacts_db
+    sample = next(generate_contacts(1, width, seed=rows))
+    results = {}
+
+    searches = {}
+    for condition in STRING_CONDITIONS:
+        value = sample["name"] if condition.startswith("is") else sample["name"][:5]
+        searches[condition] = [["name", condition, value]]
+
+    if "age" in sample:
+        for condition in INTEGER_CONDITIONS:
+            searches[condition] = [["age", condition, 50]]
+
+    for condition, filters in searches.items():
+        results["find_" + condition] = time_runs(
+            lambda: contacts_db.find("Contacts", filters, ["id", "name"]), repeat
+        )
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["list_data"] = time_runs(
+            lambda: contacts_cl.list_data("Contacts", "tabular"), repeat
+        )
+        records = contacts_db.find("Contacts", limit=10000)
+        results["render_tabular"] = time_runs(
+            lambda: contacts_cl._display_tabular_dict(records), repeat
+        )
+
+    # writes run last, every run changes ops different records.
+    ids = iter(range(1, rows + 1))
+    new_records = generate_contacts(ops * repeat, width, seed=rows + 1)
+
+    def add():
+        for _ in range(ops):
+            contacts_db.add("Contacts", next(new_records))
+
+    def update():
+        for _ in range(ops):
+            contacts_db.update("Contacts", next(ids), {"name": "Updated"})
+
+    def delete():
+        for _ in range(ops):
+            contacts_db.delete("Contacts", next(ids))
+
+    for name, function in (("add", add), ("update", update), ("delete", delete)):
+        timing = time_runs(function, repeat)
+        timing["ms"] = round(timing["ms"] / ops, 4)
+        timing["min_ms"] = round(timing["min_ms"] / ops, 4)
+        results[name] = timing
+
+    return results
+
+
+def run(sizes, widths, storages, repeat, ops, profile=None):
+    """Run the suite.
+
+    Args:
+        sizes (list): Numbers of rows.
+        widths (list): Numbers of fields per record.
+        storages (list): "memory" and/or "file".
+        repeat (int): Number of runs per benchmark.
+        ops (int): Number of add, update and delete calls per run.
+        profile (str, optional): Connection tuning profile of the databases.
+
+    Returns:
+        dict: {"meta": {..}, "results": {"<storage>/<rows>x<width>/<benchmark>": timing}}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for storage in storages:
+            for rows in sizes:
+                for width in widths:
+                    db_path = ":memory:"
+                    if storage == "file":
+                        db_path = os.path.join(
+                            temp_dir, "{0}x{1}.db".format(rows, width)
+                        )
+
+                    contacts_cl = ContactsCL(db_path, profile=profile, use_daemon=False)
+                    populate(contacts_cl.contacts_db, "Contacts", rows, width)
+                    case = "{0}/{1}x{2}".format(storage, rows, width)
+                    print("Running", case, file=sys.stderr)
+                    for name, timing in run_case(
+                        contacts_cl, rows, width, repeat, ops
+                    ).items():
+                        results[case + "/" + name] = timing
+
+                    contacts_cl.close()
+
+    meta = {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "widths": widths,
+        "storages": storages,
+        "repeat": repeat,
+        "ops": ops,
+        "profile": profile,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results, baseline, threshold):
+    """Compare results against a baseline.
+
+    Only benchmarks in both are compared.
+
+    Args:
+        results (dict): Results of run.
+        baseline (dict): Results of an earlier run.
+        threshold (float): Allowed slowdown, 0.2 flags benchmarks more than 20% slower.
+
+    Returns:
+        list: List of dicts with "benchmark", "baseline_ms", "ms", "change" and
+            "regression" for every benchmark compared.
+    """
+    comparison = []
+    for name, timing in sorted(results["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+
+        change = timing["ms"] / base["ms"] - 1 if base["ms"] else 0.0
+        comparison.append(
+            {
+                "benchmark": name,
+                "baseline_ms": base["ms"],
+                "ms": timing["ms"],
+                "change": round(change, 4),
+                "regression": change > threshold,
+            }
+        )
+
+    return comparison
+
+
+def print_results(results, comparison=None):
+    """Print the results, with the change against the baseline if compared.
+
+    Args:
+        results (dict): Results of run.
+        comparison (list, optional): Comparison from compare.
+    """
+    changes = dict((row["benchmark"], row) for row in comparison or [])
+    print("{0:<48} {1:>12} {2:>12} {3:>9}".format("benchmark", "ms", "baseline", "change"))
+    for name, timing in sorted(results["results"].items()):
+        row = changes.get(name)
+        if row is None:
+            print("{0:<48} {1:>12.4f}".format(name, timing["ms"]))
+            continue
+
+        print(
+            "{0:<48} {1:>12.4f} {2:>12.4f} {3:>+8.1f}%{4}".format(
+                name,
+                timing["ms"],
+                row["baseline_ms"],
+                row["change"] * 100,
+                "  REGRESSION" if row["regression"] else "",
+            )
+        )
+
+
+def parse_int_list(value):
+    """Parse a comma separated list of integers, like "10000,100000"."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        help="Comma separated numbers of rows, like 10000,100000,1000000.",
+        type=parse_int_list,
+        default=[10000],
+    )
+    parser.add_argument(
+        "--widths",
+        help="Comma separated numbers of fields per record.",
+        type=parse_int_list,
+        default=[6],
+    )
+    parser.add_argument(
+        "--storage",
+        help="Databases to run on.",
+        choices=STORAGES + ("both",),
+        default="both",
+    )
+    parser.add_argument(
+        "--repeat", help="Number of runs per benchmark.", type=int, default=5
+    )
+    parser.add_argument(
+        "--ops",
+        help="Number of add, update and delete calls per run.",
+        type=int,
+        default=100,
+    )
+    parser.add_argument(
+        "--profile", help="Connection tuning profile of the databases.", type=str
+    )
+    parser.add_argument("--output", help="Path of the JSON results.", type=str)
+    parser.add_argument(
+        "--baseline", help="Path of saved JSON results to compare against.", type=str
+    )
+    parser.add_argument(
+        "--threshold",
+        help="Allowed slowdown against the baseline, 0.2 for 20%%.",
+        type=float,
+        default=0.2,
+    )
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        if size < args.ops * args.repeat * 2:
+            parser.error("Every size needs at least 2 * ops * repeat rows to update and delete.")
+
+    storages = list(STORAGES) if args.storage == "both" else [args.storage]
+    results = run(args.sizes, args.widths, storages, args.repeat, args.ops, args.profile)
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            comparison = compare(results, json.load(baseline_file), args.threshold)
+
+    print_results(results, comparison)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if comparison and any(row["regression"] for row in comparison):
+        print(
+            sum(row["regression"] for row in comparison), "regressions found.", file=sys.stderr
+        )
+        sys.exit(1)
@@ -0,0 +1,104 @@
+"""Synthetic Contacts Data Generator for Benchmarks.
+
+Author: Shobhit Khinvasara
+"""
+import random
+
+from include.contacts_db import ContactsDB
+
+CITIES = ["Vancouver", "Toronto", "Montreal", "Calgary", "Ottawa", "Pune", "Mumbai"]
+STREETS = ["Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St"]
+FIRST_NAMES = ["Joy", "Sam", "Alex", "Riya", "Omar", "Lena", "Ken", "Maya", "Ivan"]
+LAST_NAMES = ["Smith", "Khan", "Patel", "Brown", "Chen", "Garcia", "Novak", "Singh"]
+
+# Base contact schema. Wider tables get extra "note_<n>" text fields.
+CONTACT_FIELDS = {
+    "name": "text",
+    "email": "text",
+    "phone_number": "text",
+    "address": "text",
+    "city": "text",
+    "age": "integer",
+}
+
+
+def contact_fields(width=len(CONTACT_FIELDS)):
+    """Get the table fields for a synthetic contacts table.
+
+    Args:
+        width (int, optional): Number of fields excluding id.
+
+    Returns:
+        dict: Dictionary where key is the field name and value is field type.
+    """
+    fields = dict(list(CONTACT_FIELDS.items())[:width])
+    for index in range(len(fields), width):
+        fields["note_" + str(index)] = "text"
+
+    return fields
+
+
+def generate_contacts(count, width=len(CONTACT_FIELDS), seed=0):
+    """Generate synthetic contact records.
+
+    Args:
+        count (int): Number of records.
+        width (int, optional): Number of fields per record.
+        seed (int, optional): Random seed so runs are reproducible.
+
+    Yields:
+        dict: Contact record containing {field:value}
+    """
+    rand = random.Random(seed)
+    fields = contact_fields(width)
+    for index in range(count):
+        first = rand.choice(FIRST_NAMES)
+        last = rand.choice(LAST_NAMES)
+        values = {
+            "name": "{0} {1} {2}".format(first, last, index),
+            "email": "{0}.{1}{2}@example.com".format(first, last, index).lower(),
+            "phone_number": "{0}-{1:04d}".format(
+                rand.randint(200, 999), index % 10000
+            ),
+            "address": "{0} {1}".format(rand.randint(1, 9999), rand.choice(STREETS)),
+            "city": rand.choice(CITIES),
+            "age": rand.randint(18, 90),
+        }
+        record = {}
+        for key in fields:
+            record[key] = values.get(key, "note {0} for {1}".format(key, index))
+
+        yield record
+
+
+def create_contacts_db(
+    db_path, table_name, count, width=len(CONTACT_FIELDS), **kwargs
+):
+    """Create a database with a synthetic contacts table.
+
+    Args:
+        db_path (string): Path to Local SQLite Database or ":memory:".
+        table_name (string): Table Name.
+        count (int): Number of records.
+        width (int, optional): Number of fields per record.
+        **kwargs: Passed to ContactsDB.
+
+    Returns:
+        ContactsDB: Database with the populated table.
+    """
+    contacts_db = ContactsDB(db_path, **kwargs)
+    populate(contacts_db, table_name, count, width)
+    return contacts_db
+
+
+def populate(contacts_db, table_name, count, width=len(CONTACT_FIELDS)):
+    """Create a synthetic contacts table in an open database.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        table_name (string): Table Name.
+        count (int): Number of records.
+        width (int, optional): Number of fields per record.
+    """
+    contacts_db.create_table(table_name, contact_fields(width))
+    contacts_db.add_many(table_name, generate_contacts(count, width), batch_size=10000)
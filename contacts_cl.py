@@ -5,9 +5,124 @@ Author: Shobhit Khinvasara
 import os
 import re
 import sys
+import json
+import signal
 import argparse
-from pprint import pprint
-from include.contacts_db import ContactsDB
+import itertools
+import contextlib
+from pprint import pformat, pprint
+from include.contacts_daemon import ContactsDaemon, connect_daemon
+from include.contacts_import import parallel_import, parse_data_str, parse_value_str
+from include.contacts_render import RENDER_FORMATS, render
+from include.contacts_stats import HistogramSink, Instrumentation
+from include.contacts_db import PERFORMANCE_PROFILES, ContactsDB, DatabaseError
+from include.contacts_db import NORMALIZED_KEY_TYPES
+from include.contacts_db import IDError, InvalidFilterError, TableError, TypeMismatchError
+
+# errors of a single batch operation. They are reported and the batch goes on.
+BATCH_ERRORS = (
+    ValueError,
+    KeyError,
+    TypeError,
+    DatabaseError,
+    IDError,
+    InvalidFilterError,
+    TableError,
+    TypeMismatchError,
+)
+
+
+def parse_filter_str(filter_str):
+    """Parse a filter string of the <field_name_1>~<operator>~<value>|.. convention.
+
+    Filters joined by "|" all need to match. Filters can be grouped with
+    and(<filters>), or(<filters>) and not(<filters>), and values of in, not_in and
+    between are lists like [<value_1>,<value_2>,..].
+    Example: or(city~is~"X"|city~is~"Y")|age~between~[30,40]
+
+    Args:
+        filter_str (string): Filter string to parse.
+
+    Returns:
+        list: List of filters and filter groups. Example: [["name", "is", "ABC"]..]
+
+    Raises:
+        ValueError: If the filter string doesn't follow the convention.
+    """
+    filters = []
+    for f in split_filter_str(filter_str, "|"):
+        group = re.match(r"^(and|or|not)\((.*)\)$", f.strip(), re.DOTALL)
+        if group:
+            children = parse_filter_str(group.group(2))
+            if group.group(1) != "not":
+                filters.append({group.group(1): children})
+            elif len(children) == 1:
+                filters.append({"not": children[0]})
+            else:
+                filters.append({"not": {"and": children}})
+
+            continue
+
+        filter_parts = f.strip().split("~", 2)
+        if len(filter_parts) != 3:
+            raise ValueError("Invalid Filter!")
+
+        try:
+            value_str = filter_parts[2]
+            if value_str.startswith("[") and value_str.endswith("]"):
+                value = [
+                    parse_value_str(v.strip())
+                    for v in split_filter_str(value_str[1:-1], ",")
+                    if v.strip()
+                ]
+            else:
+                value = parse_value_str(value_str)
+        except ValueError:
+            raise ValueError("Invalid Filter!")
+
+        filters.append([filter_parts[0], filter_parts[1], value])
+
+    return filters
+
+
+def split_filter_str(filter_str, separator):
+    """Split a filter string at the separators outside of quotes, groups and lists.
+
+    Args:
+        filter_str (string): Filter string to split.
+        separator (string): Separator character.
+
+    Returns:
+        list: List of parts.
+
+    Raises:
+        ValueError: If quotes, parentheses or brackets aren't balanced.
+    """
+    parts = []
+    depth = 0
+    quoted = False
+    start = 0
+    for index, char in enumerate(filter_str):
+        if char == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Invalid Filter!")
+        elif char == separator and not depth:
+            parts.append(filter_str[start:index])
+            start = index + 1
+
+    if depth or quoted:
+        raise ValueError("Invalid Filter!")
+
+    parts.append(filter_str[start:])
+    return parts
+
 
 class ContactsCL(object):
 
@@ -15,13 +130,26 @@ class ContactsCL(object):
 
     Attributes:
         contacts_db (ContactsDB): Contacts Database Connection Object.
+        histogram (HistogramSink): Latencies of the database operations, None unless
+            enable_stats was called.
     """
 
-    def __init__(self):
-        """Initialization Function for Contacts Commandline Application Class."""
-        home_path = os.path.expanduser("~")
-        db_path = home_path + "/contacts_db/contacts.db"
-        self.contacts_db = ContactsDB(db_path)
+    def __init__(self, db_path=None, profile=None, use_daemon=True):
+        """Initialization Function for Contacts Commandline Application Class.
+
+        Args:
+            db_path (string, optional): Path to Local SQLite Database.
+                Defaults to ~/contacts_db/contacts.db
+            profile (str, optional): Connection tuning profile, see ContactsDB.set_profile.
+                The daemon uses its own profile.
+            use_daemon (bool, optional): Set this to False to open the database even
+                if a daemon is serving it.
+        """
+        db_path = get_db_path(db_path)
+        self.histogram = None
+        self.contacts_db = connect_daemon(db_path) if use_daemon else None
+        if self.contacts_db is None:
+            self.contacts_db = ContactsDB(db_path, profile=profile)
 
     def create_table(self, table_name):
         """Create Table in the database.
@@ -31,12 +159,10 @@ class ContactsCL(object):
         """
         if self.contacts_db.does_table_exist(table_name):
             print("Table Already Exists. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         if not re.match("^[a-zA-Z0-9_]+$", table_name):
             print("Invalid or Unsupported table name. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         print("\nPlease Enter the fields you need based on this convention:")
@@ -48,7 +174,6 @@ class ContactsCL(object):
             field = field.strip()
             if len(field.split("=>")) != 2:
                 print("Invalid Fields!")
-                self.contacts_db.close_conn()
                 return
 
             field_name, field_type = field.split("=>")
@@ -58,7 +183,6 @@ class ContactsCL(object):
         if result:
             print("Table:", table_name, "successfully created.")
 
-        self.contacts_db.close_conn()
         return
 
     def delete_table(self, table_name):
@@ -69,22 +193,175 @@ class ContactsCL(object):
         """
         if not self.contacts_db.does_table_exist(table_name):
             print("Table doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         result = self.contacts_db.delete_table(table_name)
         if result:
             print("Table:", table_name, "successfully removed.")
 
-        self.contacts_db.close_conn()
+        return
+
+    def create_index(self, table_name, unique=False, index_name=None):
+        """Create Index on fields of the Table.
+
+        Args:
+            table_name (string): Table Name.
+            unique (bool, optional): Set this to reject records with duplicate values.
+            index_name (string, optional): Index Name.
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        if index_name and not re.match("^[a-zA-Z0-9_]+$", index_name):
+            print("Invalid or Unsupported index name. Aborting..")
+            return
+
+        print("\nPlease Enter the fields to index based on this convention:")
+        print("<field_name_1>|<field_name_2>|..")
+        fields_str = input("Fields: ")
+        fields = [f.strip() for f in fields_str.split("|") if f.strip()]
+        result = self.contacts_db.create_index(table_name, fields, unique, index_name)
+        if result:
+            print("Index on", fields, "successfully created.")
+
+        return
+
+    def drop_index(self, index_name):
+        """Remove Index from the Database.
+
+        Args:
+            index_name (string): Index Name.
+        """
+        if index_name not in [i["name"] for i in self.contacts_db.list_indexes()]:
+            print("Index doesn't exist. Aborting..")
+            return
+
+        result = self.contacts_db.drop_index(index_name)
+        if result:
+            print("Index:", index_name, "successfully removed.")
+
+        return
+
+    def list_indexes(self, table_name=None):
+        """Display all Indexes in the Database or of the Table.
+
+        Args:
+            table_name (string, optional): Table Name.
+        """
+        result = self.contacts_db.list_indexes(table_name)
+        pprint(result)
+        return
+
+    def enable_fulltext(self, table_name, tokenizer="unicode61"):
+        """Enable full-text search for contains filters on Text fields of the Table.
+
+        Args:
+            table_name (string): Table Name.
+            tokenizer (string, optional): Supported values are "unicode61" and "trigram".
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        print("\nPlease Enter the Text fields to index based on this convention:")
+        print("<field_name_1>|<field_name_2>|.. Leave empty to index all Text fields.")
+        fields_str = input("Fields: ")
+        fields = [f.strip() for f in fields_str.split("|") if f.strip()]
+        result = self.contacts_db.enable_fulltext(table_name, fields, tokenizer)
+        if result:
+            print("Full-text search successfully enabled for", table_name)
+
+        return
+
+    def disable_fulltext(self, table_name):
+        """Disable full-text search for the Table.
+
+        Args:
+            table_name (string): Table Name.
+        """
+        if not self.contacts_db.get_fulltext(table_name):
+            print("Full-text search isn't enabled. Aborting..")
+            return
+
+        result = self.contacts_db.disable_fulltext(table_name)
+        if result:
+            print("Full-text search successfully disabled for", table_name)
+
+        return
+
+    def rebuild_fulltext(self, table_name):
+        """Rebuild the full-text index of the Table.
+
+        Args:
+            table_name (string): Table Name.
+        """
+        if not self.contacts_db.get_fulltext(table_name):
+            print("Full-text search isn't enabled. Aborting..")
+            return
+
+        result = self.contacts_db.rebuild_fulltext(table_name)
+        if result:
+            print("Full-text index successfully rebuilt for", table_name)
+
+        return
+
+    def enable_normalized_key(self, table_name, key_type):
+        """Index the normalized key of a Text field of the Table.
+
+        Args:
+            table_name (string): Table Name.
+            key_type (string): Supported values are "phone" and "email".
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        print("\nPlease Enter the Text field to normalize:")
+        field = input("Field: ").strip()
+        result = self.contacts_db.enable_normalized_key(table_name, field, key_type)
+        if result:
+            print("Normalized", key_type, "key successfully enabled for", field)
+
+        return
+
+    def disable_normalized_key(self, table_name):
+        """Remove the normalized key of a field of the Table.
+
+        Args:
+            table_name (string): Table Name.
+        """
+        keys = self.contacts_db.get_normalized_keys(table_name)
+        if not keys:
+            print("No normalized keys are enabled. Aborting..")
+            return
+
+        print("\nPlease Enter the normalized field based on this convention:")
+        print(" | ".join(field + " (" + key_type + ")" for field, key_type in keys.items()))
+        field = input("Field: ").strip()
+        if field not in keys:
+            print("Field isn't normalized. Aborting..")
+            return
+
+        result = self.contacts_db.disable_normalized_key(table_name, field)
+        if result:
+            print("Normalized key successfully disabled for", field)
+
         return
 
     def list_tables(self):
         """Display all Tables in the Database."""
         result = self.contacts_db.list_tables()
-        result = [r for r in result if r != "sqlite_sequence"]
+        # full-text tables and their shadow tables are internal to the database.
+        fulltext = [
+            r + "_fts" for r in result if self.contacts_db.get_fulltext(r) is not None
+        ]
+        result = [
+            r
+            for r in result
+            if r != "sqlite_sequence" and not r.startswith(tuple(fulltext))
+        ]
         print(result)
-        self.contacts_db.close_conn()
         return
 
     def display_table_schema(self, table_name):
@@ -95,12 +372,10 @@ class ContactsCL(object):
         """
         if not self.contacts_db.does_table_exist(table_name):
             print("Table doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         result = self.contacts_db.get_table_fields(table_name)
         pprint(result)
-        self.contacts_db.close_conn()
         return
 
     def add_data(self, table_name):
@@ -111,7 +386,6 @@ class ContactsCL(object):
         """
         if not self.contacts_db.does_table_exist(table_name):
             print("Table doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         print("\nPlease Enter the data you want to add based on this convention:")
@@ -122,77 +396,126 @@ class ContactsCL(object):
         data_str = input("Data: ")
         data = self._parse_data_str(data_str)
         if not data:
-            self.contacts_db.close_conn()
             return
 
         result = self.contacts_db.add(table_name, data)
         if result:
             print("Data successfully added.")
 
-        self.contacts_db.close_conn()
         return
 
-    def find_data(self, table_name, display_style="dict"):
+    def find_data(
+        self,
+        table_name,
+        display_style="dict",
+        limit=None,
+        page=None,
+        after=None,
+        order_by=None,
+        explain=False,
+    ):
         """Find Record in the Table.
 
         Args:
             table_name (string): Table Name.
             display_style (str, optional): Display Style.
                 Supported Values are "dict" and "tabular".
+            limit (int, optional): Number of records per page.
+            page (int, optional): Page number to display, starting at 1.
+            after (str, optional): Continuation token of the previous page.
+            order_by (list, optional): List of fields to sort by, "-" prefix for descending.
+            explain (bool, optional): Set this to display the query plan of the find
+                instead of the records.
         """
         if not self.contacts_db.does_table_exist(table_name):
             print("Table doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
-        print("\nPlease Enter the filter for your find based on this convention:")
-        print("<field_name_1>~<operator>~<value>|<field_name_2>~<operator>~<value>|..")
-        print("Valid Operators for Strings: is, is_not, contains, does_not_contain.")
-        print(
-            "Valid Operators for Integers: less_than, less_than_equal, greater_than, greater_than_equal, equals, not_equal."
+        filters = self._input_filters("find")
+        if filters is False:
+            return
+
+        print("\nPlease Enter the fields you want to display based on this convention:")
+        print("<field_name_1>|<field_name_2>|..")
+        fields_str = input("Fields: ")
+        fields = [f.strip() for f in fields_str.split("|") if f.strip()]
+        if explain:
+            self.display_explain(table_name, filters, fields, limit, order_by)
+            return
+
+        self._find_and_display(
+            table_name, filters, fields, display_style, limit, page, after, order_by
         )
-        print(
-            'Please enclose text value in ("). Integer value should be specified as it is.'
+        return
+
+    def display_explain(self, table_name, filters, fields, limit=None, order_by=None):
+        """Display the SQL and query plan of a find, with warnings and index advice.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters.
+            fields (list): List of fields.
+            limit (int, optional): Maximum number of records.
+            order_by (list, optional): List of fields to sort by.
+        """
+        explanation = self.contacts_db.explain(
+            table_name, filters, fields, order_by=order_by, limit=limit
         )
-        filter_str = input("Filter: ")
-        filters = []
-        for f in filter_str.split("|"):
-            filter_parts = f.split("~")
-            if len(filter_parts) != 3:
-                print("Invalid Filter!")
-                self.contacts_db.close_conn()
-                return
+        if not explanation:
+            return
 
-            if not re.match('".+"', filter_parts[2]) and filter_parts[2].isnumeric():
-                filters.append(
-                    [filter_parts[0], filter_parts[1], int(filter_parts[2])]
-                )
+        print("SQL:", explanation["sql"])
+        print("Params:", explanation["params"])
+        print("Query Plan:")
+        depths = {0: 0}
+        for row in explanation["plan"]:
+            depths[row["id"]] = depths.get(row["parent"], 0) + 1
+            print("  " * depths[row["id"]] + row["detail"])
 
-            # check if data is a string is enclosed in quotes.
-            elif re.match('".+"', filter_parts[2]) and not filter_parts[2].isnumeric():
-                filters.append(
-                    [filter_parts[0], filter_parts[1], filter_parts[2].strip('"')]
-                )
+        print("Estimated rows in table:", explanation["rows"])
+        for warning in explanation["warnings"]:
+            print("Warning:", warning)
 
-            else:
-                print("Invalid Filter!")
-                self.contacts_db.close_conn()
-                return
+        for sql_command in explanation["advice"]:
+            print("Suggested index:", sql_command)
 
-        print("\nPlease Enter the fields you want to display based on this convention:")
-        print("<field_name_1>|<field_name_2>|..")
-        fields_str = input("Fields: ")
-        fields = [f for f in fields_str.split("|")]
-        result = self.contacts_db.find(table_name, filters, fields)
-        if result:
-            if display_style == "dict":
-                pprint(result)
-            elif display_style == "tabular":
-                self._display_tabular_dict(result)
-            else:
-                print("Unsupported or Missing display style. Aborting..")
+        if explanation["full_scan"] and not explanation["advice"]:
+            print("No index can avoid the full scan.")
+
+    def count_data(self, table_name, group_by=None, display_style="tabular"):
+        """Count Records in the Table, optionally per group.
+
+        Args:
+            table_name (string): Table Name.
+            group_by (list, optional): List of fields to count the records per value of.
+            display_style (str, optional): Display Style of the groups.
+                Supported Values are "dict" and "tabular".
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        print("\nPlease Enter the filter for your count based on this convention:")
+        print("<field_name_1>~<operator>~<value>|<field_name_2>~<operator>~<value>|..")
+        print("Leave empty to count all records.")
+        filter_str = input("Filter: ")
+        filters = self._parse_filter_str(filter_str) if filter_str.strip() else []
+        if filters is False:
+            return
+
+        if not group_by:
+            result = self.contacts_db.count(table_name, filters)
+            if result is not False:
+                print(result, "records found.")
+
+            return
+
+        result = self.contacts_db.aggregate(
+            table_name, group_by, {"count": "count"}, filters
+        )
+        if result is not False:
+            self._display_data(result, display_style or "tabular")
 
-        self.contacts_db.close_conn()
         return
 
     def delete_data(self, table_name, _id):
@@ -204,19 +527,16 @@ class ContactsCL(object):
         """
         if not self.contacts_db.does_table_exist(table_name):
             print("Table doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
-        if not self.contacts_db.find_data(table_name, [["id", "equals", _id]]):
+        if not self.contacts_db.find(table_name, [["id", "equals", _id]], ["id"]):
             print("Record doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         result = self.contacts_db.delete(table_name, _id)
         if result:
             print("Data successfully removed!")
 
-        self.contacts_db.close_conn()
         return
 
     def update_data(self, table_name, _id):
@@ -230,9 +550,8 @@ class ContactsCL(object):
             print("Table doesn't exist. Aborting..")
             return
 
-        if not self.contacts_db.find_data(table_name, [["id", "equals", _id]]):
+        if not self.contacts_db.find(table_name, [["id", "equals", _id]], ["id"]):
             print("Record doesn't exist. Aborting..")
-            self.contacts_db.close_conn()
             return
 
         print("Please Enter the data you want to add based on this convention:")
@@ -243,35 +562,322 @@ class ContactsCL(object):
         data_str = input("Data: ")
         data = self._parse_data_str(data_str)
         if not data:
-            self.contacts_db.close_conn()
             return
 
         result = self.contacts_db.update(table_name, _id, data)
         if result:
             print("Data successfully updated!")
 
-        self.contacts_db.close_conn()
         return
 
-    def list_data(self, table_name, display_style="dict"):
-        """Summary
+    def update_where(self, table_name):
+        """Update all Records in the Table matching a filter.
+
+        Args:
+            table_name (string): Table Name.
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        filters = self._input_filters("update")
+        if filters is False:
+            return
+
+        print("Please Enter the data you want to set based on this convention:")
+        print("<field_name_1>=><data_1>|<field_name_2>=><data_2>|...")
+        print(
+            'Please enclose text data in ("). Integer data should be specified as it is.'
+        )
+        data_str = input("Data: ")
+        data = self._parse_data_str(data_str)
+        if not data:
+            return
+
+        result = self.contacts_db.update_where(table_name, filters, data)
+        if result is not False:
+            print(result, "records successfully updated!")
+
+        return
+
+    def delete_where(self, table_name, chunk_size=None):
+        """Delete all Records from the Table matching a filter.
+
+        Args:
+            table_name (string): Table Name.
+            chunk_size (int, optional): Number of ids deleted per transaction.
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        filters = self._input_filters("delete")
+        if filters is False:
+            return
+
+        kwargs = {} if chunk_size is None else {"chunk_size": chunk_size}
+        result = self.contacts_db.delete_where(table_name, filters, **kwargs)
+        if result is not False:
+            print(result, "records successfully removed!")
+
+        return
+
+    def list_data(
+        self,
+        table_name,
+        display_style="dict",
+        limit=None,
+        page=None,
+        after=None,
+        order_by=None,
+    ):
+        """Display all Records in the Table.
 
         Args:
             table_name (string): Table Name.
             display_style (str, optional): Display Style.
                 Supported Values are "dict" and "tabular".
+            limit (int, optional): Number of records per page.
+            page (int, optional): Page number to display, starting at 1.
+            after (str, optional): Continuation token of the previous page.
+            order_by (list, optional): List of fields to sort by, "-" prefix for descending.
         """
-        result = self.contacts_db.find(table_name, [], [])
-        if result:
-            if display_style == "dict":
-                pprint(result)
-            elif display_style == "tabular":
-                self._display_tabular_dict(result)
-            else:
-                print("Unsupported or Missing display style. Aborting..")
+        self._find_and_display(
+            table_name, [], [], display_style, limit, page, after, order_by
+        )
+        return
+
+    def import_csv(self, table_name, csv_path, batch_size=1000, workers=None):
+        """Add the rows of a CSV file to the Table.
+
+        Args:
+            table_name (string): Table Name.
+            csv_path (string): Path to the CSV file, "-" to read from stdin.
+            batch_size (int, optional): Number of rows committed together.
+            workers (int, optional): Number of processes parsing the file. More than
+                one uses the parallel import pipeline, which needs a path and isn't
+                used while a daemon serves the database.
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        if workers and workers > 1 and csv_path != "-":
+            # only a local database can be written to by the pipeline.
+            if isinstance(self.contacts_db, ContactsDB):
+                inserted, rejected = parallel_import(
+                    self.contacts_db,
+                    table_name,
+                    csv_path,
+                    workers=workers,
+                    batch_size=batch_size,
+                )
+                for line, reason in rejected:
+                    print("Line", line, "rejected:", reason)
+
+                print(inserted, "records successfully imported.")
+                return
+
+        csv_file = sys.stdin if csv_path == "-" else csv_path
+        inserted, rejected = self.contacts_db.import_csv(table_name, csv_file, batch_size)
+        for row, reason in rejected:
+            print("Row", row, "rejected:", reason)
+
+        print(inserted, "records successfully imported.")
+
+    def export_csv(self, table_name, csv_path, order_by=None):
+        """Write all records of the Table to a CSV file.
+
+        Args:
+            table_name (string): Table Name.
+            csv_path (string): Path to the CSV file, "-" to write to stdout.
+            order_by (list, optional): List of fields to sort by, "-" prefix for descending.
+        """
+        if not self.contacts_db.does_table_exist(table_name):
+            print("Table doesn't exist. Aborting..")
+            return
+
+        if csv_path == "-":
+            self.contacts_db.export_csv(table_name, sys.stdout, order_by=order_by)
+            return
+
+        count = self.contacts_db.export_csv(table_name, csv_path, order_by=order_by)
+        if count is not False:
+            print(count, "records successfully exported.")
+
+    def display_daemon_stats(self):
+        """Display the latency stats of the running daemon."""
+        if not hasattr(self.contacts_db, "stats"):
+            print("Daemon isn't running. Aborting..")
+            return
+
+        stats = self.contacts_db.stats()
+        print("Uptime:", stats["uptime_s"], "seconds")
+        self._display_tabular_dict(
+            dict(op=op, **op_stats) for op, op_stats in sorted(stats["ops"].items())
+        )
+
+    def enable_stats(self):
+        """Time the database operations of this run for display_stats."""
+        if not isinstance(self.contacts_db, ContactsDB):
+            print("Stats need a local database, not the daemon. Aborting..")
+            return
+
+        self.histogram = HistogramSink()
+        self.contacts_db.set_instrumentation(Instrumentation([self.histogram]))
+
+    def display_stats(self):
+        """Display the latency stats and phase times of the database operations on stderr."""
+        if self.histogram is None:
+            return
+
+        with contextlib.redirect_stdout(sys.stderr):
+            self._display_tabular_dict(
+                dict(op=op, **op_stats)
+                for op, op_stats in sorted(self.histogram.stats().items())
+            )
+
+    def run_batch(self, batch_path, batch_size=1000):
+        """Run the operations of a batch file over one connection.
+
+        Every line is one operation, either as JSON or in the | delimited convention:
+            add|<table_name>|<field_name_1>=><data_1>|<field_name_2>=><data_2>|..
+            update|<table_name>|<id>|<field_name_1>=><data_1>|..
+            delete|<table_name>|<id>
+            find|<table_name>|<field_name_1>~<operator>~<value>|..|<field_name_1>|..
+            {"op": "add", "table": <table_name>, "data": {<field_name_1>: <data_1>..}}
+            {"op": "update", "table": <table_name>, "id": <id>, "data": {..}}
+            {"op": "delete", "table": <table_name>, "id": <id>}
+            {"op": "find", "table": <table_name>, "filters": [..], "fields": [..]}
+
+        Empty lines and lines starting with # are skipped. batch_size lines are
+        committed together, and a failing line is rolled back on its own. Lines of
+        batch_size finds run without a transaction. The result of every line is
+        printed as a JSON line:
+            {"line": <line_number>, "ok": true, "result": <result>}
+            {"line": <line_number>, "ok": false, "error": <error message>}
+
+        Args:
+            batch_path (string): Path to the batch file, "-" to read from stdin.
+            batch_size (int, optional): Number of lines per transaction.
+
+        Returns:
+            tuple: (number of operations succeeded, number of operations failed)
+        """
+        if not batch_size or batch_size < 1:
+            raise ValueError("batch_size needs to be a positive integer.")
+
+        batch_file = sys.stdin if batch_path == "-" else open(batch_path)
+        succeeded = failed = 0
+        try:
+            lines = enumerate(batch_file, 1)
+            while True:
+                chunk = list(itertools.islice(lines, batch_size))
+                if not chunk:
+                    break
+
+                ops = []
+                for line_number, line in chunk:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+
+                    try:
+                        ops.append((line_number, self._parse_batch_line(line), None))
+                    except BATCH_ERRORS as e:
+                        ops.append((line_number, None, e))
+
+                # a chunk of finds holds no transaction, so a daemon serves it from
+                # its readers instead of holding its writer.
+                if any(op and op.get("op") != "find" for _, op, _ in ops):
+                    transaction = self.contacts_db.transaction
+                    savepoint = self.contacts_db.savepoint
+                else:
+                    transaction = savepoint = contextlib.nullcontext
+
+                with transaction():
+                    for line_number, op, error in ops:
+                        try:
+                            if error:
+                                raise error
+
+                            with savepoint():
+                                result = self._run_batch_op(op)
+                        except BATCH_ERRORS as e:
+                            failed += 1
+                            report = {"line": line_number, "ok": False, "error": str(e)}
+                        else:
+                            succeeded += 1
+                            report = {"line": line_number, "ok": True, "result": result}
+
+                        sys.stdout.write(json.dumps(report, default=str) + "\n")
+        finally:
+            if batch_file is not sys.stdin:
+                batch_file.close()
+
+        print(
+            "Batch complete:", succeeded, "succeeded,", failed, "failed.", file=sys.stderr
+        )
+        return succeeded, failed
+
+    def _find_and_display(
+        self, table_name, filters, fields, display_style, limit, page, after, order_by
+    ):
+        """Helper Function to find records, optionally one page at a time, and display them.
+
+        Without a limit all records are streamed. With a limit and a continuation
+        token (or no page) keyset pagination is used and the token for the next page
+        is printed. A page number without a token skips the previous pages.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters.
+            fields (list): List of fields.
+            display_style (str): Display Style.
+            limit (int): Number of records per page. None to display all records.
+            page (int): Page number to display, starting at 1.
+            after (str): Continuation token of the previous page.
+            order_by (list): List of fields to sort by.
+        """
+        if limit is None:
+            result = self.contacts_db.find(
+                table_name, filters, fields, stream=True, order_by=order_by
+            )
+            if result:
+                self._display_data(result, display_style)
 
+            return
+
+        if page and page > 1 and not after:
+            result = self.contacts_db.find(
+                table_name,
+                filters,
+                fields,
+                order_by=order_by or ["id"],
+                limit=limit,
+                offset=(page - 1) * limit,
+            )
+            if result:
+                self._display_data(result, display_style)
+
+            return
+
+        result = self.contacts_db.find_page(
+            table_name, filters, fields, order_by=order_by, limit=limit, after=after
+        )
+        if not result:
+            return
+
+        records, token = result
+        if records:
+            self._display_data(records, display_style)
+
+        if token:
+            print("Next page token:", token)
+
+    def close(self):
+        """Closes the Database Connection."""
         self.contacts_db.close_conn()
-        return
 
     def _parse_data_str(self, data_str):
         """Helper Function to parse input data string and convert them into a usable dictionary.
@@ -279,64 +885,330 @@ class ContactsCL(object):
         Args:
             data_str (string): data_string to parse.
         """
-        data_dict = {}
-        for data in data_str.split("|"):
-            if not data:
-                continue
+        try:
+            return parse_data_str(data_str)
+        except ValueError as e:
+            print(e)
+            return False
+
+    def _input_filters(self, operation):
+        """Helper Function to ask for a filter string and convert it into a list of filters.
+
+        Args:
+            operation (string): Name of the operation the filter is for.
+
+        Returns:
+            list: List of filters. False if the filter string is invalid.
+        """
+        print(
+            "\nPlease Enter the filter for your " + operation + " based on this convention:"
+        )
+        print("<field_name_1>~<operator>~<value>|<field_name_2>~<operator>~<value>|..")
+        print("Valid Operators for Strings: is, is_not, contains, does_not_contain, starts_with.")
+        print(
+            "Valid Operators for Integers: less_than, less_than_equal, greater_than, greater_than_equal, equals, not_equal."
+        )
+        print("Valid Operators for Lists like [<value_1>,<value_2>]: in, not_in, between.")
+        print("Group filters with and(..|..), or(..|..) and not(..).")
+        print(
+            'Please enclose text value in ("). Integer value should be specified as it is.'
+        )
+        filter_str = input("Filter: ")
+        return self._parse_filter_str(filter_str)
+
+    def _parse_filter_str(self, filter_str):
+        """Helper Function to parse input filter string and convert it into a list of filters.
+
+        Args:
+            filter_str (string): filter_string to parse.
+        """
+        try:
+            return parse_filter_str(filter_str)
+        except ValueError as e:
+            print(e)
+            return False
 
-            if len(data.split("=>")) != 2:
-                print("Invalid Filter!")
-                return False
+    def _parse_batch_line(self, line):
+        """Helper Function to parse a line of a batch file into an operation.
 
-            key, val = data.split("=>")
-            # check if data is an integer
-            if not re.match('".+"', val) and val.isnumeric():
-                data_dict[key] = int(val)
+        Args:
+            line (string): JSON or | delimited line, see run_batch.
+
+        Returns:
+            dict: Operation with op, table and the id, data, filters and fields it needs.
+        """
+        if line.startswith("{"):
+            try:
+                op = json.loads(line)
+            except ValueError:
+                raise ValueError("Invalid JSON operation.")
+
+            if not isinstance(op, dict):
+                raise ValueError("Invalid JSON operation.")
+
+            return op
+
+        parts = line.split("|")
+        if len(parts) < 2:
+            raise ValueError("Invalid operation: " + line)
+
+        op = {"op": parts[0].strip(), "table": parts[1].strip()}
+        rest = parts[2:]
+        if op["op"] in ("update", "delete"):
+            if not rest or not rest[0].strip().isnumeric():
+                raise ValueError("Invalid ID for " + op["op"] + ".")
+
+            op["id"] = int(rest.pop(0))
 
-            # check if data is a valid string
-            elif re.match('".+"', val) and not val.isnumeric():
-                data_dict[key] = val.strip('"')
+        if op["op"] in ("add", "update"):
+            op["data"] = parse_data_str("|".join(rest))
+
+        elif op["op"] == "find":
+            filter_strs = [f for f in rest if "~" in f]
+            op["filters"] = parse_filter_str("|".join(filter_strs)) if filter_strs else []
+            op["fields"] = [f.strip() for f in rest if "~" not in f and f.strip()]
+
+        return op
+
+    def _run_batch_op(self, op):
+        """Helper Function to run an operation of a batch file.
+
+        Messages printed by the database are sent to stderr so stdout only has the
+        results.
+
+        Args:
+            op (dict): Operation, see _parse_batch_line.
+
+        Returns:
+            list/bool: Records found for find, True for the other operations.
+        """
+        table_name = op.get("table")
+        if not self.contacts_db.does_table_exist(table_name):
+            raise TableError("Table " + str(table_name) + " does not exist.")
+
+        with contextlib.redirect_stdout(sys.stderr):
+            if op.get("op") == "add":
+                result = self.contacts_db.add(table_name, op["data"])
+
+            elif op.get("op") == "find":
+                result = self.contacts_db.find(
+                    table_name,
+                    op.get("filters", []),
+                    op.get("fields", []),
+                    op.get("operator", "AND"),
+                    order_by=op.get("order_by"),
+                    limit=op.get("limit"),
+                )
+
+            elif op.get("op") in ("update", "delete"):
+                _id = op["id"]
+                if not self.contacts_db.find(table_name, [["id", "equals", _id]], ["id"]):
+                    raise IDError("Record " + str(_id) + " doesn't exist.")
+
+                if op["op"] == "update":
+                    result = self.contacts_db.update(table_name, _id, op["data"])
+                else:
+                    result = self.contacts_db.delete(table_name, _id)
 
             else:
-                print("Unsupported Data!")
-                return False
+                raise ValueError("Unsupported operation: " + str(op.get("op")))
+
+        if result is False:
+            raise DatabaseError("Database Operation Failed.")
+
+        return result
+
+    def _display_data(self, data_dicts, display_style):
+        """Helper Function to display records in the requested display style.
+
+        Args:
+            data_dicts (iterable): Iterable of Dictionaries. Consumed incrementally.
+            display_style (str): Display Style. Supported Values are "dict", "tabular"
+                and the output formats "table", "jsonl", "csv" and "tsv".
+        """
+        if display_style == "dict":
+            self._display_dict_list(data_dicts)
+        elif display_style == "tabular":
+            self._display_tabular_dict(data_dicts)
+        elif display_style in RENDER_FORMATS:
+            render(data_dicts, display_style)
+        else:
+            print("Unsupported or Missing display style. Aborting..")
+
+    def _display_dict_list(self, data_dicts):
+        """Helper Function to pretty print dicts as a list, one record at a time.
+
+        Args:
+            data_dicts (iterable): Iterable of Dictionaries. Consumed incrementally.
+        """
+        prefix = "["
+        for data_dict in data_dicts:
+            if prefix != "[":
+                print(",")
+
+            lines = pformat(data_dict).splitlines()
+            print(prefix + "\n ".join(lines), end="")
+            prefix = " "
 
-        return data_dict
+        if prefix != "[":
+            print("]")
 
-    def _display_tabular_dict(self, data_dict_list):
-        """Helper Function to display a dict list in tabular form.
+    def _display_tabular_dict(self, data_dicts):
+        """Helper Function to display dicts in tabular form, streamed in chunks.
+
+        Columns are sized from the first records, see contacts_render.render.
 
         Args:
-            data_dict_list (list): List of Dictionaries
+            data_dicts (iterable): Iterable of Dictionaries. Consumed incrementally.
         """
-        keys = list(data_dict_list[0].keys())
-        header_str = ""
-        for key in keys:
-            header_str += "|{:<40}".format(key.rjust(20))
-        header_str += "|"
+        render(data_dicts, "table", sys.stdout)
+
+
+def get_db_path(db_path=None):
+    """Get the path to the database.
+
+    Args:
+        db_path (string, optional): Path to Local SQLite Database.
 
-        print(header_str)
-        for data_dict in data_dict_list:
-            data_str = ""
-            for k, v in data_dict.items():
-                data_str += "|{:<40}".format(str(v).rjust(20))
+    Returns:
+        string: db_path, or ~/contacts_db/contacts.db if it isn't set.
+    """
+    if not db_path:
+        home_path = os.path.expanduser("~")
+        db_path = home_path + "/contacts_db/contacts.db"
 
-            data_str += "|"
-            print(data_str)
+    return db_path
 
 
-def main():
+def serve(profile=None):
+    """Serve the database from a daemon until it is interrupted or terminated.
+
+    Commandline runs forward their operations to the daemon while it is running.
+
+    Args:
+        profile (str, optional): Connection tuning profile.
+    """
+    contacts_daemon = ContactsDaemon(get_db_path(), profile=profile or "balanced")
+    # terminating the daemon closes it like an interrupt does.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print("Serving", contacts_daemon.db_path, "on", contacts_daemon.socket_path)
+    try:
+        contacts_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        contacts_daemon.close()
+
+
+def main(profile=None, stats=False):
     """Main Function
 
+    Args:
+        profile (str, optional): Connection tuning profile.
+        stats (bool, optional): Set this to time the database operations. The
+            database is opened in this process even if a daemon is serving it.
+
     Returns:
         object: Contacts CommandLine Instance
     """
-    contacts_cl = ContactsCL()
+    contacts_cl = ContactsCL(profile=profile, use_daemon=not stats)
+    if stats:
+        contacts_cl.enable_stats()
+
     return contacts_cl
 
 
+def run_operation(contacts_cl, args, order_by, group_by=None):
+    """Run the operation selected by the command line arguments.
+
+    Args:
+        contacts_cl (ContactsCL): Contacts CommandLine Instance.
+        args (Namespace): Parsed command line arguments.
+        order_by (list): List of fields to sort by.
+        group_by (list, optional): List of fields to count by.
+    """
+    # an output format replaces the display style.
+    display_style = args.format or args.display_style
+    if args.create_table:
+        contacts_cl.create_table(args.table_name)
+
+    elif args.delete_table:
+        contacts_cl.delete_table(args.table_name)
+
+    elif args.list_tables:
+        contacts_cl.list_tables()
+
+    elif args.display_table_schema:
+        contacts_cl.display_table_schema(args.table_name)
+
+    elif args.add_data:
+        contacts_cl.add_data(args.table_name)
+
+    elif args.find_data:
+        contacts_cl.find_data(
+            args.table_name,
+            display_style,
+            args.limit,
+            args.page,
+            args.after,
+            order_by,
+            args.explain,
+        )
+
+    elif args.count:
+        contacts_cl.count_data(args.table_name, group_by, display_style)
+
+    elif args.delete_data:
+        contacts_cl.delete_data(args.table_name, args.id)
+
+    elif args.update_data:
+        contacts_cl.update_data(args.table_name, args.id)
+
+    elif args.update_where:
+        contacts_cl.update_where(args.table_name)
+
+    elif args.create_index:
+        contacts_cl.create_index(args.table_name, args.unique, args.index_name)
+
+    elif args.drop_index:
+        contacts_cl.drop_index(args.index_name)
+
+    elif args.list_indexes:
+        contacts_cl.list_indexes(args.table_name)
+
+    elif args.enable_fulltext:
+        contacts_cl.enable_fulltext(args.table_name, args.tokenizer)
+
+    elif args.disable_fulltext:
+        contacts_cl.disable_fulltext(args.table_name)
+
+    elif args.rebuild_fulltext:
+        contacts_cl.rebuild_fulltext(args.table_name)
+
+    elif args.enable_normalized_key:
+        contacts_cl.enable_normalized_key(args.table_name, args.enable_normalized_key)
+
+    elif args.disable_normalized_key:
+        contacts_cl.disable_normalized_key(args.table_name)
+
+    elif args.export_csv:
+        contacts_cl.export_csv(args.table_name, args.export_csv, order_by)
+
+    elif args.daemon_stats:
+        contacts_cl.display_daemon_stats()
+
+    elif args.list_data:
+        contacts_cl.list_data(
+            args.table_name,
+            display_style,
+            args.limit,
+            args.page,
+            args.after,
+            order_by,
+        )
+
+
 if __name__ == "__main__":
-    contacts_cl = main()
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--create_table", help="Set this to build a new table.", action="store_true"
@@ -376,48 +1248,204 @@ if __name__ == "__main__":
         help="Set this to update data to specified table name based on the provided id.",
         action="store_true",
     )
+    parser.add_argument(
+        "--update_where",
+        help="Set this to update all data in specified table name matching a filter in one statement.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--delete_where",
+        help="Set this to remove all data in specified table name matching a filter, committed in chunks of --batch_size ids.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--explain",
+        help="Set this with --find_data to display the SQL, query plan and suggested indexes instead of the records.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--count",
+        help="Set this to count data in specified table name matching a filter.",
+        action="store_true",
+    )
     parser.add_argument(
         "--list_data",
         help="Show all data in specified table name.",
         action="store_true",
     )
 
+    parser.add_argument(
+        "--create_index",
+        help="Set this to index the fields of specified table name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--drop_index",
+        help="Set this to remove the index with the specified index name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--list_indexes",
+        help="Set this to display all indexes, or the indexes of specified table name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--enable_fulltext",
+        help="Set this to answer contains filters on specified table name from a full-text index.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--disable_fulltext",
+        help="Set this to remove the full-text index of specified table name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--rebuild_fulltext",
+        help="Set this to rebuild and optimize the full-text index of specified table name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--enable_normalized_key",
+        help="Set this to index the normalized phone or email key of a Text field of specified table name. is, starts_with and in filters on it then match normalized values.",
+        choices=sorted(NORMALIZED_KEY_TYPES.keys()),
+    )
+    parser.add_argument(
+        "--disable_normalized_key",
+        help="Set this to remove the normalized key of a field of specified table name.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--serve",
+        help="Set this to serve the database from a daemon. Other runs forward their operations to it while it is running.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--daemon_stats",
+        help="Set this to display the latency stats of the running daemon.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stats",
+        help="Set this to display p50/p95/p99 latencies and phase times of the database operations on stderr at exit.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--import_csv",
+        help='Add the rows of a CSV file, "-" for stdin, to specified table name. The header row names the fields.',
+        type=str,
+    )
+    parser.add_argument(
+        "--export_csv",
+        help='Write all data in specified table name to a CSV file, "-" for stdout.',
+        type=str,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of processes parsing the --import_csv file in parallel. Records can't span lines.",
+        type=int,
+    )
+    parser.add_argument(
+        "--batch",
+        help='Run the operations of a file, "-" for stdin, over one connection. One operation per line as JSON or <op>|<table_name>|..',
+        type=str,
+    )
+
     parser.add_argument(
         "--table_name", help="Table name to perform the operation on.", type=str
     )
+    parser.add_argument(
+        "--index_name", help="Index name to create or remove.", type=str
+    )
+    parser.add_argument(
+        "--tokenizer",
+        help='Tokenizer for --enable_fulltext. Supported values are: "unicode61" (words and word prefixes) and "trigram" (substrings)',
+        type=str,
+        default="unicode61",
+    )
+    parser.add_argument(
+        "--unique",
+        help="Set this with --create_index to reject duplicate values.",
+        action="store_true",
+    )
     parser.add_argument(
         "--id", help="ID of the record you want to remove or update", type=int
     )
+    parser.add_argument(
+        "--limit", help="Number of records to display per page.", type=int
+    )
+    parser.add_argument(
+        "--page",
+        help="Page number to display with --limit, starting at 1. Skips the previous pages, use --after for large tables.",
+        type=int,
+    )
+    parser.add_argument(
+        "--after",
+        help="Continuation token printed with the previous page. Displays the page after it.",
+        type=str,
+    )
+    parser.add_argument(
+        "--order_by",
+        help='Fields to sort by based on this convention: <field_name_1>|-<field_name_2>|.. where "-" sorts descending.',
+        type=str,
+    )
+    parser.add_argument(
+        "--group_by",
+        help="Fields to --count by based on this convention: <field_name_1>|<field_name_2>|..",
+        type=str,
+    )
+    parser.add_argument(
+        "--batch_size",
+        help="Number of --batch operations or --import_csv rows committed together, or ids per --delete_where chunk.",
+        type=int,
+        default=1000,
+    )
     parser.add_argument(
         "--display_style",
         help='Set this to display find data in a specific order. Supported modes are: "dict" and "tabular"',
         type=str,
     )
+    parser.add_argument(
+        "--format",
+        help="Output format of found records, replaces --display_style. jsonl, csv and tsv are meant for piping to other tools.",
+        choices=RENDER_FORMATS,
+    )
 
-    args = parser.parse_args()
-    if args.create_table:
-        contacts_cl.create_table(args.table_name)
-
-    elif args.delete_table:
-        contacts_cl.delete_table(args.table_name)
-
-    elif args.list_tables:
-        contacts_cl.list_tables()
-
-    elif args.display_table_schema:
-        contacts_cl.display_table_schema(args.table_name)
-
-    elif args.add_data:
-        contacts_cl.add_data(args.table_name)
-
-    elif args.find_data:
-        contacts_cl.find_data(args.table_name, args.display_style)
-
-    elif args.delete_data:
-        contacts_cl.delete_data(args.table_name, args._id)
-
-    elif args.update_data:
-        contacts_cl.update_data(args.table_name, args.id)
+    parser.add_argument(
+        "--profile",
+        help='Connection tuning profile. Supported profiles are: "durable", "balanced" and "bulk-load"',
+        type=str,
+        choices=sorted(PERFORMANCE_PROFILES.keys()),
+    )
 
-    elif args.list_data:
-        contacts_cl.list_data(args.table_name, args.display_style)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.profile)
+        sys.exit(0)
+
+    contacts_cl = main(args.profile, args.stats)
+    order_by = args.order_by.split("|") if args.order_by else None
+    group_by = args.group_by.split("|") if args.group_by else None
+    try:
+        if args.batch:
+            # a batch commits every batch_size operations on its own.
+            succeeded, failed = contacts_cl.run_batch(args.batch, args.batch_size)
+            if failed:
+                sys.exit(1)
+
+        elif args.delete_where:
+            # a delete_where commits every chunk on its own.
+            contacts_cl.delete_where(args.table_name, args.batch_size)
+
+        elif args.import_csv:
+            # an import commits every batch_size rows on its own.
+            contacts_cl.import_csv(
+                args.table_name, args.import_csv, args.batch_size, args.workers
+            )
+
+        else:
+            # an operation asks for its input first and then changes the database
+            # with one call, which commits on its own. Reads hold no transaction.
+            run_operation(contacts_cl, args, order_by, group_by)
+    finally:
+        contacts_cl.display_stats()
+        contacts_cl.close()
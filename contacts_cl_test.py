@@ -0,0 +1,228 @@
+"""Unit Test for the Contacts Commandline Application
+
+Author: Shobhit Khinvasara
+"""
+import io
+import os
+import json
+import tempfile
+import unittest
+import threading
+import contextlib
+import contacts_cl
+from unittest import mock
+from contacts_cl import ContactsCL
+from include.contacts_daemon import ContactsDaemon, is_daemon_supported
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsClBatch(unittest.TestCase):
+
+    """Unit Test Class for testing the batch mode.
+
+    Attributes:
+        contacts_cl (ContactsCL): Contacts CommandLine Instance.
+        temp_dir (TemporaryDirectory): Directory of the database and batch files.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.contacts_cl = ContactsCL(os.path.join(self.temp_dir.name, "batch.db"))
+        self.contacts_cl.contacts_db.create_table(
+            "Batch_Table", {"name": "text", "age": "integer"}
+        )
+
+    def run_batch(self, lines, batch_size=1000):
+        """Helper Function to run the lines as a batch file and collect the results."""
+        batch_path = os.path.join(self.temp_dir.name, "batch.txt")
+        with open(batch_path, "w") as batch_file:
+            batch_file.write("\n".join(lines) + "\n")
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            counts = self.contacts_cl.run_batch(batch_path, batch_size)
+
+        return counts, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_1_parse_filter_str(self):
+        """Unit Test to test parsing of the filter convention."""
+        filters = contacts_cl.parse_filter_str('name~is~"Joy"|age~equals~26')
+        self.assertEqual(filters, [["name", "is", "Joy"], ["age", "equals", 26]])
+        with self.assertRaises(ValueError):
+            contacts_cl.parse_filter_str("name~is~Joy")
+
+        filters = contacts_cl.parse_filter_str(
+            'or(city~is~"A|B"|and(age~in~[1, 2]|name~starts_with~"J"))|not(age~between~[3,4])'
+        )
+        self.assertEqual(
+            filters,
+            [
+                {
+                    "or": [
+                        ["city", "is", "A|B"],
+                        {"and": [["age", "in", [1, 2]], ["name", "starts_with", "J"]]},
+                    ]
+                },
+                {"not": ["age", "between", [3, 4]]},
+            ],
+        )
+        with self.assertRaises(ValueError):
+            contacts_cl.parse_filter_str('or(city~is~"A"')
+
+    def test_2_run_batch(self):
+        """Unit Test to test pipe delimited and JSON operations in one batch."""
+        counts, results = self.run_batch(
+            [
+                "# contacts to add",
+                'add|Batch_Table|name=>"Joy"|age=>26',
+                '{"op": "add", "table": "Batch_Table", "data": {"name": "Ann", "age": 30}}',
+                "",
+                "update|Batch_Table|1|age=>27",
+                "find|Batch_Table|age~greater_than~20|name|age",
+            ],
+            batch_size=2,
+        )
+        self.assertEqual(counts, (4, 0))
+        self.assertEqual([r["line"] for r in results], [2, 3, 5, 6])
+        self.assertEqual(
+            results[-1]["result"], [{"name": "Joy", "age": 27}, {"name": "Ann", "age": 30}]
+        )
+
+    def test_3_run_batch_errors(self):
+        """Unit Test to test that failing lines are reported and rolled back on their own."""
+        counts, results = self.run_batch(
+            [
+                'add|Batch_Table|name=>"Max"|age=>40',
+                'add|Batch_Table|name=>"Bad"|phone=>"123"',
+                "delete|Batch_Table|99",
+                "delete|Missing_Table|1",
+                "{bad json",
+            ]
+        )
+        self.assertEqual(counts, (1, 4))
+        self.assertEqual([r["ok"] for r in results], [True, False, False, False, False])
+        names = [r["name"] for r in self.contacts_cl.contacts_db.find("Batch_Table")]
+        self.assertEqual(names, ["Joy", "Ann", "Max"])
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.contacts_cl.close()
+        self.temp_dir.cleanup()
+
+
+
+@unittest.skipUnless(is_daemon_supported(), "Unix domain sockets aren't supported.")
+class TestContactsClDaemon(unittest.TestCase):
+
+    """Unit Test Class for testing operations forwarded to the daemon.
+
+    Attributes:
+        daemon (ContactsDaemon): Daemon serving the database.
+        contacts_cl (ContactsCL): Contacts CommandLine Instance using the daemon.
+        ops (list): Operations sent to the daemon.
+        temp_dir (TemporaryDirectory): Directory of the database and batch files.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, "daemon.db")
+        self.daemon = ContactsDaemon(db_path, max_readers=2)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.contacts_cl = ContactsCL(db_path)
+        self.contacts_cl.contacts_db.create_table(
+            "Daemon_Table", {"name": "text", "age": "integer"}
+        )
+        self.contacts_cl.contacts_db.add("Daemon_Table", {"name": "Joy", "age": 26})
+
+        self.ops = []
+        call = self.contacts_cl.contacts_db.call
+        self.contacts_cl.contacts_db.call = lambda op, *args, **kwargs: (
+            self.ops.append(op) or call(op, *args, **kwargs)
+        )
+
+    def run_batch(self, lines):
+        """Helper Function to run the lines as a batch file and collect the counts."""
+        batch_path = os.path.join(self.temp_dir.name, "batch.txt")
+        with open(batch_path, "w") as batch_file:
+            batch_file.write("\n".join(lines) + "\n")
+
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            return self.contacts_cl.run_batch(batch_path)
+
+    def test_1_reads(self):
+        """Unit Test to test that reads don't begin transactions in the daemon."""
+        del self.ops[:]
+        self.assertEqual(
+            self.run_batch(["find|Daemon_Table|name", "find|Daemon_Table|age"]), (2, 0)
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.contacts_cl.list_data("Daemon_Table")
+
+        self.assertIn("find", self.ops)
+        self.assertNotIn("begin", self.ops)
+
+    def test_2_writes(self):
+        """Unit Test to test that a batch with writes runs in one daemon transaction."""
+        del self.ops[:]
+        self.assertEqual(
+            self.run_batch(['add|Daemon_Table|name=>"Ann"', "find|Daemon_Table|name"]),
+            (2, 0),
+        )
+        self.assertIn("begin", self.ops)
+        self.assertEqual(self.ops.count("begin"), self.ops.count("end"))
+
+    def test_3_explain(self):
+        """Unit Test to test find_data with explain served by the daemon."""
+        output = io.StringIO()
+        inputs = ["age~greater_than~20", "name"]
+        with mock.patch("builtins.input", side_effect=inputs):
+            with contextlib.redirect_stdout(output):
+                self.contacts_cl.find_data("Daemon_Table", explain=True)
+
+        self.assertIn("explain", self.ops)
+        self.assertIn("SQL: SELECT name FROM Daemon_Table WHERE", output.getvalue())
+        self.assertIn("Query Plan:", output.getvalue())
+
+    def test_4_csv_stdio(self):
+        """Unit Test to test CSV imports from stdin and exports to stdout via the daemon."""
+        self.contacts_cl.contacts_db.create_table(
+            "Csv_Table", {"name": "text", "age": "integer"}
+        )
+        stdin = io.StringIO("\ufeffname,age\nKen,33\nBad,old\nLiv,41\n")
+        output = io.StringIO()
+        with mock.patch("sys.stdin", stdin), contextlib.redirect_stdout(output):
+            self.contacts_cl.import_csv("Csv_Table", "-", batch_size=2)
+
+        self.assertIn("Row 2 rejected", output.getvalue())
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.contacts_cl.export_csv("Csv_Table", "-", ["-age"])
+
+        self.assertEqual(
+            output.getvalue().splitlines(), ["id,name,age", "2,Liv,41", "1,Ken,33"]
+        )
+        self.assertIn("add_many", self.ops)
+        self.assertNotIn("export_csv", self.ops)
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.contacts_cl.close()
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.close()
+        self.temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""Query Result Cache for the Contacts Application Database API.
+
+Author: Shobhit Khinvasara
+"""
+import sys
+import time
+from collections import OrderedDict
+
+
+class ResultCache(object):
+    """LRU cache of query results with limits on entries, bytes and age.
+
+    Every entry is stored with a version, a lookup with a different version is a
+    miss and drops the entry. ContactsDB uses the write counter of the queried table
+    as the version, so a write to a table invalidates only the results of that table.
+
+    Attributes:
+        max_entries (int): Maximum number of cached results.
+        max_bytes (int): Maximum estimated size of all cached results. Results larger
+            than this aren't cached.
+        ttl (float): Seconds a result stays valid. None keeps results until they are
+            invalidated or evicted.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found, expired or invalidated.
+        evictions (int): Number of results dropped to stay within the limits.
+        invalidations (int): Number of results dropped because their data changed.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024, ttl=None):
+        """Initializes an empty cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached results.
+            max_bytes (int, optional): Maximum estimated size of all cached results.
+            ttl (float, optional): Seconds a result stays valid.
+        """
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("max_entries and max_bytes need to be positive integers.")
+
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl needs to be a positive number.")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key, version):
+        """Look up a result.
+
+        Args:
+            key (tuple): Key of the query.
+            version (object): Current version of the data the query reads.
+
+        Returns:
+            tuple: (hit, result) where hit is False if the result isn't cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        result, entry_version, size, expires = entry
+        if entry_version != version or (expires is not None and expires < time.monotonic()):
+            self._drop(key)
+            self.invalidations += 1
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, result
+
+    def put(self, key, version, result):
+        """Store a result, evicting the least recently used ones beyond the limits.
+
+        Args:
+            key (tuple): Key of the query.
+            version (object): Version of the data the result was read from.
+            result (list): Query result. It must not be modified after this.
+
+        Returns:
+            bool: True if it was cached. False if it is larger than max_bytes.
+        """
+        size = estimate_size(result)
+        if key in self._entries:
+            self._drop(key)
+
+        if size > self.max_bytes:
+            return False
+
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (result, version, size, expires)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+        return True
+
+    def clear(self):
+        """Drop all cached results. They are counted as invalidations."""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Get the counters and the current size of the cache.
+
+        Returns:
+            dict: Dictionary with hits, misses, hit_rate, evictions, invalidations,
+                entries and bytes.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _drop(self, key):
+        """Helper Function to remove an entry and its size."""
+        self._bytes -= self._entries.pop(key)[2]
+
+
+def estimate_size(result):
+    """Estimate the memory a query result takes.
+
+    Counts the list, every record and every value, values shared between records
+    are counted once per record.
+
+    Args:
+        result (list): List of records, dicts or sequences of values.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    size = sys.getsizeof(result)
+    for record in result:
+        size += sys.getsizeof(record)
+        values = record.values() if isinstance(record, dict) else record
+        size += sum(map(sys.getsizeof, values))
+
+    return size
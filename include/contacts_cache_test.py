@@ -0,0 +1,131 @@
+"""Unit Test for the Contacts Database Query Result Cache
+
+Author: Shobhit Khinvasara
+"""
+import os
+import time
+import tempfile
+import unittest
+from contacts_cache import ResultCache
+from contacts_db import ContactsDB, TypeMismatchError
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsCache(unittest.TestCase):
+
+    """Unit Test Class for testing the result cache.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object with a result cache.
+        other_db (ContactsDB): Second connection to the same database.
+        temp_dir (TemporaryDirectory): Temporary directory holding the database.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, "contacts.db")
+        self.contacts_db = ContactsDB(db_path, result_cache={"max_entries": 8})
+        self.contacts_db.create_table("Cache_Table", {"name": "text", "team": "text"})
+        self.contacts_db.create_table("Other_Table", {"name": "text"})
+        self.contacts_db.add_many(
+            "Cache_Table",
+            [{"name": "N" + str(i), "team": "T" + str(i % 3)} for i in range(30)],
+        )
+        self.other_db = ContactsDB(db_path)
+
+    def test_1_limits(self):
+        """Unit Test to test the entry, byte and age limits of ResultCache."""
+        cache = ResultCache(max_entries=2, max_bytes=2048, ttl=0.05)
+        cache.put("a", 0, [{"name": "A"}])
+        cache.put("b", 0, [{"name": "B"}])
+        self.assertEqual(cache.get("a", 0), (True, [{"name": "A"}]))
+        cache.put("c", 0, [{"name": "C"}])
+        # "b" is the least recently used entry.
+        self.assertEqual(cache.get("b", 0), (False, None))
+        self.assertEqual(cache.get("a", 1), (False, None))
+        self.assertFalse(cache.put("d", 0, [{"name": "D" * 4096}]))
+        time.sleep(0.06)
+        self.assertEqual(cache.get("c", 0), (False, None))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 3))
+        self.assertEqual((stats["evictions"], stats["invalidations"]), (1, 2))
+        self.assertEqual((stats["entries"], stats["bytes"]), (0, 0))
+        with self.assertRaises(ValueError):
+            ResultCache(max_entries=0)
+
+    def test_2_find_hits(self):
+        """Unit Test to test repeated finds and aggregates answered from the cache."""
+        self.contacts_db.clear_result_cache()
+        before = self.contacts_db.result_cache_stats()
+        filters = [["team", "is", "T1"]]
+        first = self.contacts_db.find("Cache_Table", filters, ["name"])
+        first[0]["name"] = "Changed"
+        second = self.contacts_db.find("Cache_Table", filters, ["name"])
+        self.assertEqual(len(second), 10)
+        self.assertEqual(second[0], {"name": "N1"})
+        self.assertEqual(self.contacts_db.count("Cache_Table", filters), 10)
+        self.assertEqual(self.contacts_db.count("Cache_Table", filters), 10)
+
+        stats = self.contacts_db.result_cache_stats()
+        self.assertEqual(stats["hits"] - before["hits"], 2)
+        self.assertEqual(stats["misses"] - before["misses"], 2)
+
+    def test_3_invalidation(self):
+        """Unit Test to test invalidation by writes of this and another connection."""
+        filters = [["team", "is", "T2"]]
+        self.assertEqual(self.contacts_db.count("Cache_Table", filters), 10)
+        self.contacts_db.find("Other_Table")
+        self.contacts_db.add("Cache_Table", {"name": "New", "team": "T2"})
+        self.assertEqual(self.contacts_db.count("Cache_Table", filters), 11)
+
+        # a write to another table keeps the results of Other_Table.
+        hits = self.contacts_db.result_cache_stats()["hits"]
+        self.contacts_db.find("Other_Table")
+        self.assertEqual(self.contacts_db.result_cache_stats()["hits"], hits + 1)
+
+        self.other_db.add("Cache_Table", {"name": "Other", "team": "T2"})
+        self.assertEqual(self.contacts_db.count("Cache_Table", filters), 12)
+
+        with self.assertRaises(RuntimeError):
+            with self.contacts_db.transaction():
+                self.contacts_db.delete("Cache_Table", 1)
+                self.assertEqual(len(self.contacts_db.find("Cache_Table")), 31)
+                raise RuntimeError("Rollback")
+
+        self.assertEqual(len(self.contacts_db.find("Cache_Table")), 32)
+
+    def test_4_disabled(self):
+        """Unit Test to test that results aren't cached without a result cache."""
+        self.assertIsNone(self.other_db.result_cache_stats())
+        self.assertIsNone(self.other_db.set_result_cache(False))
+        with self.assertRaises(TypeMismatchError):
+            self.other_db.set_result_cache("large")
+
+    def test_5_metric_names(self):
+        """Unit Test to test that aggregates differing only in metric names aren't shared."""
+        self.contacts_db.clear_result_cache()
+        self.assertEqual(
+            self.contacts_db.aggregate("Cache_Table", [], {"n": "count"}), [{"n": 32}]
+        )
+        self.assertEqual(self.contacts_db.count("Cache_Table"), 32)
+        self.assertEqual(
+            self.contacts_db.aggregate("Cache_Table", [], {"x": "count"}), [{"x": 32}]
+        )
+        self.assertEqual(
+            self.contacts_db.aggregate("Cache_Table", [], {"y": "count"}), [{"y": 32}]
+        )
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.contacts_db.close_conn()
+        self.other_db.close_conn()
+        self.temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
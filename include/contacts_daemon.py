@@ -0,0 +1,725 @@
+"""Local Daemon for the Contacts Application Database API.
+
+The daemon keeps a ContactsDBPool with warm connections and caches open and serves
+it on a Unix domain socket. Requests and responses are JSON objects, one per line:
+
+    {"op": "find", "args": ["Contacts", [["name", "is", "ABC"]]], "kwargs": {}}
+    {"ok": true, "result": [{"id": 1, "name": "ABC"}], "elapsed_ms": 0.12}
+    {"ok": false, "error": "TableError", "message": "...", "elapsed_ms": 0.05}
+
+Author: Shobhit Khinvasara
+"""
+import os
+import csv
+import json
+import time
+import socket
+import threading
+import itertools
+import socketserver
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    from .contacts_db import DatabaseError, IDError, InvalidFilterError
+    from .contacts_db import TableError, TypeMismatchError
+    from .contacts_db import read_csv_header, read_csv_records, write_csv
+    from .contacts_db_pool import ContactsDBPool
+    from .contacts_stats import latency_summary
+except ImportError:
+    from contacts_db import DatabaseError, IDError, InvalidFilterError
+    from contacts_db import TableError, TypeMismatchError
+    from contacts_db import read_csv_header, read_csv_records, write_csv
+    from contacts_db_pool import ContactsDBPool
+    from contacts_stats import latency_summary
+
+# ContactsDB methods the daemon serves.
+DAEMON_METHODS = (
+    "does_table_exist",
+    "list_tables",
+    "get_table_fields",
+    "list_indexes",
+    "get_fulltext",
+    "get_normalized_keys",
+    "find",
+    "find_page",
+    "count",
+    "aggregate",
+    "distinct",
+    "explain",
+    "create_table",
+    "delete_table",
+    "create_index",
+    "drop_index",
+    "enable_fulltext",
+    "disable_fulltext",
+    "rebuild_fulltext",
+    "enable_normalized_key",
+    "disable_normalized_key",
+    "add",
+    "add_many",
+    "update",
+    "delete",
+    "update_where",
+    "delete_where",
+    "clear_all_data",
+    "import_csv",
+    "export_csv",
+)
+
+# errors raised again by the client, others are raised as DatabaseError.
+DAEMON_ERRORS = dict(
+    (error.__name__, error)
+    for error in (
+        DatabaseError,
+        IDError,
+        InvalidFilterError,
+        TableError,
+        TypeMismatchError,
+        KeyError,
+        TypeError,
+        ValueError,
+    )
+)
+
+# number of latencies per operation kept for the stats.
+STATS_WINDOW = 1000
+
+
+def is_daemon_supported():
+    """Check if the platform has Unix domain sockets.
+
+    Returns:
+        bool: True if it has. False if not.
+    """
+    return hasattr(socket, "AF_UNIX")
+
+
+def get_socket_path(db_path):
+    """Get the socket path the daemon of a database listens on.
+
+    Args:
+        db_path (string): Path to the Database file.
+
+    Returns:
+        string: Path to the socket next to the database. Example: contacts.db -> contacts.sock
+    """
+    return os.path.splitext(db_path)[0] + ".sock"
+
+
+def connect_daemon(db_path, timeout=30.0):
+    """Connect to the daemon of a database if it is running.
+
+    Args:
+        db_path (string): Path to the Database file.
+        timeout (float, optional): Seconds to wait for a response.
+
+    Returns:
+        ContactsDBClient: Client of the daemon. NoneType if no daemon is running.
+    """
+    socket_path = get_socket_path(db_path)
+    if not is_daemon_supported() or not os.path.exists(socket_path):
+        return None
+
+    try:
+        return ContactsDBClient(socket_path, timeout)
+    except OSError:
+        return None
+
+
+def _remote_method(name):
+    """Build a client method running ContactsDB.<name> in the daemon.
+
+    Args:
+        name (string): ContactsDB method name.
+
+    Returns:
+        function: Client method.
+    """
+
+    def method(self, *args, **kwargs):
+        return self.call(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Run ContactsDB.{0} in the daemon.".format(name)
+    return method
+
+
+class ContactsDaemon(object):
+    """Daemon serving a ContactsDBPool on a Unix domain socket.
+
+    Every client connection is handled by its own thread. Reads run on the reader
+    connections of the pool and writes on its writer connection. A client can begin
+    a transaction, its operations then run on the writer connection until it ends.
+
+    Attributes:
+        db_path (string): Path to the Database file.
+        socket_path (string): Path to the Unix domain socket.
+        pool (ContactsDBPool): Connection pool.
+    """
+
+    def __init__(
+        self, db_path, socket_path=None, max_readers=4, profile="balanced", result_cache=None
+    ):
+        """Opens the pool and binds the socket.
+
+        Args:
+            db_path (string): Path to Local SQLite Database.
+            socket_path (string, optional): Path to the Unix domain socket. Defaults
+                to the database path with a .sock extension.
+            max_readers (int, optional): Maximum number of reader connections.
+            profile (str or dict, optional): Connection tuning profile.
+            result_cache (bool or dict, optional): Result cache settings of the pooled
+                connections, see ContactsDB.set_result_cache.
+        """
+        if not is_daemon_supported():
+            raise DatabaseError("Unix domain sockets aren't supported on this platform.")
+
+        self.db_path = db_path
+        self.socket_path = socket_path or get_socket_path(db_path)
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counts = {}
+        self._started = time.time()
+        self._remove_stale_socket()
+        self.pool = ContactsDBPool(
+            db_path, max_readers=max_readers, profile=profile, result_cache=result_cache
+        )
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(
+                self.socket_path, _DaemonHandler
+            )
+        except OSError:
+            self.pool.close_conn()
+            raise DatabaseError("Socket couldn't be bound: " + self.socket_path)
+
+        os.chmod(self.socket_path, 0o600)
+        self.server.daemon_threads = True
+        self.server.contacts_daemon = self
+
+    def serve_forever(self):
+        """Serve requests until shutdown is called."""
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """Stop serve_forever. Needs to be called from another thread."""
+        self.server.shutdown()
+
+    def close(self):
+        """Closes the socket and the connections of the pool."""
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        self.pool.close_conn()
+
+    def handle_request(self, line, scopes):
+        """Run a request line and build its response.
+
+        Args:
+            line (bytes): JSON request.
+            scopes (list): Transactions the client connection began, see _begin.
+
+        Returns:
+            dict: Response with ok, result or error and message, and elapsed_ms.
+        """
+        start = time.perf_counter()
+        op = None
+        try:
+            request = json.loads(line)
+            op = request["op"]
+            result = self._dispatch(
+                op, request.get("args", []), request.get("kwargs", {}), scopes
+            )
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": type(e).__name__, "message": str(e)}
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if op in DAEMON_METHODS:
+            self._record(op, elapsed_ms)
+
+        response["elapsed_ms"] = round(elapsed_ms, 3)
+        return response
+
+    def end_scopes(self, scopes):
+        """Roll back the transactions a client connection didn't end.
+
+        Args:
+            scopes (list): Transactions the client connection began.
+        """
+        while scopes:
+            self._end(scopes, False)
+
+    def stats(self):
+        """Get the latency stats of the operations served.
+
+        Returns:
+            dict: {"uptime_s": seconds, "ops": {op: {count, p50_ms, p95_ms, p99_ms, max_ms}}}
+                The percentiles are of the last STATS_WINDOW requests of every op.
+        """
+        ops = {}
+        with self._lock:
+            for op, latencies in self._latencies.items():
+                ops[op] = {"count": self._counts[op]}
+                ops[op].update(latency_summary(latencies))
+
+        return {"uptime_s": round(time.time() - self._started, 3), "ops": ops}
+
+    def _dispatch(self, op, args, kwargs, scopes):
+        """Helper Function to run an operation of a request.
+
+        Args:
+            op (string): Operation name.
+            args (list): Positional arguments.
+            kwargs (dict): Keyword arguments.
+            scopes (list): Transactions the client connection began.
+
+        Returns:
+            object: JSON serializable result.
+        """
+        if op == "ping":
+            return True
+
+        if op == "stats":
+            return self.stats()
+
+        if op == "begin":
+            return self._begin(scopes)
+
+        if op == "end":
+            return self._end(scopes, *args)
+
+        if op not in DAEMON_METHODS:
+            raise DatabaseError("Unsupported operation: " + str(op))
+
+        # the rows are sent in one response, clients page with find_page instead.
+        kwargs.pop("stream", None)
+        if kwargs.get("row_format") in ("row", "record"):
+            raise DatabaseError("Only dict and tuple rows can be sent by the daemon.")
+
+        target = scopes[-1][1] if scopes else self.pool
+        return getattr(target, op)(*args, **kwargs)
+
+    def _begin(self, scopes):
+        """Helper Function to begin a transaction, or a savepoint inside one.
+
+        The transaction holds the writer connection of the pool until it ends.
+
+        Args:
+            scopes (list): Transactions the client connection began.
+
+        Returns:
+            int: Number of open transactions and savepoints.
+        """
+        if scopes:
+            scope = scopes[-1][1].savepoint()
+        else:
+            scope = self.pool.transaction()
+
+        scopes.append((scope, scope.__enter__()))
+        return len(scopes)
+
+    def _end(self, scopes, commit=True):
+        """Helper Function to commit or roll back the last transaction or savepoint.
+
+        Args:
+            scopes (list): Transactions the client connection began.
+            commit (bool, optional): Set this to False to roll back.
+
+        Returns:
+            int: Number of open transactions and savepoints.
+        """
+        if not scopes:
+            raise DatabaseError("No transaction to end.")
+
+        scope, contacts_db = scopes.pop()
+        if commit:
+            scope.__exit__(None, None, None)
+        else:
+            error = DatabaseError("Rolled back by the client.")
+            scope.__exit__(DatabaseError, error, None)
+
+        return len(scopes)
+
+    def _record(self, op, elapsed_ms):
+        """Helper Function to record the latency of an operation.
+
+        Args:
+            op (string): Operation name.
+            elapsed_ms (float): Milliseconds the operation took.
+        """
+        with self._lock:
+            if op not in self._latencies:
+                self._latencies[op] = deque(maxlen=STATS_WINDOW)
+                self._counts[op] = 0
+
+            self._latencies[op].append(elapsed_ms)
+            self._counts[op] += 1
+
+    def _remove_stale_socket(self):
+        """Helper Function to remove the socket of a daemon that isn't running."""
+        if not os.path.exists(self.socket_path):
+            return
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+
+        raise DatabaseError("Daemon is already running on: " + self.socket_path)
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    """Request Handler of a client connection of the daemon."""
+
+    def handle(self):
+        """Answer the requests of the client until it disconnects."""
+        contacts_daemon = self.server.contacts_daemon
+        scopes = []
+        try:
+            for line in self.rfile:
+                response = contacts_daemon.handle_request(line, scopes)
+                self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+        finally:
+            contacts_daemon.end_scopes(scopes)
+
+
+class ContactsDBClient(object):
+    """Client of a ContactsDaemon with the same methods as ContactsDB.
+
+    Attributes:
+        socket_path (string): Path to the Unix domain socket.
+        timeout (float): Seconds to wait for a response.
+        last_elapsed_ms (float): Milliseconds the daemon took for the last request.
+    """
+
+    def __init__(self, socket_path, timeout=30.0):
+        """Connects to the daemon.
+
+        Args:
+            socket_path (string): Path to the Unix domain socket.
+            timeout (float, optional): Seconds to wait for a response.
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.last_elapsed_ms = None
+        self._depth = 0
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(socket_path)
+        except OSError:
+            self._sock.close()
+            raise
+
+        self._file = self._sock.makefile("rwb")
+
+    def call(self, op, *args, **kwargs):
+        """Run an operation in the daemon.
+
+        Args:
+            op (string): Operation name.
+            *args: Positional arguments.
+            **kwargs: Keyword arguments.
+
+        Returns:
+            object: Result of the operation.
+        """
+        request = {"op": op, "args": args, "kwargs": kwargs}
+        try:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        except OSError:
+            raise DatabaseError("Daemon connection failed: " + self.socket_path)
+
+        if not line:
+            raise DatabaseError("Daemon closed the connection: " + self.socket_path)
+
+        response = json.loads(line)
+        self.last_elapsed_ms = response.get("elapsed_ms")
+        if not response["ok"]:
+            error = DAEMON_ERRORS.get(response["error"], DatabaseError)
+            raise error(response["message"])
+
+        return response["result"]
+
+    def find(self, *args, **kwargs):
+        """Run ContactsDB.find in the daemon.
+
+        With stream=True the rows are fetched by iter_find.
+        """
+        if kwargs.pop("stream", False):
+            return self.iter_find(*args, **kwargs)
+
+        return self.call("find", *args, **kwargs)
+
+    def iter_find(
+        self,
+        table_name,
+        filters=[],
+        fields=[],
+        operator="AND",
+        batch_size=1000,
+        order_by=None,
+        limit=None,
+        offset=None,
+        after=None,
+        row_format="dict",
+    ):
+        """Find records in the daemon and yield them one page at a time.
+
+        The pages are fetched with find_page so the daemon never holds a cursor for
+        the client. With a limit or offset the records are fetched by one find.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list, optional): List of filters, see ContactsDB.find.
+            fields (list, optional): List of fields.
+            operator (str, optional): Operator for filters.
+            batch_size (int, optional): Number of records fetched at a time.
+            order_by (list, optional): List of fields to sort by.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            after (str, optional): Continuation token returned by find_page.
+            row_format (str, optional): "dict" or "tuple", see ContactsDB.find.
+
+        Returns:
+            iterator: Iterator of dicts with {field:value} for every record found, or
+                tuples of the values.
+        """
+        if limit is not None or offset is not None:
+            records = self.call(
+                "find",
+                table_name,
+                filters,
+                fields,
+                operator,
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+                after=after,
+                row_format=row_format,
+            )
+            return iter(records if row_format == "dict" else map(tuple, records))
+
+        records = self._iter_pages(
+            table_name, filters, fields, operator, batch_size, order_by, after
+        )
+        if row_format == "dict":
+            return records
+
+        if row_format != "tuple":
+            raise DatabaseError("Only dict and tuple rows can be sent by the daemon.")
+
+        return (tuple(record.values()) for record in records)
+
+    def find_page(self, *args, **kwargs):
+        """Run ContactsDB.find_page in the daemon.
+
+        Returns:
+            tuple: (records, token) see ContactsDB.find_page.
+        """
+        records, token = self.call("find_page", *args, **kwargs)
+        return records, token
+
+    def add_many(self, *args, **kwargs):
+        """Run ContactsDB.add_many in the daemon.
+
+        Returns:
+            tuple: (inserted, rejected) see ContactsDB.add_many.
+        """
+        inserted, rejected = self.call("add_many", *args, **kwargs)
+        return inserted, [tuple(reject) for reject in rejected]
+
+    def import_csv(self, table_name, csv_file, batch_size=1000, delimiter=","):
+        """Run ContactsDB.import_csv in the daemon.
+
+        The daemon opens a path itself. A file object, like stdin, is read by the
+        client and its rows are sent batch_size at a time with add_many.
+
+        Returns:
+            tuple: (inserted, rejected) see ContactsDB.import_csv.
+        """
+        if isinstance(csv_file, str):
+            inserted, rejected = self.call(
+                "import_csv", table_name, self._csv_path(csv_file), batch_size, delimiter
+            )
+            return inserted, [tuple(reject) for reject in rejected]
+
+        if not self.does_table_exist(table_name):
+            raise TableError("Table " + table_name + " does not exist.")
+
+        all_fields = self.get_table_fields(table_name)
+        reader = csv.reader(csv_file, delimiter=delimiter)
+        columns = read_csv_header(reader, all_fields, table_name)
+        records = read_csv_records(reader, columns, all_fields)
+        inserted = 0
+        rejected = []
+        row = 0
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            count, batch_rejected = self.add_many(table_name, batch, batch_size)
+            inserted += count
+            rejected.extend((row + index + 1, reason) for index, reason in batch_rejected)
+            row += len(batch)
+
+        return inserted, rejected
+
+    def export_csv(
+        self,
+        table_name,
+        csv_file,
+        filters=[],
+        fields=[],
+        operator="AND",
+        order_by=None,
+        batch_size=1000,
+        delimiter=",",
+    ):
+        """Run ContactsDB.export_csv in the daemon.
+
+        The daemon opens a path itself. A file object, like stdout, is written by
+        the client from the rows of iter_find.
+
+        Returns:
+            int: Number of records written, see ContactsDB.export_csv.
+        """
+        if isinstance(csv_file, str):
+            return self.call(
+                "export_csv",
+                table_name,
+                self._csv_path(csv_file),
+                filters,
+                fields,
+                operator,
+                order_by,
+                batch_size,
+                delimiter,
+            )
+
+        rows = self.iter_find(
+            table_name,
+            filters,
+            fields,
+            operator,
+            batch_size,
+            order_by=order_by,
+            row_format="tuple",
+        )
+        header = list(fields) or list(self.get_table_fields(table_name).keys())
+        return write_csv(csv_file, header, rows, delimiter)
+
+    @contextmanager
+    def transaction(self):
+        """Run several operations in one transaction in the daemon.
+
+        The daemon holds its writer connection for the client until the block ends.
+        Nested transactions are savepoints.
+
+        Yields:
+            ContactsDBClient: This Client.
+        """
+        self.call("begin")
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            self.call("end", False)
+            raise
+
+        self._depth -= 1
+        self.call("end", True)
+
+    savepoint = transaction
+
+    def in_transaction(self):
+        """Check if a transaction or savepoint block is running.
+
+        Returns:
+            bool: True if it is. False if not.
+        """
+        return self._depth > 0
+
+    def stats(self):
+        """Get the latency stats of the daemon, see ContactsDaemon.stats.
+
+        Returns:
+            dict: Latency stats.
+        """
+        return self.call("stats")
+
+    def close_conn(self):
+        """Closes the connection to the daemon."""
+        try:
+            self._file.close()
+        finally:
+            self._sock.close()
+
+    does_table_exist = _remote_method("does_table_exist")
+    list_tables = _remote_method("list_tables")
+    get_table_fields = _remote_method("get_table_fields")
+    list_indexes = _remote_method("list_indexes")
+    get_fulltext = _remote_method("get_fulltext")
+    get_normalized_keys = _remote_method("get_normalized_keys")
+    count = _remote_method("count")
+    aggregate = _remote_method("aggregate")
+    distinct = _remote_method("distinct")
+    explain = _remote_method("explain")
+
+    create_table = _remote_method("create_table")
+    delete_table = _remote_method("delete_table")
+    create_index = _remote_method("create_index")
+    drop_index = _remote_method("drop_index")
+    enable_fulltext = _remote_method("enable_fulltext")
+    disable_fulltext = _remote_method("disable_fulltext")
+    rebuild_fulltext = _remote_method("rebuild_fulltext")
+    enable_normalized_key = _remote_method("enable_normalized_key")
+    disable_normalized_key = _remote_method("disable_normalized_key")
+    add = _remote_method("add")
+    update = _remote_method("update")
+    delete = _remote_method("delete")
+    update_where = _remote_method("update_where")
+    delete_where = _remote_method("delete_where")
+    clear_all_data = _remote_method("clear_all_data")
+
+    def _csv_path(self, csv_file):
+        """Helper Function to get the absolute path of a CSV file for the daemon.
+
+        Args:
+            csv_file (str): Path to the CSV file.
+
+        Returns:
+            string: Absolute path.
+        """
+        return os.path.abspath(csv_file)
+
+    def _iter_pages(self, table_name, filters, fields, operator, batch_size, order_by, after):
+        """Helper Function to yield the records of find_page until the last page.
+
+        Yields:
+            dict: Dictionary with {field:value}
+        """
+        token = after
+        while True:
+            records, token = self.find_page(
+                table_name,
+                filters,
+                fields,
+                operator,
+                order_by=order_by,
+                limit=batch_size,
+                after=token,
+            )
+            yield from records
+            if not token:
+                return
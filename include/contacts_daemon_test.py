@@ -0,0 +1,94 @@
+"""Unit Test for the Contacts Database Daemon
+
+Author: Shobhit Khinvasara
+"""
+import os
+import tempfile
+import threading
+import unittest
+import contacts_daemon
+from contacts_daemon import ContactsDaemon, connect_daemon
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+@unittest.skipUnless(
+    contacts_daemon.is_daemon_supported(), "Unix domain sockets aren't supported."
+)
+class TestContactsDaemon(unittest.TestCase):
+
+    """Unit Test Class for testing the daemon and its client.
+
+    Attributes:
+        daemon (ContactsDaemon): Daemon serving the database.
+        client (ContactsDBClient): Client of the daemon.
+        temp_dir (TemporaryDirectory): Temporary directory holding the database.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "contacts.db")
+        self.daemon = ContactsDaemon(self.db_path, max_readers=2)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.client = connect_daemon(self.db_path)
+
+    def test_1_forward_operations(self):
+        """Unit Test to test operations forwarded to the daemon."""
+        self.assertEqual(connect_daemon(os.path.join(self.temp_dir.name, "x.db")), None)
+        self.client.create_table("Daemon_Table", {"name": "text", "age": "integer"})
+        self.client.add("Daemon_Table", {"name": "abc", "age": 20})
+        self.client.add_many("Daemon_Table", [{"name": "def", "age": 30}])
+        self.assertEqual(self.client.does_table_exist("Daemon_Table"), True)
+        result = self.client.find("Daemon_Table", [["age", "greater_than", 25]], ["name"])
+        self.assertEqual(result, [{"name": "def"}])
+        rows = self.client.find("Daemon_Table", fields=["name"], stream=True, batch_size=1)
+        self.assertEqual([row["name"] for row in rows], ["abc", "def"])
+
+    def test_2_errors(self):
+        """Unit Test to test that errors of the daemon are raised by the client."""
+        with self.assertRaises(contacts_daemon.TableError):
+            self.client.find("Missing_Table")
+
+        with self.assertRaises(contacts_daemon.DatabaseError):
+            self.client.call("close_conn")
+
+    def test_3_transaction(self):
+        """Unit Test to test transactions and savepoints held by a client."""
+        with self.assertRaises(ValueError):
+            with self.client.transaction():
+                self.client.add("Daemon_Table", {"name": "ghi", "age": 40})
+                raise ValueError("rollback")
+
+        with self.client.transaction():
+            self.client.add("Daemon_Table", {"name": "jkl", "age": 50})
+            try:
+                with self.client.savepoint():
+                    self.client.add("Daemon_Table", {"name": "mno", "age": 60})
+                    raise ValueError("rollback")
+            except ValueError:
+                pass
+
+        names = [row["name"] for row in self.client.find("Daemon_Table")]
+        self.assertEqual(names, ["abc", "def", "jkl"])
+
+    def test_4_stats(self):
+        """Unit Test to test the latency stats of the daemon."""
+        stats = self.client.stats()
+        self.assertEqual(stats["ops"]["add"]["count"], 4)
+        self.assertLessEqual(stats["ops"]["find"]["p50_ms"], stats["ops"]["find"]["max_ms"])
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.client.close_conn()
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.close()
+        self.temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
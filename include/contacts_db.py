@@ -2,11 +2,26 @@
 
 Author: Shobhit Khinvasara
 """
+import base64
+import csv
+import itertools
+import json
 import os
+import re
 import sqlite3 as sl
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from functools import partial, wraps
+from operator import itemgetter
 from pprint import pprint
+import time
 import traceback
 
+try:
+    from .contacts_cache import ResultCache
+except ImportError:
+    from contacts_cache import ResultCache
+
 
 class TypeMismatchError(Exception):
     """Error Class for Type Mismatch for filters or data."""
@@ -38,35 +53,628 @@ class DatabaseError(Exception):
     pass
 
 
+def _prefix_upper_bound(prefix):
+    """Get the smallest value sorted after every text starting with a prefix.
+
+    A blob is returned if there is none, SQLite sorts every text before any blob.
+    """
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return b""
+
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# Supported filter conditions mapped to (SQL condition, parameter template).
+# The template turns the filter value into the bound parameter, None binds it as it is.
+# Conditions with several parameters have a tuple of templates, one per parameter.
+# starts_with is a range instead of a LIKE so it can use an index, it is case sensitive.
+STRING_CONDITIONS = {
+    "is": ("{0} = ?", None),
+    "is_not": ("NOT ({0} = ?)", None),
+    "contains": ("{0} LIKE ?", "%{}%".format),
+    "does_not_contain": ("NOT ({0} LIKE ?)", "%{}%".format),
+    "starts_with": ("({0} >= ? AND {0} < ?)", (None, _prefix_upper_bound)),
+}
+
+INTEGER_CONDITIONS = {
+    "less_than": ("{0} < ?", None),
+    "less_than_equal": ("{0} <= ?", None),
+    "greater_than": ("{0} > ?", None),
+    "greater_than_equal": ("{0} >= ?", None),
+    "equals": ("{0} = ?", None),
+    "not_equal": ("{0} != ?", None),
+}
+
+# Supported filter conditions with a list of Text or Integer values mapped to
+# (SQL condition, number of values). None allows any number of values.
+LIST_CONDITIONS = {
+    "in": ("{0} IN ({1})", None),
+    "not_in": ("NOT ({0} IN ({1}))", None),
+    "between": ("{0} BETWEEN ? AND ?", 2),
+}
+
+# Filter groups, {"and": [filters..]}, {"or": [filters..]} and {"not": filter}, mapped
+# to their SQL operator. Groups nest, and filters in lists can be filters or groups.
+FILTER_GROUPS = {"and": "AND", "or": "OR", "not": "NOT"}
+
+# Filter conditions an index can serve, used for the index advice of explain.
+# Advised indexes list the equality fields first, then one range field.
+INDEX_EQUALITY_CONDITIONS = ("is", "equals", "in")
+INDEX_RANGE_CONDITIONS = (
+    "less_than",
+    "less_than_equal",
+    "greater_than",
+    "greater_than_equal",
+    "between",
+    "starts_with",
+)
+
+# Tables with at least this many rows are large, explain warns about full scans of them.
+FULL_SCAN_ROWS = 10000
+
+# Number of slow queries kept in ContactsDB.slow_queries.
+SLOW_QUERY_LOG_SIZE = 100
+
+# Maximum number of ids per chunk of delete_where. Every chunk is its own transaction.
+DELETE_CHUNK_SIZE = 10000
+
+# Supported row formats of find results.
+# "dict": {field:value} dict, "tuple": tuple of values in the order of the fields,
+# "row": sqlite3.Row read straight from the cursor, indexable by position and field,
+# "record": instance of a namedtuple class generated for the fields of the query.
+ROW_FORMATS = ("dict", "tuple", "row", "record")
+
+# Supported aggregate functions of aggregate metrics.
+AGGREGATE_FUNCTIONS = {
+    "count": "COUNT({0})",
+    "count_distinct": "COUNT(DISTINCT {0})",
+    "sum": "SUM({0})",
+    "avg": "AVG({0})",
+    "min": "MIN({0})",
+    "max": "MAX({0})",
+}
+
+# Methods timed by set_instrumentation mapped to the phase they are counted in when
+# they run inside another operation. Public methods called on their own are timed
+# as operations. See contacts_stats.PHASES.
+INSTRUMENTED_METHODS = {
+    "create_table": None,
+    "delete_table": None,
+    "create_index": None,
+    "drop_index": None,
+    "list_indexes": None,
+    "add": None,
+    "add_many": None,
+    "import_csv": None,
+    "find": None,
+    "iter_find": None,
+    "find_page": None,
+    "count": None,
+    "aggregate": None,
+    "distinct": None,
+    "explain": None,
+    "export_csv": None,
+    "enable_fulltext": None,
+    "disable_fulltext": None,
+    "rebuild_fulltext": None,
+    "enable_normalized_key": None,
+    "disable_normalized_key": None,
+    "update": None,
+    "delete": None,
+    "update_where": None,
+    "delete_where": None,
+    "clear_all_data": None,
+    "does_table_exist": "schema",
+    "list_tables": "schema",
+    "get_table_fields": "schema",
+    "get_fulltext": "schema",
+    "get_normalized_keys": "schema",
+    "_check_schema_version": "schema",
+    "_compile_find": "compile",
+    "_compile_aggregate": "compile",
+    "_compile_where": "compile",
+    "_execute": "execute",
+    "_materialize": "materialize",
+    "_commit": "commit",
+}
+
+# Conditions routed to the full-text index of tables with full-text search enabled.
+FULLTEXT_CONDITIONS = {
+    "contains": "(id IN (SELECT rowid FROM {1} WHERE {1} MATCH ?))",
+    "does_not_contain": (
+        "({0} IS NOT NULL AND id NOT IN (SELECT rowid FROM {1} WHERE {1} MATCH ?))"
+    ),
+}
+
+# Tokenizers supported by enable_fulltext. "unicode61" matches whole words and word
+# prefixes, "trigram" matches any substring of at least 3 characters.
+FULLTEXT_TOKENIZERS = ["unicode61", "trigram"]
+
+# Characters removed from phone numbers in their normalized key.
+PHONE_SEPARATORS = " -().+/"
+
+
+def _phone_key(value):
+    """Get the normalized key of a phone number, without its PHONE_SEPARATORS."""
+    return value.translate(_PHONE_KEY_TABLE)
+
+
+def _email_key(value):
+    """Get the normalized key of an email address, trimmed and ASCII lowercased."""
+    return value.strip(" ").translate(_EMAIL_KEY_TABLE)
+
+
+_PHONE_KEY_TABLE = str.maketrans("", "", PHONE_SEPARATORS)
+_EMAIL_KEY_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+)
+
+# Normalized key types mapped to (SQL expression, key function). The expression
+# computes the key column of a field in SQLite, the function the same key of a
+# filter value in Python. Both need to agree, and the expression needs no custom
+# SQL functions so the database stays usable from other SQLite clients.
+NORMALIZED_KEY_TYPES = {
+    "phone": (
+        "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE("
+        "{0}, ' ', ''), '-', ''), '(', ''), ')', ''), '.', ''), '+', ''), '/', '')",
+        _phone_key,
+    ),
+    "email": ("LOWER(TRIM({0}))", _email_key),
+}
+
+# Name of the key column of a normalized field, formatted with the field and key type.
+NORMALIZED_KEY_COLUMN = "{0}__{1}_key"
+
+# Filter conditions on normalized fields compared against the key column.
+NORMALIZED_KEY_CONDITIONS = ("is", "is_not", "starts_with", "in", "not_in")
+
+# Named connection tuning profiles mapped to the PRAGMAs set at connect time.
+# "durable" survives power loss after every commit, "balanced" can lose the last
+# commits on power loss but never corrupts, "bulk-load" trades durability for speed
+# while loading data that can be loaded again.
+PERFORMANCE_PROFILES = {
+    "durable": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "balanced": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+    "bulk-load": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+    },
+}
+
+def _has_token(value):
+    """Check if a value has a letter or digit, which the unicode61 tokenizer keeps.
+
+    Values without one are an empty MATCH phrase, which matches nothing.
+
+    Args:
+        value (str): Filter value.
+
+    Returns:
+        bool: True if it does. False if not.
+    """
+    return re.search(r"[^\W_]", value) is not None
+
+
+def _schema_operation(method):
+    """Decorator checking the schema version once at the start of an operation.
+
+    The schema lookups of the operation, and of the operations it calls, then
+    reuse the cached schema without asking SQLite again.
+
+    Args:
+        method (function): ContactsDB method.
+
+    Returns:
+        function: Wrapped method.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._operation_depth:
+            return method(self, *args, **kwargs)
+
+        try:
+            self._check_schema_version()
+        except sl.Error:
+            # the operation reports an unusable connection its own way.
+            pass
+
+        self._operation_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._operation_depth -= 1
+
+    return wrapper
+
+
+def validate_data(all_fields, data):
+    """Validate a data record against the table fields with the rules of add.
+
+    Args:
+        all_fields (dict): Dictionary where key is field name and value is data_type
+        data (dict): Dictionary containing {field:value}
+
+    Returns:
+        tuple: Field names of the record which exist in the table.
+
+    Raises:
+        TypeMismatchError: If data isn't a dict or a value doesn't fit its field.
+        IDError: If data sets the id field.
+    """
+    if not isinstance(data, dict):
+        raise TypeMismatchError(
+            "Invalid type of data arg. data arg needs to be a dict type."
+        )
+
+    if "id" in data.keys():
+        raise IDError("ID field is immutable and cannot be set by user.")
+
+    keys = []
+    for key, val in data.items():
+        if key not in all_fields.keys():
+            continue
+
+        if isinstance(val, str):
+            # check if type is string but acceptable type is integer.
+            if all_fields[key] == "INTEGER":
+                raise TypeMismatchError("Invalid data type for:" + key + ":" + val)
+
+        elif isinstance(val, int):
+            # check if type is integer but acceptable type is string.
+            if all_fields[key] == "TEXT":
+                raise TypeMismatchError("Invalid data type for:" + key + ":" + str(val))
+
+        else:
+            raise TypeMismatchError("Unsupported data type for:" + key)
+
+        keys.append(key)
+
+    return tuple(keys)
+
+
+def read_csv_header(reader, all_fields, table_name):
+    """Map the columns of a CSV header row to the table fields by name.
+
+    Columns that aren't fields and the id column are left out.
+
+    Args:
+        reader (csv.reader): Reader positioned at the header row.
+        all_fields (dict): Dictionary where key is field name and value is data_type
+        table_name (string): Table Name.
+
+    Returns:
+        list: List of (position, field) of the mapped columns.
+
+    Raises:
+        TableError: If no column is a field of the table.
+    """
+    header = next(reader, None) or []
+    if header:
+        # the byte order mark of a file object that wasn't opened with utf-8-sig.
+        header[0] = header[0].lstrip("\ufeff")
+
+    columns = [
+        (position, name.strip())
+        for position, name in enumerate(header)
+        if name.strip() in all_fields and name.strip() != "id"
+    ]
+    if not columns:
+        raise TableError("No column of the CSV file is a field of " + table_name)
+
+    return columns
+
+
+def read_csv_records(reader, columns, all_fields):
+    """Convert CSV rows into records for add_many.
+
+    Empty cells are left out of the record. Cells of Integer fields which aren't
+    valid integers are kept as text, so add_many rejects their row with a type
+    mismatch.
+
+    Args:
+        reader (csv.reader): Reader positioned after the header.
+        columns (list): List of (position, field) of the mapped columns.
+        all_fields (dict): Dictionary where key is field name and value is data_type
+
+    Yields:
+        dict: Dictionary with {field:value}
+    """
+    for row in reader:
+        record = {}
+        for position, field in columns:
+            value = row[position] if position < len(row) else ""
+            if value == "":
+                continue
+
+            if all_fields[field] == "INTEGER":
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+
+            record[field] = value
+
+        yield record
+
+
+def write_csv(csv_file, header, rows, delimiter=","):
+    """Write a header and rows to a CSV file.
+
+    Args:
+        csv_file (file): File object opened for writing.
+        header (list): List of field names.
+        rows (iterable): Iterable of tuples of the values.
+        delimiter (str, optional): Delimiter of the columns.
+
+    Returns:
+        int: Number of rows written.
+    """
+    writer = csv.writer(csv_file, delimiter=delimiter)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+
+    return count
+
+
 class ContactsDB(object):
     """Contact Application Database API.
 
     Attributes:
+        STATEMENT_CACHE_SIZE (int): Number of compiled find statements memoized, also
+            used as the size of SQLite's prepared statement cache.
         conn (SQLite Connection Object): Database Connection Object
         db_path (string): Path to the Database file.
+        profile (str or dict): Connection tuning profile in use. None for SQLite defaults.
+        schema_check_interval (float): Seconds between checks of the schema version
+            used to notice schema changes made by other connections. 0 checks it once
+            per operation.
+        result_cache (ResultCache): Cache of find and aggregate results. None if
+            results aren't cached.
+        instrumentation (Instrumentation): Instrumentation timing the operations.
+            None if they aren't timed.
+        slow_query_ms (float): Milliseconds after which a find or aggregate is logged
+            with its query plan. None if slow queries aren't logged.
+        slow_query_sink (function): Callable every slow query is passed to.
+        slow_queries (deque): Last SLOW_QUERY_LOG_SIZE slow queries, see set_slow_query_log.
     """
 
-    def __init__(self, db_path):
+    STATEMENT_CACHE_SIZE = 256
+
+    def __init__(
+        self,
+        db_path,
+        schema_check_interval=0.0,
+        profile=None,
+        check_same_thread=True,
+        result_cache=None,
+        instrumentation=None,
+    ):
         """Initializes Database.
 
         This is either by creating a new SQLite Database file or using an existing one.
 
         Args:
             db_path (string): Path to Local SQLite Database.
+            schema_check_interval (float, optional): Seconds between checks of
+                PRAGMA schema_version. Defaults to 0, checking it once at the start
+                of every operation. Missing tables are always re-checked, so a longer
+                interval only delays noticing changed or recreated tables.
+            profile (str, optional): Connection tuning profile applied at connect time.
+                Supported profiles are "durable", "balanced" and "bulk-load", see
+                set_profile. SQLite defaults are kept if not set.
+            check_same_thread (bool, optional): Set this to False to allow handing the
+                connection over to another thread. It must still only be used by one
+                thread at a time, see ContactsDBPool.
+            result_cache (bool or dict, optional): Set this to cache find and
+                aggregate results, see set_result_cache.
+            instrumentation (Instrumentation, optional): Set this to time the
+                operations, see set_instrumentation.
         """
         if db_path != ":memory:":
             if not os.path.isdir(os.path.dirname(db_path)):
                 os.makedirs(os.path.dirname(db_path))
 
         self.db_path = db_path
+        self.schema_check_interval = schema_check_interval
+        self._table_names = None
+        self._table_fields = {}
+        self._fulltext = {}
+        self._normalized_keys = {}
+        self._schema_version = None
+        self._schema_checked = 0.0
+        self._operation_depth = 0
+        self._compiled_queries = OrderedDict()
+        self._record_classes = OrderedDict()
+        self._transaction_depth = 0
+        self._savepoint_count = 0
+        self._write_counts = {}
+        self._data_version = None
+        self.result_cache = None
+        self.instrumentation = None
+        self._trace = None
+        self.slow_query_ms = None
+        self.slow_query_sink = None
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
         try:
-            self.conn = sl.connect(db_path)
+            self.conn = sl.connect(
+                db_path,
+                cached_statements=self.STATEMENT_CACHE_SIZE,
+                check_same_thread=check_same_thread,
+            )
             self.conn.row_factory = sl.Row
         except:
             traceback.print_exc()
             raise DatabaseError("Database couldn't be initialized.")
 
-    def create_table(self, table_name, fields):
+        self.profile = None
+        if profile:
+            self.set_profile(profile)
+
+        if result_cache:
+            self.set_result_cache(result_cache)
+
+        if instrumentation is not None:
+            self.set_instrumentation(instrumentation)
+
+    def set_profile(self, profile):
+        """Apply a connection tuning profile.
+
+        Profiles set journal_mode, synchronous, cache_size, mmap_size, temp_store and
+        busy_timeout. They can be switched at any time, e.g. to "bulk-load" before a
+        large import and back to "balanced" after it.
+
+        Args:
+            profile (str or dict): Name of a profile in PERFORMANCE_PROFILES or a dict
+                of {pragma:value} for a custom profile.
+
+        Returns:
+            dict: Dictionary of {pragma:value} as reported by SQLite after applying it.
+        """
+        if isinstance(profile, dict):
+            pragmas = profile
+        elif profile in PERFORMANCE_PROFILES:
+            pragmas = PERFORMANCE_PROFILES[profile]
+        else:
+            raise DatabaseError("Unsupported performance profile: " + str(profile))
+
+        result = {}
+        for pragma, value in pragmas.items():
+            if pragma not in PERFORMANCE_PROFILES["balanced"]:
+                raise DatabaseError("Unsupported profile pragma: " + str(pragma))
+
+            if self.conn.in_transaction and pragma == "journal_mode":
+                # the journal mode can't be changed inside a transaction.
+                continue
+
+            sql_command = "PRAGMA {0}={1};".format(pragma, value)
+            try:
+                self._execute(self.conn, sql_command)
+                row = self.conn.execute("PRAGMA {0};".format(pragma)).fetchone()
+                # some pragmas report nothing, e.g. mmap_size for in-memory databases.
+                result[pragma] = row[0] if row else None
+            except sl.Error:
+                print("Database Operation Failed:", sql_command)
+                raise DatabaseError("Profile couldn't be applied: " + str(profile))
+
+        self.profile = profile
+        return result
+
+    def set_result_cache(self, result_cache=True):
+        """Enable, resize or disable the cache of find and aggregate results.
+
+        Results are keyed by the compiled statement and its parameters, so the same
+        table, filters, fields, operator and sorting hit the same entry. A result is
+        invalidated when its table is written through this object, and all results
+        are dropped when PRAGMA data_version reports a commit of another connection
+        or process. Writes made through self.conn directly need clear_result_cache.
+
+        Args:
+            result_cache (bool or dict, optional): True for the default limits, a dict
+                of ResultCache arguments (max_entries, max_bytes and ttl) for custom
+                limits, False to disable the cache.
+
+        Returns:
+            ResultCache: The cache. None if it is disabled.
+        """
+        if not result_cache:
+            self.result_cache = None
+        elif result_cache is True:
+            self.result_cache = ResultCache()
+        elif isinstance(result_cache, dict):
+            self.result_cache = ResultCache(**result_cache)
+        else:
+            raise TypeMismatchError("result_cache needs to be a bool or a dict.")
+
+        self._data_version = None
+        return self.result_cache
+
+    def set_instrumentation(self, instrumentation):
+        """Time the operations of this database, or stop timing them.
+
+        Every call of a public method is one operation. Its time is split into the
+        schema, compile, execute, materialize and commit phases, and emitted with
+        its row count and statements to the sinks of the instrumentation. iter_find
+        is timed until its generator is returned. The methods in
+        INSTRUMENTED_METHODS are replaced on this object only, so databases without
+        instrumentation don't pay for it.
+
+        Example:
+            histogram = HistogramSink()
+            contacts_db.set_instrumentation(Instrumentation([histogram]))
+
+        Args:
+            instrumentation (Instrumentation): Instrumentation, see contacts_stats.
+                None to stop timing.
+        """
+        for name, phase in INSTRUMENTED_METHODS.items():
+            if instrumentation is None:
+                self.__dict__.pop(name, None)
+            else:
+                setattr(self, name, instrumentation.wrap(self, name, phase))
+
+        self.instrumentation = instrumentation
+        self._trace = None
+
+    def set_slow_query_log(self, threshold_ms, sink=None):
+        """Log finds and aggregates slower than a threshold together with their plan.
+
+        Slow queries are explained right after they ran, see explain, and appended to
+        slow_queries as dicts with the keys of explain and "op", "table", "ms" and
+        "time". Finds answered by the result cache and iter_find aren't timed.
+
+        Args:
+            threshold_ms (float): Milliseconds a query needs to take to be logged.
+                None to stop logging.
+            sink (function, optional): Callable every slow query is passed to as well,
+                e.g. a JsonLinesSink.
+        """
+        if threshold_ms is not None and threshold_ms < 0:
+            raise ValueError("threshold_ms needs to be a positive number.")
+
+        self.slow_query_ms = threshold_ms
+        self.slow_query_sink = sink
+
+    def clear_result_cache(self):
+        """Drop all cached results."""
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def result_cache_stats(self):
+        """Get hit and miss counters and the size of the result cache.
+
+        Returns:
+            dict: Dictionary of counters, see ResultCache.stats. None if results
+                aren't cached.
+        """
+        if self.result_cache is None:
+            return None
+
+        return self.result_cache.stats()
+
+    def create_table(self, table_name, fields, indexes=None):
         """This will create table <table_name> of specified fields.
 
         An Int type ID field will always be created by default.
@@ -75,6 +683,10 @@ class ContactsDB(object):
             table_name (string): Table Name.
             fields (dict): Dictionary where key is the field name and value is field type.
                             Supported field-type values are (Text, Integer).
+            indexes (list, optional): Indexes created along with the table. Every index
+                is either a list of fields or a dict with "fields" and optional
+                "unique" and "name" keys.
+                Example: [["email"], {"fields": ["phone_number"], "unique": True}]
 
         Returns:
             bool: True if Successful. False if not.
@@ -84,7 +696,7 @@ class ContactsDB(object):
         for key, val in fields.items():
             upper_val = val.upper()
             if upper_val not in ["TEXT", "INTEGER"]:
-                self.close_conn()
+                self._close_on_error()
                 raise TypeMismatchError(
                     "Invalid Data type for Field: " + key + ":" + upper_val
                 )
@@ -93,17 +705,41 @@ class ContactsDB(object):
 
         tables = self.list_tables()
         if table_name in tables:
-            self.close_conn()
+            self._close_on_error()
             raise TableError("Table:", table_name, "already exists.")
 
+        index_commands = []
+        all_fields = ["id"] + list(fields.keys())
+        for index in indexes or []:
+            if isinstance(index, dict):
+                index_commands.append(
+                    self._index_sql(
+                        table_name,
+                        all_fields,
+                        index.get("fields", []),
+                        index.get("unique", False),
+                        index.get("name"),
+                    )[1]
+                )
+            else:
+                index_commands.append(
+                    self._index_sql(table_name, all_fields, index, False, None)[1]
+                )
+
         sql_command = """CREATE TABLE {0} ({1});""".format(table_name, fields_str)
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            # create the table and its indexes atomically.
+            with self.savepoint():
+                self._execute(self.conn, sql_command)
+                for index_command in index_commands:
+                    sql_command = index_command
+                    self._execute(self.conn, sql_command)
+
+            self.clear_schema_cache()
             return True
         except:
             print("Database Operation Failed:", sql_command)
-            self.close_conn()
+            self._close_on_error()
             return False
 
     def delete_table(self, table_name):
@@ -118,44 +754,202 @@ class ContactsDB(object):
         """
         tables = self.list_tables()
         if table_name not in tables:
-            self.close_conn()
+            self._close_on_error()
             raise TableError("Table:" + table_name + " not found.")
 
         sql_command = "DROP TABLE " + table_name
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            # the full-text table isn't dropped along with its content table.
+            if self.get_fulltext(table_name):
+                self.conn.execute("DROP TABLE " + table_name + "_fts;")
+
+            self._execute(self.conn, sql_command)
+            self._commit()
+            self.clear_schema_cache()
+            return True
+        except:
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def create_index(self, table_name, fields, unique=False, index_name=None):
+        """Create an index on one or more fields of the table.
+
+        Filters on indexed fields (is, equals, ranges) are looked up in O(log n)
+        instead of scanning the whole table. Composite indexes also serve filters on
+        their leading fields.
+
+        Args:
+            table_name (string): Table Name.
+            fields (list): List of fields in index order. Example: ["name", "phone_number"]
+            unique (bool, optional): Set this to reject records with duplicate values.
+            index_name (string, optional): Index Name. Defaults to idx_<table>_<fields>.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if not self.does_table_exist(table_name):
+            self._close_on_error()
+            raise TableError("Table " + table_name + " does not exist.")
+
+        all_fields = self.get_table_fields(table_name)
+        index_name, sql_command = self._index_sql(
+            table_name, list(all_fields.keys()), fields, unique, index_name
+        )
+        if index_name in [index["name"] for index in self.list_indexes()]:
+            self._close_on_error()
+            raise TableError("Index: " + index_name + " already exists.")
+
+        try:
+            self._execute(self.conn, sql_command)
+            self._commit()
+            self.clear_schema_cache()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    def drop_index(self, index_name):
+        """Remove index <index_name> if exists.
+
+        Args:
+            index_name (string): Index Name.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if index_name not in [index["name"] for index in self.list_indexes()]:
+            self._close_on_error()
+            raise TableError("Index: " + index_name + " not found.")
+
+        sql_command = "DROP INDEX " + index_name + ";"
+        try:
+            self._execute(self.conn, sql_command)
+            self._commit()
+            self.clear_schema_cache()
             return True
         except:
-            self.close_conn()
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
             return False
 
+    @_schema_operation
+    def list_indexes(self, table_name=None):
+        """List the indexes created on tables of the Database.
+
+        Indexes SQLite creates internally for UNIQUE constraints are not listed.
+
+        Args:
+            table_name (string, optional): Table Name. Lists indexes of all tables if not set.
+
+        Returns:
+            list: List of dicts with "name", "table", "fields" and "unique" keys.
+                NoneType if operation failed.
+        """
+        sql_command = (
+            "SELECT name, tbl_name FROM sqlite_master "
+            "WHERE type='index' AND sql IS NOT NULL"
+        )
+        params = []
+        if table_name:
+            sql_command += " AND tbl_name=?"
+            params.append(table_name)
+
+        try:
+            indexes = []
+            rows = self.conn.execute(sql_command + ";", params).fetchall()
+            for name, tbl_name in rows:
+                index_list = self.conn.execute("PRAGMA INDEX_LIST(" + tbl_name + ");")
+                unique = [row[2] for row in index_list.fetchall() if row[1] == name]
+                index_info = self.conn.execute("PRAGMA INDEX_INFO(" + name + ");")
+                indexes.append(
+                    {
+                        "name": name,
+                        "table": tbl_name,
+                        "fields": [row[2] for row in index_info.fetchall()],
+                        "unique": bool(unique and unique[0]),
+                    }
+                )
+
+            return indexes
+
+        except:
+            print("Database Operation Failed:", sql_command)
+            return None
+
+    def _index_sql(self, table_name, all_fields, fields, unique, index_name):
+        """Helper Function to build the CREATE INDEX statement for an index.
+
+        Args:
+            table_name (string): Table Name.
+            all_fields (list): List of all fields of the table.
+            fields (list): List of fields in index order.
+            unique (bool): Set this for a unique index.
+            index_name (string): Index Name. Generated if None.
+
+        Returns:
+            tuple: (index_name, sql_command)
+        """
+        if not isinstance(fields, list) or not fields:
+            self._close_on_error()
+            raise TypeMismatchError("Index fields need to be a non empty list.")
+
+        for field in fields:
+            if field not in all_fields:
+                self._close_on_error()
+                raise TableError("Field: " + str(field) + " not found in " + table_name)
+
+        if not index_name:
+            index_name = "idx_" + table_name + "_" + "_".join(fields)
+
+        sql_command = "CREATE {0}INDEX {1} ON {2} ({3});".format(
+            "UNIQUE " if unique else "", index_name, table_name, ", ".join(fields)
+        )
+        return index_name, sql_command
+
     def does_table_exist(self, table_name):
         """Check if table exists.
 
+        Table names are cached and only re-read after the schema changes. A table
+        missing from the cache re-checks the schema version, so tables created by
+        other connections are found regardless of schema_check_interval.
+
         Args:
             table_name (string): Table Name.
 
         Returns:
             TYPE: True if it does. False if it doesn't. NoneType if operation fails.
         """
-        sql_command = (
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='{}';".format(
-                table_name
-            )
-        )
+        sql_command = "SELECT name FROM sqlite_master WHERE type='table';"
         try:
-            cursor = self.conn.execute(sql_command)
-            result = len(cursor.fetchall())
-            if result:
+            self._check_schema_version()
+            if table_name in self._get_table_names():
                 return True
 
+            if self._check_schema_version(force=True):
+                return table_name in self._get_table_names()
+
             return False
 
         except:
             print("Database Operation Failed:", sql_command)
             return None
 
+    def _get_table_names(self):
+        """Helper Function to get the cached table names, reading them if needed.
+
+        Returns:
+            set: Table names.
+        """
+        if self._table_names is None:
+            sql_command = "SELECT name FROM sqlite_master WHERE type='table';"
+            cursor = self._execute(self.conn, sql_command)
+            self._table_names = set(res[0] for res in cursor.fetchall())
+
+        return self._table_names
+
+    @_schema_operation
     def list_tables(self):
         """Display all tables in the Database.
 
@@ -164,7 +958,7 @@ class ContactsDB(object):
         """
         sql_command = "SELECT name FROM sqlite_master WHERE type='table';"
         try:
-            cursor = self.conn.execute(sql_command)
+            cursor = self._execute(self.conn, sql_command)
             result = [res[0] for res in cursor.fetchall()]
             return result
 
@@ -172,6 +966,7 @@ class ContactsDB(object):
             print("Database Operation Failed:", sql_command)
             return None
 
+    @_schema_operation
     def add(self, table_name, data):
         """Add Data to Database.
 
@@ -184,23 +979,23 @@ class ContactsDB(object):
 
         """
         if not self.does_table_exist(table_name):
-            self.conn.close()
+            self._close_on_error()
             raise TableError("Table " + table_name + " does not exist.")
 
         if not isinstance(data, dict):
-            self.conn.close()
+            self._close_on_error()
             raise TypeMismatchError(
                 "Invalid type of data arg. data arg needs to be a dict type."
             )
 
         if "id" in data.keys():
-            self.conn.close()
+            self._close_on_error()
             raise IDError("ID field is immutable and cannot be set by user.")
 
         key_str = ", ".join(data.keys())
         val_str = ""
 
-        all_fields = self.get_table_fields(table_name)
+        all_fields = self._get_fields_of(table_name, data.keys())
 
         for key in data.keys():
             if key not in all_fields.keys():
@@ -211,7 +1006,7 @@ class ContactsDB(object):
             if isinstance(val, str):
                 # check if type is string but acceptable type is integer.
                 if all_fields[key] == "INTEGER":
-                    self.close_conn()
+                    self._close_on_error()
                     raise TypeMismatchError(
                         "Invalid data type for:" + data[key] + ":" + val
                     )
@@ -221,7 +1016,7 @@ class ContactsDB(object):
             elif isinstance(val, int):
                 # check if type is integer but acceptable type is string.
                 if all_fields[key] == "TEXT":
-                    self.close_conn()
+                    self._close_on_error()
                     raise TypeMismatchError(
                         "Invalid data type for:" + data[key] + ":" + val
                     )
@@ -232,164 +1027,1936 @@ class ContactsDB(object):
         sql_command = "INSERT INTO {0} ({1}) values({2})".format(
             table_name, key_str, val_str
         )
+        self._mark_written(table_name)
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            self._execute(self.conn, sql_command)
+            self._commit()
             return True
         except:
             print("Database Operation Failed:", sql_command)
             return False
 
-    def find(self, table_name, filters=[], fields=[], operator="AND"):
-        """Summary
+    @_schema_operation
+    def add_many(self, table_name, records, batch_size=1000):
+        """Add many records to Database using bound parameters and batched commits.
+
+        The table schema is looked up once. Every record is validated with the same
+        rules as add() and invalid records are rejected instead of aborting the load.
+        Records are inserted with executemany and committed once per batch.
 
         Args:
             table_name (string): Table Name.
-            filters (list, optional): List of filters. Example: [["name", "is", "ABC"]..]
-                Valid Operators for Strings: is, is_not, contains, does_not_contain.
-                Valid Operators for Integers: less_than, less_than_equal, greater_than, greater_than_equal, equals, not_equal.
-            fields (list, optional): List of fields. Example: ["name", "address", "phone_number"]
-            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            records (iterable): Iterable (list, generator..) of {field:value} dicts.
+            batch_size (int, optional): Number of records committed per transaction.
 
         Returns:
-            TYPE: Description
+            tuple: (inserted, rejected) where inserted is the number of rows added and
+                rejected is a list of (index, reason) for every record that was skipped.
         """
         if not self.does_table_exist(table_name):
-            self.conn.close()
+            self._close_on_error()
             raise TableError("Table " + table_name + " does not exist.")
 
-        if not isinstance(filters, list):
-            self.conn.close()
-            raise TypeMismatchError("Invalid filter data type.")
+        if batch_size < 1:
+            raise ValueError("batch_size needs to be a positive integer.")
 
+        # records aren't known up front, so don't trust fields cached within the interval.
+        self._check_schema_version(force=True)
         all_fields = self.get_table_fields(table_name)
-        if not fields:
-            fields = list(all_fields.keys())
+        inserted = 0
+        rejected = []
+        batch = []
+
+        for index, data in enumerate(records):
+            try:
+                keys = validate_data(all_fields, data)
+            except (TypeMismatchError, IDError) as e:
+                rejected.append((index, str(e)))
+                continue
 
-        field_str = ", ".join(fields)
-        fltr_list = []
-        return_data = []
+            batch.append((index, keys, tuple(data[key] for key in keys)))
+            if len(batch) >= batch_size:
+                inserted += self.insert_batch(table_name, batch, rejected)
+                batch = []
 
-        for fltr in filters:
-            if not isinstance(fltr, list):
-                self.conn.close()
-                raise TypeMismatchError("Invalid filter data type in filters.")
+        if batch:
+            inserted += self.insert_batch(table_name, batch, rejected)
 
-            if fltr[0] not in all_fields.keys():
-                continue
+        return inserted, rejected
 
-            if isinstance(fltr[2], str):
-                # check if type is string but acceptable type is integer.
-                if all_fields[fltr[0]] == "INTEGER":
-                    self.close_conn()
-                    raise TypeMismatchError(
-                        "Invalid type for data in filter:" + str(fltr)
-                    )
+    def insert_batch(self, table_name, batch, rejected):
+        """Insert one batch of records validated with validate_data and commit it.
 
-                if fltr[1] == "is":
-                    fltr_string = fltr[0] + "='" + fltr[2] + "'"
+        This is the insert step of add_many for callers that validate the records
+        themselves, like the parallel import pipeline. Records are grouped by their
+        set of fields so that every group is a single executemany call. If a group
+        fails, it is retried row by row so that only the offending records are rejected.
 
-                elif fltr[1] == "is_not":
-                    fltr_string = "NOT (" + fltr[0] + "='" + fltr[2] + "')"
+        Args:
+            table_name (string): Table Name.
+            batch (list): List of (index, keys, values) tuples.
+            rejected (list): List where (index, reason) of failed records is appended.
 
-                elif fltr[1] == "contains":
-                    fltr_string = fltr[0] + " LIKE '%" + fltr[2] + "%'"
+        Returns:
+            int: Number of rows inserted.
+        """
+        groups = {}
+        for index, keys, values in batch:
+            groups.setdefault(keys, []).append((index, values))
+
+        self._mark_written(table_name)
+        # open the transaction explicitly so the savepoints below nest inside it.
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+        inserted = 0
+        for keys, rows in groups.items():
+            if keys:
+                sql_command = "INSERT INTO {0} ({1}) VALUES ({2})".format(
+                    table_name, ", ".join(keys), ", ".join("?" * len(keys))
+                )
+            else:
+                sql_command = "INSERT INTO {0} DEFAULT VALUES".format(table_name)
 
-                elif fltr[1] == "does_not_contain":
-                    fltr_string = "NOT (" + fltr[0] + " LIKE '%" + fltr[2] + "%')"
+            try:
+                self.conn.execute("SAVEPOINT add_many")
+                self._execute(
+                    self.conn, sql_command, [values for _, values in rows], many=True
+                )
+                self.conn.execute("RELEASE add_many")
+                inserted += len(rows)
+                continue
 
-                else:
-                    self.conn.close()
-                    raise InvalidFilterError(
-                        "Invalid Condition for filter:" + str(fltr)
-                    )
+            except sl.Error:
+                self.conn.execute("ROLLBACK TO add_many")
+                self.conn.execute("RELEASE add_many")
 
-            elif isinstance(fltr[2], int):
-                # check if type is integer but acceptable type is string.
-                if all_fields[fltr[0]] == "TEXT":
-                    self.close_conn()
-                    raise TypeMismatchError(
-                        "Invalid type for data in filter:" + str(fltr)
-                    )
+            for index, values in rows:
+                try:
+                    self._execute(self.conn, sql_command, values)
+                    inserted += 1
+                except sl.Error as e:
+                    rejected.append((index, str(e)))
 
-                if fltr[1] == "less_than":
-                    fltr_string = fltr[0] + "<" + str(fltr[2])
+        self._commit()
+        return inserted
 
-                elif fltr[1] == "less_than_equal":
-                    fltr_string = fltr[0] + "<=" + str(fltr[2])
+    @_schema_operation
+    def import_csv(self, table_name, csv_file, batch_size=1000, delimiter=","):
+        """Add the rows of a CSV file to the table.
 
-                elif fltr[1] == "greater_than":
-                    fltr_string = fltr[0] + ">" + str(fltr[2])
+        The first row is the header, its columns are mapped to the table fields by
+        name. Columns that aren't fields and the id column are ignored, so exported
+        files can be imported again. Empty cells are left out of the record and cells
+        of Integer fields are converted to int. Rows are read and inserted batch_size
+        at a time with add_many, so memory doesn't grow with the size of the file.
 
-                elif fltr[1] == "greater_than_equal":
-                    fltr_string = fltr[0] + ">=" + str(fltr[2])
+        Args:
+            table_name (string): Table Name.
+            csv_file (str or file): Path to the CSV file, or a file object opened for reading.
+            batch_size (int, optional): Number of rows committed per transaction.
+            delimiter (str, optional): Delimiter of the columns.
 
-                elif fltr[1] == "equals":
-                    fltr_string = fltr[0] + "=" + str(fltr[2])
+        Returns:
+            tuple: (inserted, rejected) where inserted is the number of rows added and
+                rejected is a list of (row, reason) for every row that was skipped.
+                row is the number of the row after the header, starting at 1.
+        """
+        if isinstance(csv_file, str):
+            # spreadsheet programs start UTF-8 files with a byte order mark.
+            with open(csv_file, newline="", encoding="utf-8-sig") as opened_file:
+                return self.import_csv(table_name, opened_file, batch_size, delimiter)
 
-                elif fltr[1] == "not_equal":
-                    fltr_string = fltr[0] + "!=" + str(fltr[2])
+        if not self.does_table_exist(table_name):
+            self._close_on_error()
+            raise TableError("Table " + table_name + " does not exist.")
 
-                else:
-                    self.conn.close()
-                    raise InvalidFilterError(
-                        "Invalid Condition for filter:" + str(fltr)
-                    )
+        all_fields = self.get_table_fields(table_name)
+        reader = csv.reader(csv_file, delimiter=delimiter)
+        try:
+            columns = read_csv_header(reader, all_fields, table_name)
+        except TableError:
+            self._close_on_error()
+            raise
+
+        records = read_csv_records(reader, columns, all_fields)
+        inserted, rejected = self.add_many(table_name, records, batch_size)
+        return inserted, [(index + 1, reason) for index, reason in rejected]
+
+    @_schema_operation
+    def find(
+        self,
+        table_name,
+        filters=[],
+        fields=[],
+        operator="AND",
+        stream=False,
+        order_by=None,
+        limit=None,
+        offset=None,
+        after=None,
+        row_format="dict",
+    ):
+        """Find records in the table matching the filters.
+
+        Filters are compiled into SQL with bound parameters. The compiled statement
+        is memoized per table, fields, operator and filter shape (field, condition and
+        value type) so repeated searches skip validation and reuse SQLite's
+        prepared statement.
 
-            fltr_list.append(fltr_string)
+        Args:
+            table_name (string): Table Name.
+            filters (list, optional): List of filters. Example: [["name", "is", "ABC"]..]
+                Valid Operators for Strings: is, is_not, contains, does_not_contain, starts_with.
+                Valid Operators for Integers: less_than, less_than_equal, greater_than, greater_than_equal, equals, not_equal.
+                Valid Operators for Lists of Strings or Integers: in, not_in, between.
+                Filters can be grouped with {"and": [..]}, {"or": [..]} and {"not": filter}.
+                Example: [{"or": [["city", "is", "X"], ["city", "is", "Y"]]}, ["age", "less_than", 30]]
+            fields (list, optional): List of fields. Example: ["name", "address", "phone_number"]
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            stream (bool, optional): Set this to get a generator from iter_find
+                instead of a list.
+            order_by (list, optional): List of fields to sort by, "-" prefix for
+                descending. Example: ["-age", "name"]. id is always the last sort key.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip. This is a scan of
+                the skipped records, use after for large tables.
+            after (str, optional): Continuation token returned by find_page. Only
+                records sorted after the last record of that page are found.
+            row_format (str, optional): Format of the records, see ROW_FORMATS.
+                "tuple", "row" and "record" skip building a dict for every record.
 
-        operator = " " + operator + " "
-        fltr_string = operator.join(fltr_list)
-        if fltr_string:
-            sql_command = "SELECT {0} FROM {1} WHERE {2};".format(
-                field_str, table_name, fltr_string
+        Returns:
+            list: List of dicts with {field:value} for every record found, or the
+                records in row_format. False if the database operation failed.
+        """
+        if stream:
+            return self.iter_find(
+                table_name,
+                filters,
+                fields,
+                operator,
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+                after=after,
+                row_format=row_format,
             )
-        else:
-            sql_command = "SELECT {0} FROM {1};".format(field_str, table_name)
 
+        if row_format not in ROW_FORMATS:
+            raise ValueError("Unsupported row_format: " + str(row_format))
+
+        sql_command, fields, params = self._compile_find(
+            table_name, filters, fields, operator, order_by, limit, offset, after
+        )
+        key = (row_format, sql_command, tuple(params))
+        hit, result = self._get_cached(table_name, key)
+        if hit:
+            return list(map(dict, result)) if row_format == "dict" else list(result)
+
+        start = time.perf_counter()
         try:
-            cursor = self.conn.cursor()
-            rows = cursor.execute(sql_command)
+            cursor, convert = self._row_cursor(fields, row_format)
+            rows = self._execute(cursor, sql_command, params)
         except:
             print("Database Operation Failed:", sql_command)
             return False
 
-        for row in rows:
-            data_dict = {}
-            for index in range(len(fields)):
-                data_dict[fields[index]] = row[index]
-
-            return_data.append(data_dict)
-
-        return return_data
+        result = self._materialize(rows, convert)
+        if self.slow_query_ms is not None:
+            order = self._parse_order_by(order_by or []) if order_by else ()
+            self._log_slow_query(
+                "find", table_name, sql_command, params, filters, operator, order, start
+            )
 
-    def update(self, table_name, _id, data):
-        """Update existing data in specified table. Ignores wrong fields.
+        if self.result_cache is not None:
+            self._put_cached(table_name, key, result)
+            if row_format == "dict":
+                return list(map(dict, result))
+
+        return result
+
+    @_schema_operation
+    def iter_find(
+        self,
+        table_name,
+        filters=[],
+        fields=[],
+        operator="AND",
+        batch_size=1000,
+        order_by=None,
+        limit=None,
+        offset=None,
+        after=None,
+        row_format="dict",
+    ):
+        """Find records in the table matching the filters and yield them lazily.
+
+        Takes the same arguments as find. Rows are read from the cursor with
+        fetchmany so memory stays bounded by batch_size no matter how many records
+        match. The filters are validated before the generator is returned.
 
         Args:
             table_name (string): Table Name.
-            _id (int): id of the record.
-            data (dict): New Data record.
+            filters (list, optional): List of filters. Example: [["name", "is", "ABC"]..]
+            fields (list, optional): List of fields. Example: ["name", "address", "phone_number"]
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            batch_size (int, optional): Number of rows fetched from the cursor at a time.
+            order_by (list, optional): List of fields to sort by, see find.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            after (str, optional): Continuation token returned by find_page.
+            row_format (str, optional): Format of the records, see find.
 
         Returns:
-            bool: True if Successful. False if not.
-
+            generator: Generator of dicts with {field:value} for every record found,
+                or the records in row_format. False if the database operation failed.
         """
-        update_data_str = ""
-        all_fields = self.get_table_fields(table_name)
-
-        for key, val in data.items():
-            if key not in all_fields.keys():
-                continue
+        if row_format not in ROW_FORMATS:
+            raise ValueError("Unsupported row_format: " + str(row_format))
 
-            if key == "id":
-                self.close_conn()
-                raise IDError("ID field is Immutable and cannot be edited by user.")
+        sql_command, fields, params = self._compile_find(
+            table_name, filters, fields, operator, order_by, limit, offset, after
+        )
+        try:
+            cursor, convert = self._row_cursor(fields, row_format)
+            self._execute(cursor, sql_command, params)
+        except:
+            print("Database Operation Failed:", sql_command)
+            return False
+
+        return self._iter_rows(cursor, convert, batch_size)
+
+    @_schema_operation
+    def find_page(
+        self,
+        table_name,
+        filters=[],
+        fields=[],
+        operator="AND",
+        order_by=None,
+        limit=50,
+        after=None,
+    ):
+        """Find one page of records using keyset pagination.
+
+        Instead of skipping records with an OFFSET, every page continues after the
+        sort key of the last record of the previous page, so page N costs the same
+        as page 1 when the sort fields are indexed.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list, optional): List of filters, see find.
+            fields (list, optional): List of fields, see find.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            order_by (list, optional): List of fields to sort by, see find. Defaults to id.
+            limit (int, optional): Number of records per page.
+            after (str, optional): Continuation token of the previous page.
+
+        Returns:
+            tuple: (records, token) where token is the continuation token for the
+                next page or None if this is the last page. False if the database
+                operation failed.
+        """
+        order = self._parse_order_by(order_by or [])
+        select_fields = list(fields)
+        if select_fields:
+            # sort fields are needed for the token even if they aren't displayed.
+            select_fields += [f for f, _ in order if f not in select_fields]
+
+        result = self.find(
+            table_name,
+            filters,
+            select_fields,
+            operator,
+            order_by=[f if d == "ASC" else "-" + f for f, d in order],
+            limit=limit,
+            after=after,
+        )
+        if result is False:
+            return False
+
+        token = None
+        if result and len(result) == limit:
+            token = self._encode_token(order, [result[-1][f] for f, _ in order])
+
+        if fields:
+            result = [{f: record[f] for f in fields} for record in result]
+
+        return result, token
+
+    @_schema_operation
+    def count(self, table_name, filters=[], operator="AND"):
+        """Count the records in the table matching the filters.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list, optional): List of filters, see find.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+
+        Returns:
+            int: Number of records. False if the database operation failed.
+        """
+        result = self.aggregate(table_name, [], {"count": "count"}, filters, operator)
+        if result is False:
+            return False
+
+        return result[0]["count"]
+
+    @_schema_operation
+    def aggregate(
+        self, table_name, group_by=[], metrics={"count": "count"}, filters=[], operator="AND"
+    ):
+        """Aggregate the records in the table matching the filters inside SQLite.
+
+        Example:
+            aggregate("Contacts", ["city"], {"n": "count", "max_age": ("max", "age")})
+            [{"city": "Pune", "n": 12, "max_age": 71}, ..]
+
+        Args:
+            table_name (string): Table Name.
+            group_by (list, optional): List of fields to group by. Groups are sorted by
+                these fields. Without fields the whole table is one group.
+            metrics (dict, optional): Dictionary where key is metric name and value is
+                "count" for the number of records or (function, field).
+                Supported functions: count, count_distinct, sum, avg, min and max.
+                count of a field doesn't count empty values, sum and avg need an
+                Integer field.
+            filters (list, optional): List of filters, see find.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+
+        Returns:
+            list: List of dicts with {group_by field:value, metric name:value} for every
+                group. False if the database operation failed.
+        """
+        sql_command, names, params = self._compile_aggregate(
+            table_name, group_by, metrics, filters, operator
+        )
+        # metric names aren't part of the statement, but they are of the result.
+        key = ("aggregate", sql_command, tuple(params), tuple(names))
+        hit, result = self._get_cached(table_name, key)
+        if hit:
+            return list(map(dict, result))
+
+        start = time.perf_counter()
+        try:
+            rows = self._execute(self.conn, sql_command, params)
+            result = self._materialize(
+                rows, lambda rows: map(dict, map(partial(zip, names), rows))
+            )
+        except:
+            print("Database Operation Failed:", sql_command)
+            return False
+
+        if self.slow_query_ms is not None:
+            order = tuple((field, "ASC") for field in group_by)
+            self._log_slow_query(
+                "aggregate", table_name, sql_command, params, filters, operator, order, start
+            )
+
+        if self.result_cache is not None:
+            self._put_cached(table_name, key, result)
+            return list(map(dict, result))
+
+        return result
+
+    @_schema_operation
+    def explain(
+        self,
+        table_name,
+        filters=[],
+        fields=[],
+        operator="AND",
+        order_by=None,
+        limit=None,
+        offset=None,
+        after=None,
+    ):
+        """Explain how SQLite runs a find and advise indexes that would speed it up.
+
+        Takes the same arguments as find. The find isn't run.
+
+        Example:
+            explain("Contacts", [["city", "is", "Pune"], ["age", "greater_than", 30]])
+            {"sql": "SELECT ..", "full_scan": True, "rows": 250000,
+             "warnings": ["Full scan of Contacts (~250000 rows)."],
+             "advice": ["CREATE INDEX idx_Contacts_city_age ON Contacts (city, age);"], ..}
+
+        Args:
+            table_name (string): Table Name.
+            filters (list, optional): List of filters, see find.
+            fields (list, optional): List of fields, see find.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            order_by (list, optional): List of fields to sort by, see find.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            after (str, optional): Continuation token returned by find_page.
+
+        Returns:
+            dict: Dictionary with "sql" and "params" of the compiled find, "plan" as a
+                list of {"id", "parent", "detail"} rows of EXPLAIN QUERY PLAN, "rows"
+                as the estimated number of rows in the table, "full_scan" and
+                "temp_sort" flags, "warnings" and "advice" as a list of CREATE INDEX
+                statements. False if the database operation failed.
+        """
+        sql_command, _, params = self._compile_find(
+            table_name, filters, fields, operator, order_by, limit, offset, after
+        )
+        order = self._parse_order_by(order_by or []) if order_by else ()
+        return self._explain_sql(table_name, sql_command, params, filters, operator, order)
+
+    def _explain_sql(self, table_name, sql_command, params, filters, operator, order):
+        """Helper Function to read and analyze the query plan of a compiled statement.
+
+        Args:
+            table_name (string): Table Name.
+            sql_command (string): Compiled statement.
+            params (list): Bound parameters.
+            filters (list): List of filters of the statement.
+            operator (str): Operator for filters.
+            order (tuple): Tuple of (field, direction) pairs the statement sorts by.
+
+        Returns:
+            dict: Explanation, see explain. False if the database operation failed.
+        """
+        try:
+            plan = [
+                {"id": row[0], "parent": row[1], "detail": row[3]}
+                for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql_command, params)
+            ]
+            rows = self.conn.execute("SELECT MAX(id) FROM " + table_name + ";").fetchone()
+        except:
+            print("Database Operation Failed:", "EXPLAIN QUERY PLAN " + sql_command)
+            return False
+
+        # "SCAN <table>" without an index reads every row, newer SQLite drops "TABLE".
+        scan = re.compile(r"^SCAN (TABLE )?" + re.escape(table_name) + r"( |$)")
+        full_scan = any(
+            scan.match(row["detail"]) and "USING" not in row["detail"] for row in plan
+        )
+        temp_sort = any("USE TEMP B-TREE" in row["detail"] for row in plan)
+        row_count = rows[0] or 0
+
+        warnings = []
+        if full_scan and row_count >= FULL_SCAN_ROWS:
+            warnings.append(
+                "Full scan of {0} (~{1} rows).".format(table_name, row_count)
+            )
+
+        if temp_sort and row_count >= FULL_SCAN_ROWS:
+            warnings.append("Results of {0} are sorted in a temporary B-tree.".format(table_name))
+
+        advice = []
+        if full_scan or temp_sort:
+            advice = self._advise_indexes(table_name, filters, operator, order, warnings)
+
+        return {
+            "sql": sql_command,
+            "params": list(params),
+            "plan": plan,
+            "rows": row_count,
+            "full_scan": full_scan,
+            "temp_sort": temp_sort,
+            "warnings": warnings,
+            "advice": advice,
+        }
+
+    def _advise_indexes(self, table_name, filters, operator, order, warnings):
+        """Helper Function to suggest indexes covering the filters of a query.
+
+        AND filters are covered by one index of their equality fields followed by one
+        range field, or by the sort fields if there is no range field. OR filters need
+        an index per field, or per AND group. contains, does_not_contain and negated
+        conditions can't use an index, unless contains is routed to the full-text
+        index. Lookups of normalized fields use their key index. Indexes starting
+        with the suggested fields aren't suggested again.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters and filter groups.
+            operator (str): Operator for filters.
+            order (tuple): Tuple of (field, direction) pairs the query sorts by.
+            warnings (list): List where reasons an index can't help are appended.
+
+        Returns:
+            list: List of CREATE INDEX statements.
+        """
+        all_fields = self.get_table_fields(table_name)
+        fulltext = self.get_fulltext(table_name)
+        # contains on full-text fields and lookups of normalized keys have their index.
+        indexed = [(field, "contains") for field in fulltext["fields"]] if fulltext else []
+        for field in self.get_normalized_keys(table_name):
+            indexed += [(field, "is"), (field, "in"), (field, "starts_with")]
+
+        group = {"or": filters} if operator == "OR" else {"and": filters}
+        candidates = self._index_candidates(group, indexed, order, warnings)
+
+        existing = [index["fields"] for index in self.list_indexes(table_name) or []]
+        advice = []
+        for fields in candidates:
+            if any(index[: len(fields)] == fields for index in existing):
+                continue
+
+            advice.append(self._index_sql(table_name, all_fields, fields, False, None)[1])
+
+        return advice
+
+    def _index_candidates(self, group, indexed, order, warnings):
+        """Helper Function to get the fields of the indexes a filter group can use.
+
+        In an AND group, nested OR groups are only indexed if no other filter is, and
+        negated groups are checked after the index lookup.
+
+        Args:
+            group (dict): Filter group, {"and": [filters..]} or {"or": [filters..]}.
+            indexed (list): List of (field, condition) pairs served by other indexes.
+            order (tuple): Tuple of (field, direction) pairs the query sorts by.
+            warnings (list): List where reasons an index can't help are appended.
+
+        Returns:
+            list: List of field lists, one per index.
+        """
+        name, children = next(iter(group.items()))
+        equality = []
+        ranges = []
+        or_groups = []
+        and_groups = []
+        pending = list(children)
+        while pending:
+            node = pending.pop(0)
+            if isinstance(node, dict):
+                child_name, child = next(iter(node.items()))
+                if child_name == "not" and name == "or":
+                    warnings.append("Filter group not can't use an index, OR filters scan.")
+                    return []
+
+                if child_name == "and" and name == "and":
+                    pending[:0] = child
+                elif child_name == "or" and name == "or":
+                    pending[:0] = child
+                elif child_name == "or":
+                    or_groups.append(node)
+                elif child_name == "and":
+                    and_groups.append(node)
+
+                continue
+
+            field, condition = node[0], node[1]
+            if (field, condition) in indexed:
+                continue
+
+            if condition in INDEX_EQUALITY_CONDITIONS:
+                equality.append(field)
+            elif condition in INDEX_RANGE_CONDITIONS:
+                ranges.append(field)
+            elif name == "or":
+                warnings.append(
+                    "Filter " + field + " " + condition + " can't use an index, OR filters scan."
+                )
+                return []
+
+        if name == "or":
+            candidates = [[field] for field in OrderedDict.fromkeys(equality + ranges)]
+            for and_group in and_groups:
+                fields = self._index_candidates(and_group, indexed, (), warnings)
+                if not fields:
+                    warnings.append("Filter group and can't use an index, OR filters scan.")
+                    return []
+
+                candidates.extend(f for f in fields if f not in candidates)
+
+            return candidates
+
+        fields = list(OrderedDict.fromkeys(equality))
+        tail = [f for f in ranges if f not in fields][:1]
+        if not tail:
+            tail = [f for f, _ in order if f != "id" and f not in fields]
+
+        if fields or tail:
+            return [fields + tail]
+
+        for or_group in or_groups:
+            candidates = self._index_candidates(or_group, indexed, (), warnings)
+            if candidates:
+                return candidates
+
+        return []
+
+    def _log_slow_query(
+        self, op, table_name, sql_command, params, filters, operator, order, start
+    ):
+        """Helper Function to log a query with its plan if it exceeded slow_query_ms.
+
+        Args:
+            op (string): Operation name.
+            table_name (string): Table Name.
+            sql_command (string): Compiled statement.
+            params (list): Bound parameters.
+            filters (list): List of filters of the statement.
+            operator (str): Operator for filters.
+            order (tuple): Tuple of (field, direction) pairs the statement sorts by.
+            start (float): time.perf_counter() before the statement ran.
+        """
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        explanation = self._explain_sql(
+            table_name, sql_command, params, filters, operator, order
+        )
+        if explanation is False:
+            return
+
+        explanation.update(
+            {"op": op, "table": table_name, "ms": round(elapsed_ms, 3), "time": time.time()}
+        )
+        self.slow_queries.append(explanation)
+        if self.slow_query_sink is not None:
+            self.slow_query_sink(explanation)
+
+    def _get_cached(self, table_name, key):
+        """Helper Function to look up a result in the result cache.
+
+        Drops all cached results first if another connection committed since the
+        last lookup.
+
+        Args:
+            table_name (string): Table Name.
+            key (tuple): Key of the compiled query.
+
+        Returns:
+            tuple: (hit, result) where hit is False if the result isn't cached.
+        """
+        if self.result_cache is None:
+            return False, None
+
+        try:
+            data_version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        except sl.Error:
+            self.result_cache.clear()
+            return False, None
+
+        if data_version != self._data_version:
+            self.result_cache.clear()
+            self._data_version = data_version
+
+        return self.result_cache.get(
+            (table_name,) + key, self._write_counts.get(table_name, 0)
+        )
+
+    def _put_cached(self, table_name, key, result):
+        """Helper Function to store a result in the result cache.
+
+        Args:
+            table_name (string): Table Name.
+            key (tuple): Key of the compiled query.
+            result (list): Result of the query.
+        """
+        self.result_cache.put(
+            (table_name,) + key, self._write_counts.get(table_name, 0), result
+        )
+
+    def _mark_written(self, table_name):
+        """Helper Function to invalidate the cached results of a table before writing it.
+
+        Args:
+            table_name (string): Table Name.
+        """
+        self._write_counts[table_name] = self._write_counts.get(table_name, 0) + 1
+
+    @_schema_operation
+    def distinct(self, table_name, field, filters=[], operator="AND"):
+        """Get the distinct values of a field in the records matching the filters.
+
+        Args:
+            table_name (string): Table Name.
+            field (string): Field name.
+            filters (list, optional): List of filters, see find.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+
+        Returns:
+            list: Sorted list of values, NoneType first if a record has no value.
+                False if the database operation failed.
+        """
+        result = self.aggregate(table_name, [field], {}, filters, operator)
+        if result is False:
+            return False
+
+        return [row[field] for row in result]
+
+    def _execute(self, cursor, sql_command, params=(), many=False):
+        """Helper Function to run a statement, timed as the execute phase when instrumented.
+
+        Args:
+            cursor (SQLite Cursor or Connection Object): Cursor to run it on.
+            sql_command (string): SQL statement.
+            params (tuple, optional): Bound parameters, a list of them if many is set.
+            many (bool, optional): Set this to run the statement for every parameter tuple.
+
+        Returns:
+            SQLite Cursor Object: Executed cursor.
+        """
+        if many:
+            return cursor.executemany(sql_command, params)
+
+        return cursor.execute(sql_command, params)
+
+    def _materialize(self, rows, convert):
+        """Helper Function to fetch all rows of an executed cursor as records.
+
+        Args:
+            rows (SQLite Cursor Object): Executed cursor.
+            convert (function): Function converting rows into records, see _row_cursor.
+
+        Returns:
+            list: List of records.
+        """
+        if convert is None:
+            return rows.fetchall()
+
+        return list(convert(rows))
+
+    def _iter_rows(self, cursor, convert, batch_size):
+        """Helper Function to yield rows of an executed cursor.
+
+        Args:
+            cursor (SQLite Cursor Object): Executed cursor.
+            convert (function): Function converting rows into records, see _row_cursor.
+            batch_size (int): Number of rows fetched at a time.
+
+        Yields:
+            object: Record in the row format of the cursor.
+        """
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                yield from rows if convert is None else convert(rows)
+
+        finally:
+            cursor.close()
+
+    @_schema_operation
+    def export_csv(
+        self,
+        table_name,
+        csv_file,
+        filters=[],
+        fields=[],
+        operator="AND",
+        order_by=None,
+        batch_size=1000,
+        delimiter=",",
+    ):
+        """Write the records of the table matching the filters to a CSV file.
+
+        The first row is the header. Records are read from the cursor batch_size at a
+        time with iter_find and written as they are read, so memory doesn't grow
+        with the size of the table.
+
+        Args:
+            table_name (string): Table Name.
+            csv_file (str or file): Path to the CSV file, or a file object opened for writing.
+            filters (list, optional): List of filters, see find.
+            fields (list, optional): List of fields. Defaults to all fields.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            order_by (list, optional): List of fields to sort by, see find.
+            batch_size (int, optional): Number of rows fetched from the cursor at a time.
+            delimiter (str, optional): Delimiter of the columns.
+
+        Returns:
+            int: Number of records written. False if the database operation failed.
+        """
+        rows = self.iter_find(
+            table_name,
+            filters,
+            fields,
+            operator,
+            batch_size,
+            order_by=order_by,
+            row_format="tuple",
+        )
+        if rows is False:
+            return False
+
+        header = list(fields) or list(self.get_table_fields(table_name).keys())
+        if isinstance(csv_file, str):
+            with open(csv_file, "w", newline="", encoding="utf-8") as opened_file:
+                return write_csv(opened_file, header, rows, delimiter)
+
+        return write_csv(csv_file, header, rows, delimiter)
+
+    def _row_cursor(self, fields, row_format):
+        """Helper Function to get a cursor returning rows for a row format.
+
+        Args:
+            fields (list): List of fields selected by the cursor.
+            row_format (str): Format of the records, see ROW_FORMATS.
+
+        Returns:
+            tuple: (cursor, convert) where convert turns an iterable of rows of the
+                cursor into an iterator of records, or is NoneType if the rows already
+                are records.
+        """
+        cursor = self.conn.cursor()
+        if row_format == "row":
+            return cursor, None
+
+        # plain tuples are built by sqlite3 itself without a Python call per row.
+        cursor.row_factory = None
+        if row_format == "tuple":
+            return cursor, None
+
+        # records are built by mapping builtins, without a Python call per row.
+        if row_format == "record":
+            # same as Record._make.
+            return cursor, partial(map, partial(tuple.__new__, self._record_class(fields)))
+
+        return cursor, lambda rows: map(dict, map(partial(zip, fields), rows))
+
+    def _record_class(self, fields):
+        """Helper Function to get the record class generated for a list of fields.
+
+        Args:
+            fields (list): List of fields.
+
+        Returns:
+            type: namedtuple class with a field for every field, in the same order.
+        """
+        key = tuple(fields)
+        record_class = self._record_classes.get(key)
+        if record_class is None:
+            # fields which aren't valid attribute names are renamed to _<position>.
+            record_class = namedtuple("Record", key, rename=True)
+            self._record_classes[key] = record_class
+            if len(self._record_classes) > self.STATEMENT_CACHE_SIZE:
+                self._record_classes.popitem(last=False)
+
+        else:
+            self._record_classes.move_to_end(key)
+
+        return record_class
+
+    def _compile_find(
+        self,
+        table_name,
+        filters,
+        fields,
+        operator,
+        order_by=None,
+        limit=None,
+        offset=None,
+        after=None,
+    ):
+        """Helper Function to build the SELECT statement and parameters for find.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters.
+            fields (list): List of fields.
+            operator (str): Operator for filters.
+            order_by (list, optional): List of fields to sort by, "-" prefix for descending.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            after (str, optional): Continuation token from find_page.
+
+        Returns:
+            tuple: (sql_command, fields, params)
+        """
+        shape = self._filter_shape(filters)
+        order = ()
+        after_values = None
+        if order_by or after is not None:
+            order = self._parse_order_by(order_by or [])
+
+        if after is not None:
+            after_values = self._decode_token(after, order)
+
+        try:
+            self._check_schema_version()
+        except sl.Error:
+            self._compiled_queries.clear()
+
+        key = (
+            table_name,
+            tuple(fields),
+            operator,
+            tuple(shape),
+            order,
+            None if after_values is None else tuple(v is None for v in after_values),
+            limit is not None,
+            offset is not None,
+        )
+        compiled = self._compiled_queries.get(key)
+        if compiled is None:
+            if not self.does_table_exist(table_name):
+                self._close_on_error()
+                raise TableError("Table " + table_name + " does not exist.")
+
+            all_fields = self._get_fields_of(
+                table_name,
+                list(fields)
+                + [field for field, _ in order]
+                + self._filter_fields(filters),
+            )
+            if not fields:
+                fields = list(all_fields.keys())
+
+            for field, _ in order:
+                if field not in all_fields:
+                    self._close_on_error()
+                    raise InvalidFilterError("Invalid field to order by: " + field)
+
+            try:
+                where_str, binds = self._compile_filters(
+                    all_fields,
+                    filters,
+                    operator,
+                    self.get_fulltext(table_name),
+                    self.get_normalized_keys(table_name),
+                )
+            except (TypeMismatchError, InvalidFilterError):
+                self._close_on_error()
+                raise
+
+            keyset_str, keyset_binds = "", []
+            if after_values is not None:
+                keyset_str, keyset_binds = self._compile_keyset(order, after_values)
+
+            if where_str and keyset_str:
+                where_str = "({0}) AND ({1})".format(where_str, keyset_str)
+            else:
+                where_str = where_str or keyset_str
+
+            sql_command = "SELECT {0} FROM {1}".format(", ".join(fields), table_name)
+            if where_str:
+                sql_command += " WHERE " + where_str
+
+            if order:
+                sql_command += " ORDER BY " + ", ".join(
+                    field + " " + direction for field, direction in order
+                )
+
+            if limit is not None or offset is not None:
+                # SQLite needs a LIMIT for an OFFSET, a negative one means no limit.
+                sql_command += " LIMIT ?"
+
+            if offset is not None:
+                sql_command += " OFFSET ?"
+
+            compiled = (sql_command + ";", list(fields), binds, keyset_binds)
+            self._cache_compiled(key, compiled)
+
+        else:
+            self._compiled_queries.move_to_end(key)
+
+        sql_command, fields, binds, keyset_binds = compiled
+        params = self._bind_filters(binds, filters)
+        for index in keyset_binds:
+            params.append(after_values[index])
+
+        if limit is not None or offset is not None:
+            params.append(-1 if limit is None else limit)
+
+        if offset is not None:
+            params.append(offset)
+
+        return sql_command, fields, params
+
+    def _compile_aggregate(self, table_name, group_by, metrics, filters, operator):
+        """Helper Function to build the SELECT statement and parameters for aggregate.
+
+        Args:
+            table_name (string): Table Name.
+            group_by (list): List of fields to group by.
+            metrics (dict): Dictionary where key is metric name and value is the metric.
+            filters (list): List of filters.
+            operator (str): Operator for filters.
+
+        Returns:
+            tuple: (sql_command, names, params) where names are the group_by fields
+                followed by the metric names, in the order they are selected.
+        """
+        if not isinstance(group_by, list) or not isinstance(metrics, dict):
+            self._close_on_error()
+            raise TypeMismatchError("Invalid group_by or metrics data type.")
+
+        shape = self._filter_shape(filters)
+        metric_items = []
+        for name, metric in metrics.items():
+            # metrics sent as JSON arrive as lists.
+            metric_items.append((name, metric if isinstance(metric, str) else tuple(metric)))
+
+        try:
+            self._check_schema_version()
+        except sl.Error:
+            self._compiled_queries.clear()
+
+        key = (
+            "aggregate",
+            table_name,
+            tuple(group_by),
+            tuple(metric_items),
+            operator,
+            tuple(shape),
+        )
+        compiled = self._compiled_queries.get(key)
+        if compiled is None:
+            if not self.does_table_exist(table_name):
+                self._close_on_error()
+                raise TableError("Table " + table_name + " does not exist.")
+
+            all_fields = self._get_fields_of(
+                table_name,
+                list(group_by)
+                + [metric[1] for _, metric in metric_items if isinstance(metric, tuple)]
+                + self._filter_fields(filters),
+            )
+            try:
+                selects = []
+                for field in group_by:
+                    if field not in all_fields:
+                        raise InvalidFilterError("Invalid field to group by: " + str(field))
+
+                    selects.append(field)
+
+                for name, metric in metric_items:
+                    selects.append(self._compile_metric(all_fields, metric))
+
+                if not selects:
+                    raise InvalidFilterError("Nothing to aggregate, set group_by or metrics.")
+
+                where_str, binds = self._compile_filters(
+                    all_fields,
+                    filters,
+                    operator,
+                    self.get_fulltext(table_name),
+                    self.get_normalized_keys(table_name),
+                )
+            except (TypeMismatchError, InvalidFilterError):
+                self._close_on_error()
+                raise
+
+            sql_command = "SELECT {0} FROM {1}".format(", ".join(selects), table_name)
+            if where_str:
+                sql_command += " WHERE " + where_str
+
+            if group_by:
+                sql_command += " GROUP BY {0} ORDER BY {0}".format(", ".join(group_by))
+
+            names = list(group_by) + [name for name, _ in metric_items]
+            compiled = (sql_command + ";", names, binds)
+            self._cache_compiled(key, compiled)
+
+        else:
+            self._compiled_queries.move_to_end(key)
+
+        sql_command, names, binds = compiled
+        return sql_command, names, self._bind_filters(binds, filters)
+
+    def _compile_metric(self, all_fields, metric):
+        """Helper Function to compile an aggregate metric into its SQL expression.
+
+        Args:
+            all_fields (dict): Dictionary where key is field name and value is data_type
+            metric (str or tuple): "count", or (function, field). See aggregate.
+
+        Returns:
+            string: SQL expression.
+        """
+        if isinstance(metric, str):
+            function, field = metric, None
+        elif len(metric) == 2:
+            function, field = metric
+        else:
+            raise InvalidFilterError("Invalid metric: " + str(metric))
+
+        if function not in AGGREGATE_FUNCTIONS:
+            raise InvalidFilterError("Unsupported aggregate function: " + str(function))
+
+        if field is None:
+            if function != "count":
+                raise InvalidFilterError("Aggregate function needs a field: " + function)
+
+            return "COUNT(*)"
+
+        if field not in all_fields:
+            raise InvalidFilterError("Invalid field to aggregate: " + str(field))
+
+        if function in ("sum", "avg") and all_fields[field] != "INTEGER":
+            raise TypeMismatchError(function + " needs an Integer field: " + field)
+
+        return AGGREGATE_FUNCTIONS[function].format(field)
+
+    def _filter_shape(self, filters):
+        """Helper Function to validate the filters and get the shape compiled statements are keyed by.
+
+        Args:
+            filters (list): List of filters and filter groups.
+
+        Returns:
+            list: List of (field, condition, value type, routable) for every filter, where
+                the value type of a list is the tuple of its value types, and of
+                (group, shape) for every filter group.
+        """
+        if not isinstance(filters, list):
+            self._close_on_error()
+            raise TypeMismatchError("Invalid filter data type.")
+
+        return [self._node_shape(node) for node in filters]
+
+    def _node_shape(self, node):
+        """Helper Function to validate a filter or filter group and get its shape.
+
+        Args:
+            node (list or dict): Filter, or filter group, see FILTER_GROUPS.
+
+        Returns:
+            tuple: Shape, see _filter_shape.
+        """
+        if isinstance(node, dict):
+            if len(node) != 1:
+                self._close_on_error()
+                raise TypeMismatchError("Invalid filter group in filters: " + str(node))
+
+            group, children = next(iter(node.items()))
+            if group not in FILTER_GROUPS:
+                self._close_on_error()
+                raise InvalidFilterError("Invalid filter group: " + str(group))
+
+            if group == "not":
+                return (group, self._node_shape(children))
+
+            return (group, tuple(self._filter_shape(children)))
+
+        if not isinstance(node, list) or len(node) != 3:
+            self._close_on_error()
+            raise TypeMismatchError("Invalid filter data type in filters.")
+
+        if isinstance(node[2], list):
+            return (node[0], node[1], tuple(map(type, node[2])), False)
+
+        # values too short for a trigram index, or without a token for unicode61,
+        # can't be routed to full-text search.
+        if isinstance(node[2], str):
+            routable = (len(node[2]) >= 3, _has_token(node[2]))
+        else:
+            routable = None
+
+        return (node[0], node[1], type(node[2]), routable)
+
+    def _filter_leaves(self, filters):
+        """Helper Function to get the filters of nested filter groups in compile order.
+
+        Args:
+            filters (list): List of filters and filter groups.
+
+        Returns:
+            list: List of filters.
+        """
+        leaves = []
+        for node in filters:
+            if isinstance(node, dict):
+                group, children = next(iter(node.items()))
+                leaves.extend(
+                    self._filter_leaves([children] if group == "not" else children)
+                )
+            else:
+                leaves.append(node)
+
+        return leaves
+
+    def _filter_fields(self, filters):
+        """Helper Function to get the field names used by nested filter groups.
+
+        Args:
+            filters (list): List of filters and filter groups.
+
+        Returns:
+            list: List of field names. Malformed filters are left to _compile_filters.
+        """
+        return [
+            fltr[0]
+            for fltr in self._filter_leaves(filters)
+            if isinstance(fltr, (list, tuple)) and fltr
+        ]
+
+    def _bind_filters(self, binds, filters):
+        """Helper Function to turn the filter values into the statement parameters.
+
+        Args:
+            binds (list): List of (filter index, template) from _compile_filters.
+            filters (list): List of filters and filter groups.
+
+        Returns:
+            list: Statement parameters.
+        """
+        if any(isinstance(fltr, dict) for fltr in filters):
+            filters = self._filter_leaves(filters)
+
+        params = []
+        for index, template in binds:
+            value = filters[index][2]
+            params.append(value if template is None else template(value))
+
+        return params
+
+    def _cache_compiled(self, key, compiled):
+        """Helper Function to memoize a compiled statement, evicting the least recently used.
+
+        Args:
+            key (tuple): Cache key.
+            compiled (tuple): Compiled statement.
+        """
+        self._compiled_queries[key] = compiled
+        if len(self._compiled_queries) > self.STATEMENT_CACHE_SIZE:
+            self._compiled_queries.popitem(last=False)
+
+    def _parse_order_by(self, order_by):
+        """Helper Function to normalize an order_by list.
+
+        The id field is always appended as the last sort key so that the order is
+        total, which keyset pagination relies on.
+
+        Args:
+            order_by (list): List of fields, "-" prefix for descending. Example: ["-age", "name"]
+
+        Returns:
+            tuple: Tuple of (field, direction) pairs.
+        """
+        if not isinstance(order_by, list):
+            self._close_on_error()
+            raise TypeMismatchError("Invalid order_by data type.")
+
+        order = []
+        for field in order_by:
+            if not isinstance(field, str) or not field.lstrip("-"):
+                self._close_on_error()
+                raise TypeMismatchError("Invalid field in order_by: " + str(field))
+
+            if field.startswith("-"):
+                order.append((field[1:], "DESC"))
+            else:
+                order.append((field, "ASC"))
+
+        if "id" not in [field for field, _ in order]:
+            order.append(("id", "ASC"))
+
+        return tuple(order)
+
+    def _compile_keyset(self, order, after_values):
+        """Helper Function to compile the condition selecting rows after a sort key.
+
+        SQLite sorts NULL before any value, so NULLs come first in ascending order
+        and last in descending order. An ascending sort key without NULLs is compared
+        as a row value, which SQLite seeks to in an index on the sort fields. Other
+        sort keys are matched exactly by expanding the comparison field by field,
+        with a bound on the first field in front so the index can still seek.
+
+        Args:
+            order (tuple): Tuple of (field, direction) pairs.
+            after_values (list): Sort key values of the last row of the previous page.
+
+        Returns:
+            tuple: (where_str, binds) where binds is a list of indexes in after_values.
+        """
+        fields = [field for field, _ in order]
+        if all(direction == "ASC" for _, direction in order) and None not in after_values:
+            where_str = "({0}) > ({1})".format(
+                ", ".join(fields), ", ".join("?" * len(fields))
+            )
+            return where_str, list(range(len(fields)))
+
+        conditions = []
+        binds = []
+        for index, (field, direction) in enumerate(order):
+            value = after_values[index]
+            if value is None and direction == "DESC":
+                # nothing sorts after NULL in descending order.
+                continue
+
+            parts = []
+            for prev in range(index):
+                parts.append(fields[prev] + " IS ?")
+                binds.append(prev)
+
+            if value is None:
+                parts.append(field + " IS NOT NULL")
+            elif direction == "ASC":
+                parts.append(field + " > ?")
+                binds.append(index)
+            else:
+                parts.append("(" + field + " < ? OR " + field + " IS NULL)")
+                binds.append(index)
+
+            conditions.append("(" + " AND ".join(parts) + ")")
+
+        where_str = " OR ".join(conditions) or "0"
+
+        # the rows after the key are a range of the first field, except for an
+        # ascending NULL where they are all NULLs and then all values.
+        field, direction = order[0]
+        if after_values[0] is None and direction == "DESC":
+            bound = field + " IS NULL"
+        elif after_values[0] is None:
+            return where_str, binds
+        elif direction == "ASC":
+            bound = field + " >= ?"
+        else:
+            # NULLs sort last, at the other end of the index than the range.
+            bound = "(" + field + " <= ? OR " + field + " IS NULL)"
+
+        binds = ([] if after_values[0] is None else [0]) + binds
+        return "{0} AND ({1})".format(bound, where_str), binds
+
+    def _encode_token(self, order, values):
+        """Helper Function to build an opaque continuation token.
+
+        Args:
+            order (tuple): Tuple of (field, direction) pairs.
+            values (list): Sort key values of the last row.
+
+        Returns:
+            str: Continuation token.
+        """
+        data = json.dumps({"order": order, "values": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+    def _decode_token(self, token, order):
+        """Helper Function to read the sort key values of a continuation token.
+
+        Args:
+            token (str): Continuation token.
+            order (tuple): Tuple of (field, direction) pairs of the current query.
+
+        Returns:
+            list: Sort key values.
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            token_order = tuple(tuple(item) for item in data["order"])
+            values = data["values"]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            self._close_on_error()
+            raise InvalidFilterError("Invalid continuation token.")
+
+        if token_order != order or len(values) != len(order):
+            self._close_on_error()
+            raise InvalidFilterError("Continuation token doesn't match order_by.")
+
+        return values
+
+    def _compile_filters(self, all_fields, filters, operator, fulltext=None, keys=None):
+        """Helper Function to compile filters into a parameterized WHERE clause.
+
+        Filters on fields which don't exist in the table are ignored, and so are groups
+        without any other filters. contains and does_not_contain filters on full-text
+        indexed fields are compiled to a MATCH on the full-text table instead of a
+        LIKE scan. NORMALIZED_KEY_CONDITIONS on normalized fields compare the key
+        column against the key of the value.
+
+        Args:
+            all_fields (dict): Dictionary where key is field name and value is data_type
+            filters (list): List of filters and filter groups. Example:
+                [["name", "is", "ABC"], {"or": [["age", "in", [1, 2]], ..]}..]
+            operator (str): Operator for filters. Supported Operators: AND and OR
+            fulltext (dict, optional): Full-text settings of the table from get_fulltext.
+            keys (dict, optional): Normalized fields of the table from get_normalized_keys.
+
+        Returns:
+            tuple: (where_str, binds) where binds is a list of (filter index, template)
+                used to turn the filter values into the statement parameters. Filter
+                indexes count the filters of groups in the order of _filter_leaves.
+        """
+        binds = []
+        leaf_index = itertools.count()
+        fltr_list = []
+        for node in filters:
+            fltr_string = self._compile_node(
+                all_fields, node, fulltext, keys or {}, binds, leaf_index
+            )
+            if fltr_string:
+                fltr_list.append(fltr_string)
+
+        operator = " " + operator + " "
+        return operator.join(fltr_list), binds
+
+    def _compile_node(self, all_fields, node, fulltext, keys, binds, leaf_index):
+        """Helper Function to compile a filter or filter group into an SQL condition.
+
+        Args:
+            all_fields (dict): Dictionary where key is field name and value is data_type
+            node (list or dict): Filter, or filter group, see FILTER_GROUPS.
+            fulltext (dict): Full-text settings of the table from get_fulltext.
+            keys (dict): Normalized fields of the table from get_normalized_keys.
+            binds (list): List where (filter index, template) of the parameters is appended.
+            leaf_index (iterator): Counter of the filters compiled so far.
+
+        Returns:
+            string: SQL condition. Empty if the node is ignored.
+        """
+        if isinstance(node, dict):
+            group, children = next(iter(node.items()))
+            if group == "not":
+                fltr_string = self._compile_node(
+                    all_fields, children, fulltext, keys, binds, leaf_index
+                )
+                return "NOT (" + fltr_string + ")" if fltr_string else ""
+
+            fltr_list = []
+            for child in children:
+                fltr_string = self._compile_node(
+                    all_fields, child, fulltext, keys, binds, leaf_index
+                )
+                if fltr_string:
+                    fltr_list.append(fltr_string)
+
+            if not fltr_list:
+                return ""
+
+            operator = " " + FILTER_GROUPS[group] + " "
+            return "(" + operator.join(fltr_list) + ")"
+
+        fltr = node
+        index = next(leaf_index)
+        if fltr[0] not in all_fields.keys():
+            return ""
+
+        # the key of a normalized field is compared instead of the field.
+        column, normalize = fltr[0], None
+        if fltr[0] in keys and fltr[1] in NORMALIZED_KEY_CONDITIONS:
+            column = NORMALIZED_KEY_COLUMN.format(fltr[0], keys[fltr[0]])
+            normalize = NORMALIZED_KEY_TYPES[keys[fltr[0]]][1]
+
+        if isinstance(fltr[2], list):
+            return self._compile_list_filter(
+                all_fields, fltr, index, binds, column, normalize
+            )
+
+        if isinstance(fltr[2], str):
+            # check if type is string but acceptable type is integer.
+            if all_fields[fltr[0]] == "INTEGER":
+                raise TypeMismatchError("Invalid type for data in filter:" + str(fltr))
+
+            conditions = STRING_CONDITIONS
+
+        elif isinstance(fltr[2], int):
+            # check if type is integer but acceptable type is string.
+            if all_fields[fltr[0]] == "TEXT":
+                raise TypeMismatchError("Invalid type for data in filter:" + str(fltr))
+
+            conditions = INTEGER_CONDITIONS
+
+        else:
+            raise TypeMismatchError("Invalid type for data in filter:" + str(fltr))
+
+        if fltr[1] not in conditions:
+            raise InvalidFilterError("Invalid Condition for filter:" + str(fltr))
+
+        condition, template = conditions[fltr[1]]
+        fltr_string = condition.format(column)
+        if (
+            fulltext
+            and fltr[1] in FULLTEXT_CONDITIONS
+            and fltr[0] in fulltext["fields"]
+            and (
+                len(fltr[2]) >= 3
+                if fulltext["tokenizer"] == "trigram"
+                else _has_token(fltr[2])
+            )
+        ):
+            fltr_string = FULLTEXT_CONDITIONS[fltr[1]].format(fltr[0], fulltext["table"])
+            template = self._fulltext_query(fltr[0], fulltext["tokenizer"])
+
+        for template in template if isinstance(template, tuple) else (template,):
+            binds.append((index, self._chain_templates(normalize, template)))
+
+        return fltr_string
+
+    def _compile_list_filter(self, all_fields, fltr, index, binds, column, normalize):
+        """Helper Function to compile a filter with a list of values, see LIST_CONDITIONS.
+
+        Args:
+            all_fields (dict): Dictionary where key is field name and value is data_type
+            fltr (list): Filter. Example: ["city", "in", ["Pune", "Mumbai"]]
+            index (int): Filter index.
+            binds (list): List where (filter index, template) of the parameters is appended.
+            column (string): Column compared, the field or its normalized key.
+            normalize (function): Key function of the values. NoneType if not normalized.
+
+        Returns:
+            string: SQL condition.
+        """
+        if fltr[1] not in LIST_CONDITIONS:
+            raise InvalidFilterError("Invalid Condition for filter:" + str(fltr))
+
+        condition, size = LIST_CONDITIONS[fltr[1]]
+        if size is not None and len(fltr[2]) != size:
+            raise InvalidFilterError(
+                "Invalid number of values for filter:" + str(fltr)
+            )
+
+        # the values are checked against the field type like the value of other filters.
+        for value in fltr[2]:
+            if isinstance(value, str):
+                mismatch = all_fields[fltr[0]] == "INTEGER"
+            elif isinstance(value, int):
+                mismatch = all_fields[fltr[0]] == "TEXT"
+            else:
+                mismatch = True
+
+            if mismatch:
+                raise TypeMismatchError("Invalid type for data in filter:" + str(fltr))
+
+        for position in range(len(fltr[2])):
+            binds.append((index, self._chain_templates(itemgetter(position), normalize)))
+
+        return condition.format(column, ", ".join("?" * len(fltr[2])))
+
+    def _chain_templates(self, first, second):
+        """Helper Function to get the template applying two templates one after another.
+
+        Args:
+            first (function): Template applied first. NoneType to skip it.
+            second (function): Template applied to the result. NoneType to skip it.
+
+        Returns:
+            function: Template. NoneType if both are.
+        """
+        if first is None or second is None:
+            return first or second
+
+        return lambda value: second(first(value))
+
+    def _fulltext_query(self, field, tokenizer):
+        """Helper Function to get the template turning a value into a MATCH query.
+
+        Args:
+            field (string): Field Name.
+            tokenizer (string): Tokenizer of the full-text table.
+
+        Returns:
+            function: Template function taking the filter value.
+        """
+        suffix = "" if tokenizer == "trigram" else "*"
+
+        def template(value):
+            return field + ' : "' + value.replace('"', '""') + '"' + suffix
+
+        return template
+
+    @_schema_operation
+    def enable_fulltext(self, table_name, fields=None, tokenizer="unicode61"):
+        """Enable full-text search for the contains and does_not_contain filters.
+
+        An FTS5 table <table_name>_fts indexing the fields is created and kept in sync
+        with the table by triggers. find then answers contains filters on these
+        fields with a MATCH on the index instead of a LIKE scan of the table.
+
+        With the "unicode61" tokenizer a value matches records with words starting
+        with it (token and prefix search). With "trigram" it matches any substring,
+        like LIKE does, but values shorter than 3 characters still use LIKE.
+
+        Args:
+            table_name (string): Table Name.
+            fields (list, optional): List of Text fields to index. Defaults to all Text fields.
+            tokenizer (string, optional): Supported values are "unicode61" and "trigram".
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if not self.does_table_exist(table_name):
+            self._close_on_error()
+            raise TableError("Table " + table_name + " does not exist.")
+
+        if self.get_fulltext(table_name):
+            self._close_on_error()
+            raise TableError("Full-text search is already enabled for " + table_name)
+
+        if tokenizer not in FULLTEXT_TOKENIZERS:
+            self._close_on_error()
+            raise TypeMismatchError("Unsupported tokenizer: " + str(tokenizer))
+
+        all_fields = self.get_table_fields(table_name)
+        text_fields = [key for key, val in all_fields.items() if val == "TEXT"]
+        fields = fields or text_fields
+        for field in fields:
+            if field not in text_fields:
+                self._close_on_error()
+                raise TypeMismatchError("Full-text fields need to be Text: " + field)
+
+        fts_table = table_name + "_fts"
+        field_str = ", ".join(fields)
+        old_str = ", ".join("old." + field for field in fields)
+        new_str = ", ".join("new." + field for field in fields)
+        sql_commands = [
+            "CREATE VIRTUAL TABLE {0} USING fts5({1}, content='{2}', "
+            "content_rowid='id', tokenize='{3}');".format(
+                fts_table, field_str, table_name, tokenizer
+            ),
+            "CREATE TRIGGER {0}_ai AFTER INSERT ON {1} BEGIN "
+            "INSERT INTO {0}(rowid, {2}) VALUES (new.id, {3}); END;".format(
+                fts_table, table_name, field_str, new_str
+            ),
+            "CREATE TRIGGER {0}_ad AFTER DELETE ON {1} BEGIN "
+            "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); "
+            "END;".format(fts_table, table_name, field_str, old_str),
+            "CREATE TRIGGER {0}_au AFTER UPDATE ON {1} BEGIN "
+            "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); "
+            "INSERT INTO {0}(rowid, {2}) VALUES (new.id, {4}); END;".format(
+                fts_table, table_name, field_str, old_str, new_str
+            ),
+            "INSERT INTO {0}({0}) VALUES ('rebuild');".format(fts_table),
+        ]
+        try:
+            with self.savepoint():
+                for sql_command in sql_commands:
+                    self._execute(self.conn, sql_command)
+
+            self.clear_schema_cache()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def disable_fulltext(self, table_name):
+        """Disable full-text search and remove the full-text table of the table.
+
+        Args:
+            table_name (string): Table Name.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if not self.get_fulltext(table_name):
+            self._close_on_error()
+            raise TableError("Full-text search is not enabled for " + table_name)
+
+        fts_table = table_name + "_fts"
+        sql_commands = [
+            "DROP TRIGGER IF EXISTS {0}_ai;".format(fts_table),
+            "DROP TRIGGER IF EXISTS {0}_ad;".format(fts_table),
+            "DROP TRIGGER IF EXISTS {0}_au;".format(fts_table),
+            "DROP TABLE {0};".format(fts_table),
+        ]
+        try:
+            with self.savepoint():
+                for sql_command in sql_commands:
+                    self._execute(self.conn, sql_command)
+
+            self.clear_schema_cache()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def rebuild_fulltext(self, table_name):
+        """Rebuild and optimize the full-text index of the table from its records.
+
+        The triggers keep the index in sync, this is for maintenance e.g. after
+        records were changed with the triggers disabled or to merge index segments.
+
+        Args:
+            table_name (string): Table Name.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if not self.get_fulltext(table_name):
+            self._close_on_error()
+            raise TableError("Full-text search is not enabled for " + table_name)
+
+        fts_table = table_name + "_fts"
+        sql_commands = [
+            "INSERT INTO {0}({0}) VALUES ('rebuild');".format(fts_table),
+            "INSERT INTO {0}({0}) VALUES ('optimize');".format(fts_table),
+        ]
+        try:
+            for sql_command in sql_commands:
+                self._execute(self.conn, sql_command)
+
+            self._commit()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    def get_fulltext(self, table_name):
+        """Get the full-text search settings of the table.
+
+        Args:
+            table_name (string): Table Name.
+
+        Returns:
+            dict: Dictionary with the full-text "table", indexed "fields" and
+                "tokenizer". NoneType if full-text search isn't enabled.
+        """
+        self._check_schema_version()
+        if table_name in self._fulltext:
+            return self._fulltext[table_name]
+
+        fts_table = table_name + "_fts"
+        # most tables have none, so don't re-check the schema for it.
+        if fts_table not in self._get_table_names():
+            self._fulltext[table_name] = None
+            return None
+
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?;", [fts_table]
+        ).fetchone()
+        fulltext = None
+        if row and "fts5" in row[0].lower():
+            columns = self.conn.execute("PRAGMA TABLE_INFO(" + fts_table + ");")
+            tokenizer = re.search(r"tokenize='(\w+)", row[0])
+            fulltext = {
+                "table": fts_table,
+                "fields": [column[1] for column in columns.fetchall()],
+                "tokenizer": tokenizer.group(1) if tokenizer else "unicode61",
+            }
+
+        self._fulltext[table_name] = fulltext
+        return fulltext
+
+    @_schema_operation
+    def enable_normalized_key(self, table_name, field, key_type):
+        """Index a normalized key of a Text field for exact and prefix lookups.
+
+        A virtual column <field>__<key_type>_key computing the key is added and
+        indexed, so SQLite keeps it in sync on every write. find then compares is,
+        is_not, starts_with, in and not_in filters on the field against the key of
+        the filter value, e.g. "020 1234" finds "020-1234" with the "phone" key type.
+
+        Args:
+            table_name (string): Table Name.
+            field (string): Text field.
+            key_type (string): Key type, see NORMALIZED_KEY_TYPES. "phone" removes
+                the PHONE_SEPARATORS, "email" trims and lowercases.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        if not self.does_table_exist(table_name):
+            self._close_on_error()
+            raise TableError("Table " + table_name + " does not exist.")
+
+        if key_type not in NORMALIZED_KEY_TYPES:
+            self._close_on_error()
+            raise TypeMismatchError("Unsupported key type: " + str(key_type))
+
+        if self.get_table_fields(table_name).get(field) != "TEXT":
+            self._close_on_error()
+            raise TypeMismatchError("Normalized fields need to be Text: " + str(field))
+
+        if field in self.get_normalized_keys(table_name):
+            self._close_on_error()
+            raise TableError("Normalized key is already enabled for " + field)
+
+        column = NORMALIZED_KEY_COLUMN.format(field, key_type)
+        sql_commands = [
+            "ALTER TABLE {0} ADD COLUMN {1} TEXT GENERATED ALWAYS AS ({2}) VIRTUAL;".format(
+                table_name, column, NORMALIZED_KEY_TYPES[key_type][0].format(field)
+            ),
+            self._index_sql(table_name, [column], [column], False, None)[1],
+        ]
+        try:
+            with self.savepoint():
+                for sql_command in sql_commands:
+                    self._execute(self.conn, sql_command)
+
+            self.clear_schema_cache()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def disable_normalized_key(self, table_name, field):
+        """Remove the normalized key column and its index from a field.
+
+        Args:
+            table_name (string): Table Name.
+            field (string): Normalized field.
+
+        Returns:
+            bool: True if Successful. False if not.
+        """
+        key_type = self.get_normalized_keys(table_name).get(field)
+        if key_type is None:
+            self._close_on_error()
+            raise TableError("Normalized key is not enabled for " + str(field))
+
+        column = NORMALIZED_KEY_COLUMN.format(field, key_type)
+        index_name = self._index_sql(table_name, [column], [column], False, None)[0]
+        sql_commands = [
+            "DROP INDEX IF EXISTS {0};".format(index_name),
+            "ALTER TABLE {0} DROP COLUMN {1};".format(table_name, column),
+        ]
+        try:
+            with self.savepoint():
+                for sql_command in sql_commands:
+                    self._execute(self.conn, sql_command)
+
+            self.clear_schema_cache()
+            return True
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    def get_normalized_keys(self, table_name):
+        """Get the normalized fields of the table.
+
+        Key columns are hidden from get_table_fields, and so from finds and data.
+
+        Args:
+            table_name (string): Table Name.
+
+        Returns:
+            dict: Dictionary where key is field name and value is key type.
+        """
+        self._check_schema_version()
+        if table_name not in self._normalized_keys:
+            # both are read from the columns of the table.
+            self.get_table_fields(table_name)
+
+        return dict(self._normalized_keys.get(table_name, {}))
+
+    @_schema_operation
+    def update(self, table_name, _id, data):
+        """Update existing data in specified table. Ignores wrong fields.
+
+        Args:
+            table_name (string): Table Name.
+            _id (int): id of the record.
+            data (dict): New Data record.
+
+        Returns:
+            bool: True if Successful. False if not.
+
+        """
+        update_data_str = ""
+        all_fields = self._get_fields_of(table_name, data.keys())
+
+        for key, val in data.items():
+            if key not in all_fields.keys():
+                continue
+
+            if key == "id":
+                self._close_on_error()
+                raise IDError("ID field is Immutable and cannot be edited by user.")
 
             if isinstance(val, str):
                 # check if type is string but acceptable type is integer.
                 if all_fields[key] == "INTEGER":
-                    self.close_conn()
+                    self._close_on_error()
                     raise TypeMismatchError("Invalid data type for:" + key + ":" + val)
 
                 update_data_str += key + "='" + val + "', "
@@ -397,7 +2964,7 @@ class ContactsDB(object):
             elif isinstance(val, int):
                 # check if type is integer but acceptable type is string.
                 if all_fields[key] == "TEXT":
-                    self.close_conn()
+                    self._close_on_error()
                     raise TypeMismatchError("Invalid data type for:" + key + ":" + val)
 
                 update_data_str += key + "=" + str(val) + ", "
@@ -407,14 +2974,16 @@ class ContactsDB(object):
         sql_command = "UPDATE {0} SET {1} WHERE id={2}".format(
             table_name, update_data_str, _id
         )
+        self._mark_written(table_name)
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            self._execute(self.conn, sql_command)
+            self._commit()
             return True
         except:
-            self.close_conn()
+            self._close_on_error()
             return False
 
+    @_schema_operation
     def delete(self, table_name, _id):
         """Delete data record based on specified id.
 
@@ -426,36 +2995,302 @@ class ContactsDB(object):
             bool: True if Successful. False if not.
         """
         sql_command = "DELETE FROM " + table_name + " WHERE id=" + str(_id) + ";"
+        self._mark_written(table_name)
 
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            self._execute(self.conn, sql_command)
+            self._commit()
             return True
         except:
-            self.close_conn()
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def update_where(self, table_name, filters, data, operator="AND"):
+        """Update all records matching the filters in one statement. Ignores wrong fields.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters, see find. At least one of them needs to be
+                on a field of the table, use clear_all_data to change every record.
+            data (dict): New Data for the records.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+
+        Returns:
+            int: Number of records updated. False if the database operation failed.
+        """
+        where_str, params = self._compile_where(table_name, filters, operator)
+        all_fields = self.get_table_fields(table_name)
+        try:
+            keys = validate_data(all_fields, data)
+        except (TypeMismatchError, IDError):
+            self._close_on_error()
+            raise
+
+        if not keys:
+            return 0
+
+        sql_command = "UPDATE {0} SET {1} WHERE {2};".format(
+            table_name, ", ".join(key + " = ?" for key in keys), where_str
+        )
+        self._mark_written(table_name)
+        try:
+            cursor = self._execute(
+                self.conn, sql_command, [data[key] for key in keys] + params
+            )
+            self._commit()
+            return cursor.rowcount
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
+            return False
+
+    @_schema_operation
+    def delete_where(self, table_name, filters, operator="AND", chunk_size=DELETE_CHUNK_SIZE):
+        """Delete all records matching the filters in chunks of ids.
+
+        The id range of the matching records is split into ranges of chunk_size ids,
+        and every range is deleted and committed on its own, so other writers are
+        never locked out for longer than one chunk. Records added after the delete
+        started are not deleted. Inside a transaction block nothing is committed
+        until the block ends.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters, see find. At least one of them needs to be
+                on a field of the table, use clear_all_data to delete every record.
+            operator (str, optional): Operator for filters. Supported Operators: AND and OR
+            chunk_size (int, optional): Number of ids deleted per transaction.
+
+        Returns:
+            int: Number of records deleted. False if the database operation failed,
+                the chunks deleted before the failure stay deleted.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size needs to be a positive integer.")
+
+        where_str, params = self._compile_where(table_name, filters, operator)
+        sql_command = "SELECT MIN(id), MAX(id) FROM {0} WHERE {1};".format(
+            table_name, where_str
+        )
+        try:
+            first_id, last_id = self._execute(self.conn, sql_command, params).fetchone()
+        except:
+            print("Database Operation Failed:", sql_command)
+            self._close_on_error()
             return False
 
+        if first_id is None:
+            return 0
+
+        sql_command = "DELETE FROM {0} WHERE id >= ? AND id < ? AND ({1});".format(
+            table_name, where_str
+        )
+        deleted = 0
+        for start in range(first_id, last_id + 1, chunk_size):
+            self._mark_written(table_name)
+            try:
+                cursor = self._execute(
+                    self.conn, sql_command, [start, start + chunk_size] + params
+                )
+                self._commit()
+            except:
+                print("Database Operation Failed:", sql_command)
+                self._close_on_error()
+                return False
+
+            deleted += cursor.rowcount
+
+        return deleted
+
+    def _compile_where(self, table_name, filters, operator):
+        """Helper Function to build the WHERE clause and parameters for update_where and delete_where.
+
+        Args:
+            table_name (string): Table Name.
+            filters (list): List of filters.
+            operator (str): Operator for filters.
+
+        Returns:
+            tuple: (where_str, params)
+        """
+        shape = self._filter_shape(filters)
+        try:
+            self._check_schema_version()
+        except sl.Error:
+            self._compiled_queries.clear()
+
+        key = ("where", table_name, operator, tuple(shape))
+        compiled = self._compiled_queries.get(key)
+        if compiled is None:
+            if not self.does_table_exist(table_name):
+                self._close_on_error()
+                raise TableError("Table " + table_name + " does not exist.")
+
+            all_fields = self._get_fields_of(table_name, self._filter_fields(filters))
+            try:
+                where_str, binds = self._compile_filters(
+                    all_fields,
+                    filters,
+                    operator,
+                    self.get_fulltext(table_name),
+                    self.get_normalized_keys(table_name),
+                )
+            except (TypeMismatchError, InvalidFilterError):
+                self._close_on_error()
+                raise
+
+            # filters on missing fields are ignored, which would match every record.
+            if not where_str:
+                self._close_on_error()
+                raise InvalidFilterError(
+                    "No filter on a field of table " + table_name + "."
+                )
+
+            compiled = (where_str, binds)
+            self._cache_compiled(key, compiled)
+
+        else:
+            self._compiled_queries.move_to_end(key)
+
+        where_str, binds = compiled
+        return where_str, self._bind_filters(binds, filters)
+
     def get_table_fields(self, table_name):
         """Get all fields of specified table name.
 
+        Fields are cached per table and only re-read after the schema changes. Hidden
+        columns, like the key columns of normalized fields, aren't fields.
+
         Args:
             table_name (string): Table Name.
 
         Returns:
             dict: Dictionary where key is field name and value is data_type
         """
-        sql_command = "PRAGMA TABLE_INFO(" + table_name + ");"
+        sql_command = "PRAGMA TABLE_XINFO(" + table_name + ");"
         try:
-            data = self.conn.execute(sql_command)
+            self._check_schema_version()
+            if table_name in self._table_fields:
+                return dict(self._table_fields[table_name])
+
+            data = self._execute(self.conn, sql_command)
         except:
             print("Database Operation Failed:", sql_command)
             return False
 
         field_dict = {}
+        hidden = []
         for d in data.fetchall():
-            field_dict[d[1]] = d[2]
+            if d[6]:
+                hidden.append(d)
+            else:
+                field_dict[d[1]] = d[2]
+
+        # an empty result means the table doesn't exist, so there is nothing to cache.
+        if field_dict:
+            self._table_fields[table_name] = field_dict
+            self._normalized_keys[table_name] = self._parse_normalized_keys(
+                field_dict, hidden
+            )
+
+        return dict(field_dict)
+
+    def _get_fields_of(self, table_name, names):
+        """Helper Function to get the fields of a table that should have the named fields.
+
+        A name missing from the cached fields re-checks the schema version first, so
+        fields added by other connections aren't mistaken for invalid ones.
+
+        Args:
+            table_name (string): Table Name.
+            names (iterable): Field names the caller is about to use.
+
+        Returns:
+            dict: Dictionary where key is field name and value is data_type
+        """
+        all_fields = self.get_table_fields(table_name)
+        if any(name not in all_fields for name in names):
+            if self._check_schema_version(force=True):
+                all_fields = self.get_table_fields(table_name)
+
+        return all_fields
+
+    def _parse_normalized_keys(self, all_fields, hidden):
+        """Helper Function to find the normalized fields in the hidden columns of a table.
+
+        Args:
+            all_fields (dict): Dictionary where key is field name and value is data_type
+            hidden (list): PRAGMA TABLE_XINFO rows of the hidden columns.
+
+        Returns:
+            dict: Dictionary where key is field name and value is key type.
+        """
+        keys = {}
+        for column in hidden:
+            match = re.match(r"^(\w+)__(\w+)_key$", column[1])
+            # generated columns are hidden, 2 is virtual and 3 is stored.
+            if (
+                match
+                and column[6] in (2, 3)
+                and match.group(1) in all_fields
+                and match.group(2) in NORMALIZED_KEY_TYPES
+            ):
+                keys[match.group(1)] = match.group(2)
+
+        return keys
+
+    def clear_schema_cache(self):
+        """Clears cached table names, fields, full-text and key settings, statements and results.
+
+        This is done automatically after create_table and delete_table, and whenever
+        the schema version of the database changes. Call it after changing the schema
+        through self.conn directly.
+        """
+        self._table_names = None
+        self._table_fields.clear()
+        self._fulltext.clear()
+        self._normalized_keys.clear()
+        self._compiled_queries.clear()
+        self._schema_version = None
+        self._schema_checked = 0.0
+        self.clear_result_cache()
+
+    def _check_schema_version(self, force=False):
+        """Helper Function to drop the schema cache if the database schema changed.
+
+        PRAGMA schema_version is bumped by SQLite on every schema change, including
+        the ones made by other processes. It is checked at most once per operation
+        and once per schema_check_interval seconds, unless forced.
+
+        Args:
+            force (bool, optional): Check it even if it was checked within the interval.
+
+        Returns:
+            bool: True if the schema cache was dropped.
+        """
+        if not force and self._operation_depth:
+            # checked at the start of the operation, see _schema_operation.
+            return False
+
+        now = time.monotonic()
+        elapsed = now - self._schema_checked
+        if not force and self._schema_checked and elapsed < self.schema_check_interval:
+            return False
+
+        self._schema_checked = now
+        version = self.conn.execute("PRAGMA schema_version;").fetchone()[0]
+        if version != self._schema_version:
+            self._table_names = None
+            self._table_fields.clear()
+            self._fulltext.clear()
+            self._normalized_keys.clear()
+            self._compiled_queries.clear()
+            self.clear_result_cache()
+            self._schema_version = version
+            return True
 
-        return field_dict
+        return False
 
     def clear_all_data(self, table_name):
         """Clears all data in the specified table.
@@ -467,14 +3302,101 @@ class ContactsDB(object):
             bool: True if Successful. False if not.
         """
         sql_command = "DELETE FROM " + table_name + ";"
+        self._mark_written(table_name)
         try:
-            self.conn.execute(sql_command)
-            self.conn.commit()
+            self._execute(self.conn, sql_command)
+            self._commit()
             return True
         except:
-            self.close_conn()
+            self._close_on_error()
             return False
 
+    @contextmanager
+    def transaction(self):
+        """Run several operations in one transaction.
+
+        Operations inside the block don't commit on their own. Everything is
+        committed once at the end of the block, or rolled back if it raises. Nested
+        transactions are savepoints. Failing operations inside a transaction don't
+        close the connection.
+
+        Example:
+            with contacts_db.transaction():
+                contacts_db.add("Contacts", {"name": "ABC"})
+                contacts_db.update("Contacts", 1, {"name": "DEF"})
+
+        Yields:
+            ContactsDB: This Database.
+        """
+        if self._transaction_depth:
+            with self.savepoint():
+                yield self
+
+            return
+
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            self.conn.rollback()
+            self.clear_schema_cache()
+            raise
+
+        self._transaction_depth -= 1
+        self.conn.commit()
+
+    @contextmanager
+    def savepoint(self):
+        """Run several operations as a savepoint that can be rolled back on its own.
+
+        Inside a transaction only the operations of the block are rolled back if it
+        raises. Outside of a transaction it behaves like transaction().
+
+        Yields:
+            ContactsDB: This Database.
+        """
+        self._savepoint_count += 1
+        name = "contacts_sp_" + str(self._savepoint_count)
+        self.conn.execute("SAVEPOINT " + name + ";")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            self.conn.execute("ROLLBACK TO " + name + ";")
+            self.conn.execute("RELEASE " + name + ";")
+            self.clear_schema_cache()
+            raise
+
+        self._transaction_depth -= 1
+        self.conn.execute("RELEASE " + name + ";")
+
+    def in_transaction(self):
+        """Check if a transaction or savepoint block is running.
+
+        Returns:
+            bool: True if it is. False if not.
+        """
+        return self._transaction_depth > 0
+
+    def _commit(self):
+        """Helper Function to commit unless a transaction block is running."""
+        if not self._transaction_depth:
+            self.conn.commit()
+
+    def _close_on_error(self):
+        """Helper Function to close the connection after a failed operation.
+
+        Inside a transaction the connection is kept open so the transaction can
+        still be rolled back by the caller.
+        """
+        if not self._transaction_depth:
+            self.conn.close()
+
     def close_conn(self):
         """Closes Connection."""
         self.conn.close()
@@ -0,0 +1,310 @@
+"""asyncio Front-end for the Contacts Application Database API.
+
+Author: Shobhit Khinvasara
+"""
+import copy
+import json
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .contacts_db import ContactsDB
+except ImportError:
+    from contacts_db import ContactsDB
+
+
+def _read_method(name):
+    """Build a coroutine running ContactsDB.<name> as a read that can be coalesced.
+
+    Args:
+        name (string): ContactsDB method name.
+
+    Returns:
+        function: Coroutine function.
+    """
+
+    async def method(self, *args, **kwargs):
+        return await self._read(name, args, kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Run ContactsDB.{0} on the database thread.".format(name)
+    return method
+
+
+def _write_method(name):
+    """Build a coroutine running ContactsDB.<name> as a write.
+
+    Args:
+        name (string): ContactsDB method name.
+
+    Returns:
+        function: Coroutine function.
+    """
+
+    async def method(self, *args, **kwargs):
+        return await self._write(name, args, kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Run ContactsDB.{0} on the database thread.".format(name)
+    return method
+
+
+class AsyncContactsDB(object):
+    """ContactsDB with coroutines that don't block the event loop.
+
+    All SQLite work runs on one dedicated thread, in the order it was submitted.
+    At most max_pending operations are queued for that thread, further callers wait
+    in the event loop. Identical reads running at the same time share one query,
+    reads submitted after a write never share a query submitted before it.
+
+    Example:
+        async with AsyncContactsDB(db_path) as contacts_db:
+            records = await contacts_db.find("Contacts", [["name", "is", "ABC"]])
+            async for record in contacts_db.iter_find("Contacts"):
+                print(record)
+
+    Attributes:
+        contacts_db (ContactsDB): Database, only used from the database thread.
+        max_pending (int): Maximum number of operations queued for the database thread.
+        coalesced (int): Number of reads answered by a query already running.
+    """
+
+    def __init__(self, db_path, max_pending=64, **kwargs):
+        """Opens the database on its thread.
+
+        Args:
+            db_path (string): Path to Local SQLite Database.
+            max_pending (int, optional): Maximum number of operations queued for the
+                database thread.
+            **kwargs: Keyword arguments of ContactsDB, like profile.
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending needs to be a positive integer.")
+
+        self.max_pending = max_pending
+        self.coalesced = 0
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="contacts_db")
+        self._pending = None
+        self._inflight = {}
+        self._generation = 0
+        self.contacts_db = self._executor.submit(ContactsDB, db_path, **kwargs).result()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close_conn()
+
+    def find(self, table_name, *args, stream=False, **kwargs):
+        """Find records in the table matching the filters, see ContactsDB.find.
+
+        Args:
+            table_name (string): Table Name.
+            *args: Positional arguments of ContactsDB.find.
+            stream (bool, optional): Set this to get an async iterator from
+                iter_find instead of a list.
+            **kwargs: Keyword arguments of ContactsDB.find.
+
+        Returns:
+            coroutine: Coroutine returning the list of records. An async iterator of
+                the records with stream=True.
+        """
+        if stream:
+            return self.iter_find(table_name, *args, **kwargs)
+
+        return self._read("find", (table_name,) + args, kwargs)
+
+    async def iter_find(self, table_name, *args, batch_size=1000, **kwargs):
+        """Find records in the table and yield them asynchronously, see ContactsDB.iter_find.
+
+        Rows are fetched batch_size at a time on the database thread, so the event
+        loop only waits for one batch at a time.
+
+        Args:
+            table_name (string): Table Name.
+            *args: Positional arguments of ContactsDB.iter_find.
+            batch_size (int, optional): Number of rows fetched at a time.
+            **kwargs: Keyword arguments of ContactsDB.iter_find.
+
+        Yields:
+            dict: Dictionary with {field:value}
+        """
+        rows = await self._submit(
+            self.contacts_db.iter_find,
+            table_name,
+            *args,
+            batch_size=batch_size,
+            **kwargs
+        )
+        if rows is False:
+            return
+
+        try:
+            while True:
+                batch = await self._submit(list, itertools.islice(rows, batch_size))
+                for row in batch:
+                    yield row
+
+                if len(batch) < batch_size:
+                    return
+        finally:
+            await self._submit(rows.close)
+
+    async def run(self, function, *args, **kwargs):
+        """Run a function with the ContactsDB on the database thread.
+
+        Use it for work that needs several operations in a row, like a transaction.
+        It counts as a write.
+
+        Example:
+            def move(contacts_db):
+                with contacts_db.transaction():
+                    contacts_db.update("Contacts", 1, {"city": "Pune"})
+                    contacts_db.delete("Contacts", 2)
+
+            await contacts_db.run(move)
+
+        Args:
+            function (function): Function called with the ContactsDB.
+            *args: Further positional arguments of function.
+            **kwargs: Keyword arguments of function.
+
+        Returns:
+            object: Return value of function.
+        """
+        self._generation += 1
+        return await self._submit(function, self.contacts_db, *args, **kwargs)
+
+    async def export_csv(self, table_name, *args, **kwargs):
+        """Write the records of the table to a CSV file, see ContactsDB.export_csv.
+
+        The file is written on the database thread. Unlike other reads, identical
+        exports running at the same time each write their file.
+
+        Args:
+            table_name (string): Table Name.
+            *args: Positional arguments of ContactsDB.export_csv.
+            **kwargs: Keyword arguments of ContactsDB.export_csv.
+
+        Returns:
+            int: Number of records written. False if the database operation failed.
+        """
+        return await self._submit(
+            self.contacts_db.export_csv, table_name, *args, **kwargs
+        )
+
+    async def close_conn(self):
+        """Closes the database and stops its thread."""
+        try:
+            await self._submit(self.contacts_db.close_conn)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    does_table_exist = _read_method("does_table_exist")
+    list_tables = _read_method("list_tables")
+    get_table_fields = _read_method("get_table_fields")
+    list_indexes = _read_method("list_indexes")
+    get_fulltext = _read_method("get_fulltext")
+    get_normalized_keys = _read_method("get_normalized_keys")
+    find_page = _read_method("find_page")
+    count = _read_method("count")
+    aggregate = _read_method("aggregate")
+    distinct = _read_method("distinct")
+    explain = _read_method("explain")
+
+    create_table = _write_method("create_table")
+    delete_table = _write_method("delete_table")
+    create_index = _write_method("create_index")
+    drop_index = _write_method("drop_index")
+    enable_fulltext = _write_method("enable_fulltext")
+    disable_fulltext = _write_method("disable_fulltext")
+    rebuild_fulltext = _write_method("rebuild_fulltext")
+    enable_normalized_key = _write_method("enable_normalized_key")
+    disable_normalized_key = _write_method("disable_normalized_key")
+    add = _write_method("add")
+    add_many = _write_method("add_many")
+    import_csv = _write_method("import_csv")
+    update = _write_method("update")
+    delete = _write_method("delete")
+    update_where = _write_method("update_where")
+    delete_where = _write_method("delete_where")
+    clear_all_data = _write_method("clear_all_data")
+
+    async def _read(self, name, args, kwargs):
+        """Helper Function to run a read, or wait for the identical read already running.
+
+        Args:
+            name (string): ContactsDB method name.
+            args (tuple): Positional arguments.
+            kwargs (dict): Keyword arguments.
+
+        Returns:
+            object: Result of the read. Callers sharing a query get their own copy,
+                the shared result itself is never handed out.
+        """
+        key = (
+            name,
+            self._generation,
+            json.dumps([args, kwargs], sort_keys=True, default=repr),
+        )
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            inflight[1] += 1
+            return copy.deepcopy(await asyncio.shield(inflight[0]))
+
+        future = self._submit(getattr(self.contacts_db, name), *args, **kwargs)
+        inflight = [future, 0]
+        self._inflight[key] = inflight
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+
+        # callers that shared the query may not have copied the result yet.
+        return copy.deepcopy(result) if inflight[1] else result
+
+    async def _write(self, name, args, kwargs):
+        """Helper Function to run a write.
+
+        Args:
+            name (string): ContactsDB method name.
+            args (tuple): Positional arguments.
+            kwargs (dict): Keyword arguments.
+
+        Returns:
+            object: Result of the write.
+        """
+        self._generation += 1
+        return await self._submit(getattr(self.contacts_db, name), *args, **kwargs)
+
+    def _submit(self, function, *args, **kwargs):
+        """Helper Function to schedule a function for the database thread.
+
+        The task is created right away so operations reach the thread in the
+        order they were called.
+
+        Returns:
+            Task: Task returning the return value of function.
+        """
+        return asyncio.ensure_future(self._execute(function, *args, **kwargs))
+
+    async def _execute(self, function, *args, **kwargs):
+        """Helper Function to run a function on the database thread.
+
+        Waits in the event loop while max_pending operations are queued.
+
+        Returns:
+            object: Return value of function.
+        """
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(function, *args, **kwargs)
+            )
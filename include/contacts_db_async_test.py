@@ -0,0 +1,148 @@
+"""Unit Test for the Contacts Database asyncio Front-end
+
+Author: Shobhit Khinvasara
+"""
+import os
+import asyncio
+import tempfile
+import unittest
+from contacts_db_async import AsyncContactsDB
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestAsyncContactsDb(unittest.TestCase):
+
+    """Unit Test Class for testing the asyncio front-end.
+
+    Every test runs its own event loop on its own in-memory database.
+    """
+
+    async def open_db(self, records=10):
+        """Helper Function to open a database with a table of records."""
+        contacts_db = AsyncContactsDB(":memory:", max_pending=4)
+        await contacts_db.create_table("Async_Table", {"name": "text", "age": "integer"})
+        await contacts_db.add_many(
+            "Async_Table", [{"name": "N" + str(i), "age": i} for i in range(records)]
+        )
+        return contacts_db
+
+    def test_1_coroutines(self):
+        """Unit Test to test add, find, update and delete as coroutines."""
+
+        async def run():
+            async with await self.open_db() as contacts_db:
+                await contacts_db.add("Async_Table", {"name": "abc", "age": 40})
+                await contacts_db.update("Async_Table", 1, {"name": "def"})
+                await contacts_db.delete("Async_Table", 2)
+                return await contacts_db.find(
+                    "Async_Table", [["age", "less_than", 3]], ["name"]
+                )
+
+        self.assertEqual(asyncio.run(run()), [{"name": "def"}, {"name": "N2"}])
+
+    def test_2_iter_find(self):
+        """Unit Test to test async iteration over streamed finds."""
+
+        async def run():
+            async with await self.open_db(25) as contacts_db:
+                rows = contacts_db.find("Async_Table", fields=["age"], stream=True)
+                ages = [row["age"] async for row in rows]
+                partial = contacts_db.iter_find("Async_Table", batch_size=4)
+                first = await partial.__anext__()
+                await partial.aclose()
+                return ages, first["name"]
+
+        ages, first = asyncio.run(run())
+        self.assertEqual(ages, list(range(25)))
+        self.assertEqual(first, "N0")
+
+    def test_3_coalesce_reads(self):
+        """Unit Test to test that identical concurrent reads share one query."""
+
+        async def run():
+            async with await self.open_db() as contacts_db:
+                filters = [["age", "greater_than", 5]]
+                results = await asyncio.gather(
+                    *[contacts_db.find("Async_Table", filters) for _ in range(20)]
+                )
+                coalesced = contacts_db.coalesced
+                # a read after a write doesn't share the read before it.
+                before = contacts_db.find("Async_Table", filters)
+                write = contacts_db.add("Async_Table", {"name": "ghi", "age": 50})
+                after = contacts_db.find("Async_Table", filters)
+                before, _, after = await asyncio.gather(before, write, after)
+                return results, coalesced, len(before), len(after)
+
+        results, coalesced, before, after = asyncio.run(run())
+        self.assertEqual(coalesced, 19)
+        self.assertEqual(all(result == results[0] for result in results), True)
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual((before, after), (4, 5))
+
+    def test_4_csv(self):
+        """Unit Test to test CSV exports and imports as coroutines."""
+
+        async def run(csv_path):
+            async with await self.open_db() as contacts_db:
+                count = await contacts_db.export_csv("Async_Table", csv_path)
+                await contacts_db.clear_all_data("Async_Table")
+                imported = await contacts_db.import_csv("Async_Table", csv_path)
+                return count, imported, await contacts_db.count("Async_Table")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            count, imported, total = asyncio.run(run(os.path.join(temp_dir, "async.csv")))
+
+        self.assertEqual(count, 10)
+        self.assertEqual(imported, (10, []))
+        self.assertEqual(total, 10)
+
+    def test_5_fulltext_and_normalized_keys(self):
+        """Unit Test to test full-text and normalized key settings as coroutines."""
+
+        async def run():
+            async with await self.open_db() as contacts_db:
+                await contacts_db.create_table("Phone_Table", {"phone": "text"})
+                await contacts_db.add("Phone_Table", {"phone": "020-1234"})
+                await contacts_db.enable_normalized_key("Phone_Table", "phone", "phone")
+                keys = await contacts_db.get_normalized_keys("Phone_Table")
+                found = await contacts_db.find(
+                    "Phone_Table", [["phone", "is", "020 1234"]], ["phone"]
+                )
+                await contacts_db.disable_normalized_key("Phone_Table", "phone")
+
+                await contacts_db.enable_fulltext("Async_Table", ["name"])
+                await contacts_db.rebuild_fulltext("Async_Table")
+                fulltext = await contacts_db.get_fulltext("Async_Table")
+                await contacts_db.disable_fulltext("Async_Table")
+                disabled = await contacts_db.get_fulltext("Async_Table")
+                return keys, found, fulltext["fields"], disabled
+
+        keys, found, fields, disabled = asyncio.run(run())
+        self.assertEqual(keys, {"phone": "phone"})
+        self.assertEqual(found, [{"phone": "020-1234"}])
+        self.assertEqual(fields, ["name"])
+        self.assertIsNone(disabled)
+
+    def test_6_coalesced_copies(self):
+        """Unit Test to test that changes to a shared result don't reach other callers."""
+
+        async def run():
+            async with await self.open_db() as contacts_db:
+
+                async def leader():
+                    records = await contacts_db.find("Async_Table", fields=["age"])
+                    records.clear()
+                    return records
+
+                follower = contacts_db.find("Async_Table", fields=["age"])
+                results = await asyncio.gather(leader(), follower)
+                return results, contacts_db.coalesced
+
+        (cleared, records), coalesced = asyncio.run(run())
+        self.assertEqual(coalesced, 1)
+        self.assertEqual(cleared, [])
+        self.assertEqual([record["age"] for record in records], list(range(10)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,356 @@
+"""Thread-safe Connection Pool for the Contacts Application Database API.
+
+Author: Shobhit Khinvasara
+"""
+import sqlite3 as sl
+import threading
+from contextlib import contextmanager
+
+try:
+    from .contacts_db import ContactsDB, DatabaseError
+except ImportError:
+    from contacts_db import ContactsDB, DatabaseError
+
+
+def _reader_method(name):
+    """Build a pool method running ContactsDB.<name> on a reader connection.
+
+    Args:
+        name (string): ContactsDB method name.
+
+    Returns:
+        function: Pool method.
+    """
+
+    def method(self, *args, **kwargs):
+        with self.reader() as contacts_db:
+            return getattr(contacts_db, name)(*args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Run ContactsDB.{0} on a reader connection.".format(name)
+    return method
+
+
+def _writer_method(name):
+    """Build a pool method running ContactsDB.<name> on the writer connection.
+
+    Args:
+        name (string): ContactsDB method name.
+
+    Returns:
+        function: Pool method.
+    """
+
+    def method(self, *args, **kwargs):
+        with self.writer() as contacts_db:
+            return getattr(contacts_db, name)(*args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = "Run ContactsDB.{0} on the writer connection.".format(name)
+    return method
+
+
+class ContactsDBPool(object):
+    """Thread-safe pool of ContactsDB connections sharing one database file.
+
+    Reads run on a bounded set of read-only connections, each checked out by one
+    thread at a time, so they run concurrently under WAL. Writes are serialized on
+    a single writer connection. The pool has the same methods as ContactsDB.
+
+    Connections are health checked on checkout. ContactsDB closes its connection
+    when an operation fails, such connections are replaced transparently.
+
+    Attributes:
+        db_path (string): Path to the Database file.
+        max_readers (int): Maximum number of reader connections.
+        profile (str or dict): Connection tuning profile of all connections.
+        timeout (float): Seconds to wait for a free connection.
+        result_cache (bool or dict): Result cache settings of every connection.
+    """
+
+    def __init__(
+        self, db_path, max_readers=4, profile="balanced", timeout=30.0, result_cache=None
+    ):
+        """Initializes the pool and its writer connection.
+
+        Args:
+            db_path (string): Path to Local SQLite Database. ":memory:" isn't supported
+                as every connection would get its own database.
+            max_readers (int, optional): Maximum number of reader connections.
+            profile (str or dict, optional): Connection tuning profile. It needs to use
+                WAL so readers don't block on the writer.
+            timeout (float, optional): Seconds to wait for a free connection.
+            result_cache (bool or dict, optional): Set this to cache find and aggregate
+                results on every connection, see ContactsDB.set_result_cache. Every
+                reader has its own cache, commits of the writer invalidate them.
+        """
+        if db_path == ":memory:":
+            raise DatabaseError("In-memory databases can't be shared by a pool.")
+
+        if max_readers < 1:
+            raise ValueError("max_readers needs to be a positive integer.")
+
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.profile = profile
+        self.timeout = timeout
+        self.result_cache = result_cache
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        # idle readers with the schema generation their schema cache matches.
+        self._idle_readers = []
+        self._writer_lock = threading.RLock()
+        self._schema_generation = 0
+        self._closed = False
+        self._writer = self._connect()
+        self._schema_version = self._read_schema_version(self._writer)
+
+    @contextmanager
+    def reader(self):
+        """Check out a read-only connection for the current thread.
+
+        Nested checkouts in the same thread reuse the same connection.
+
+        Yields:
+            ContactsDB: Read-only Database.
+        """
+        contacts_db = getattr(self._local, "reader", None)
+        if contacts_db is not None:
+            yield contacts_db
+            return
+
+        if self._closed:
+            raise DatabaseError("Connection pool is closed.")
+
+        if not self._reader_slots.acquire(timeout=self.timeout):
+            raise DatabaseError("Timed out waiting for a reader connection.")
+
+        try:
+            contacts_db, generation = self._take_reader()
+            self._local.reader = contacts_db
+            try:
+                yield contacts_db
+            finally:
+                self._local.reader = None
+                self._return_reader(contacts_db, generation)
+        finally:
+            self._reader_slots.release()
+
+    @contextmanager
+    def writer(self):
+        """Check out the writer connection. Writers are serialized.
+
+        Yields:
+            ContactsDB: Database.
+        """
+        if self._closed:
+            raise DatabaseError("Connection pool is closed.")
+
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            raise DatabaseError("Timed out waiting for the writer connection.")
+
+        try:
+            if not self._is_healthy(self._writer):
+                self._writer = self._connect()
+
+            yield self._writer
+        finally:
+            try:
+                # readers drop their cached schema after DDL run by the writer.
+                version = self._read_schema_version(self._writer)
+                if version != self._schema_version:
+                    self._schema_version = version
+                    with self._lock:
+                        self._schema_generation += 1
+            finally:
+                self._writer_lock.release()
+
+    @contextmanager
+    def transaction(self):
+        """Run several writes in one transaction on the writer connection.
+
+        The writer is held for the whole block. Use the yielded Database inside the
+        block, reads through the pool don't see the uncommitted changes.
+
+        Yields:
+            ContactsDB: Writer Database.
+        """
+        with self.writer() as contacts_db:
+            with contacts_db.transaction():
+                yield contacts_db
+
+    def close_conn(self):
+        """Closes all connections of the pool."""
+        with self._writer_lock:
+            with self._lock:
+                self._closed = True
+                for contacts_db, _ in self._idle_readers:
+                    self._close(contacts_db)
+
+                self._idle_readers = []
+
+            self._close(self._writer)
+
+    def find(self, *args, **kwargs):
+        """Run ContactsDB.find on a reader connection.
+
+        With stream=True the rows are streamed by iter_find.
+        """
+        if kwargs.pop("stream", False):
+            return self.iter_find(*args, **kwargs)
+
+        with self.reader() as contacts_db:
+            return contacts_db.find(*args, **kwargs)
+
+    def iter_find(self, *args, **kwargs):
+        """Run ContactsDB.iter_find on a reader connection.
+
+        The reader connection is held until the generator is exhausted or closed.
+        Unlike ContactsDB.iter_find the filters are validated on the first next().
+
+        Yields:
+            dict: Dictionary with {field:value}
+        """
+        with self.reader() as contacts_db:
+            rows = contacts_db.iter_find(*args, **kwargs)
+            if rows is False:
+                return
+
+            yield from rows
+
+    does_table_exist = _reader_method("does_table_exist")
+    list_tables = _reader_method("list_tables")
+    get_table_fields = _reader_method("get_table_fields")
+    list_indexes = _reader_method("list_indexes")
+    get_fulltext = _reader_method("get_fulltext")
+    get_normalized_keys = _reader_method("get_normalized_keys")
+    find_page = _reader_method("find_page")
+    count = _reader_method("count")
+    aggregate = _reader_method("aggregate")
+    distinct = _reader_method("distinct")
+    explain = _reader_method("explain")
+    export_csv = _reader_method("export_csv")
+
+    create_table = _writer_method("create_table")
+    delete_table = _writer_method("delete_table")
+    create_index = _writer_method("create_index")
+    drop_index = _writer_method("drop_index")
+    enable_fulltext = _writer_method("enable_fulltext")
+    disable_fulltext = _writer_method("disable_fulltext")
+    rebuild_fulltext = _writer_method("rebuild_fulltext")
+    enable_normalized_key = _writer_method("enable_normalized_key")
+    disable_normalized_key = _writer_method("disable_normalized_key")
+    add = _writer_method("add")
+    add_many = _writer_method("add_many")
+    import_csv = _writer_method("import_csv")
+    update = _writer_method("update")
+    delete = _writer_method("delete")
+    update_where = _writer_method("update_where")
+    delete_where = _writer_method("delete_where")
+    clear_all_data = _writer_method("clear_all_data")
+
+    def _connect(self, read_only=False):
+        """Helper Function to open a pooled connection.
+
+        Args:
+            read_only (bool, optional): Set this to reject writes on the connection.
+
+        Returns:
+            ContactsDB: Database.
+        """
+        contacts_db = ContactsDB(
+            self.db_path,
+            profile=self.profile,
+            check_same_thread=False,
+            result_cache=self.result_cache,
+        )
+        if read_only:
+            contacts_db.conn.execute("PRAGMA query_only=ON;")
+
+        return contacts_db
+
+    def _take_reader(self):
+        """Helper Function to get a healthy idle reader or open a new one.
+
+        Returns:
+            tuple: (contacts_db, generation) where contacts_db is the Read-only
+                Database and generation the schema generation its cache matches.
+        """
+        with self._lock:
+            contacts_db, synced = (
+                self._idle_readers.pop() if self._idle_readers else (None, None)
+            )
+            generation = self._schema_generation
+
+        if contacts_db is not None and not self._is_healthy(contacts_db):
+            self._close(contacts_db)
+            contacts_db = None
+
+        if contacts_db is None:
+            return self._connect(read_only=True), generation
+
+        if synced != generation:
+            contacts_db.clear_schema_cache()
+
+        return contacts_db, generation
+
+    def _return_reader(self, contacts_db, generation):
+        """Helper Function to put a reader back into the idle list.
+
+        Args:
+            contacts_db (ContactsDB): Read-only Database.
+            generation (int): Schema generation the cache of the reader matches.
+        """
+        if not self._is_healthy(contacts_db):
+            self._close(contacts_db)
+            return
+
+        if contacts_db.conn.in_transaction:
+            contacts_db.conn.rollback()
+
+        with self._lock:
+            if self._closed:
+                self._close(contacts_db)
+            else:
+                self._idle_readers.append((contacts_db, generation))
+
+    def _is_healthy(self, contacts_db):
+        """Helper Function to check that a connection is open and usable.
+
+        Args:
+            contacts_db (ContactsDB): Database.
+
+        Returns:
+            bool: True if it is. False if not.
+        """
+        try:
+            contacts_db.conn.execute("SELECT 1;").fetchone()
+            return True
+        except sl.Error:
+            return False
+
+    def _read_schema_version(self, contacts_db):
+        """Helper Function to read the schema version of the database.
+
+        Args:
+            contacts_db (ContactsDB): Database.
+
+        Returns:
+            int: Schema version. NoneType if the connection isn't usable.
+        """
+        try:
+            return contacts_db.conn.execute("PRAGMA schema_version;").fetchone()[0]
+        except sl.Error:
+            return None
+
+    def _close(self, contacts_db):
+        """Helper Function to close a connection ignoring errors.
+
+        Args:
+            contacts_db (ContactsDB): Database.
+        """
+        try:
+            contacts_db.close_conn()
+        except sl.Error:
+            pass
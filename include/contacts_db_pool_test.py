@@ -0,0 +1,107 @@
+"""Unit Test for the Contacts Database Connection Pool
+
+Author: Shobhit Khinvasara
+"""
+import os
+import tempfile
+import threading
+import unittest
+import contacts_db
+from contacts_db_pool import ContactsDBPool
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsDbPool(unittest.TestCase):
+
+    """Unit Test Class for testing the connection pool.
+
+    Attributes:
+        pool (ContactsDBPool): Connection Pool.
+        temp_dir (TemporaryDirectory): Temporary directory holding the database.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pool = ContactsDBPool(
+            os.path.join(self.temp_dir.name, "contacts.db"), max_readers=3
+        )
+        self.pool.create_table("Pool_Table", {"name": "text", "age": "integer"})
+
+    def test_1_concurrent_reads_and_writes(self):
+        """Unit Test to test finds from many threads while another thread writes."""
+        errors = []
+
+        def write():
+            try:
+                for age in range(50):
+                    self.pool.add("Pool_Table", {"name": "N" + str(age), "age": age})
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                for _ in range(50):
+                    result = self.pool.find("Pool_Table", [["age", "less_than", 10]])
+                    self.assertLessEqual(len(result), 10)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)]
+        threads += [threading.Thread(target=read) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.pool.find("Pool_Table")), 50)
+        self.assertLessEqual(len(self.pool._idle_readers), 3)
+
+    def test_2_read_only_readers(self):
+        """Unit Test to test that reader connections reject writes."""
+        with self.pool.reader() as reader:
+            with self.assertRaises(contacts_db.sl.OperationalError):
+                reader.conn.execute("DELETE FROM Pool_Table;")
+
+    def test_3_replace_closed_connection(self):
+        """Unit Test to test that connections closed on failures are replaced."""
+        with self.pool.reader() as reader:
+            reader.close_conn()
+
+        with self.assertRaises(contacts_db.TableError):
+            self.pool.add("Missing_Table", {"name": "ABC"})
+
+        self.pool.add("Pool_Table", {"name": "ABC", "age": 99})
+        result = self.pool.find("Pool_Table", [["age", "equals", 99]], ["name"])
+        self.assertEqual(result, [{"name": "ABC"}])
+
+    def test_4_schema_changes(self):
+        """Unit Test to test that readers notice tables created by the writer."""
+        self.pool.find("Pool_Table")
+        self.pool.create_table("New_Table", {"name": "text"})
+        self.assertTrue(self.pool.does_table_exist("New_Table"))
+        self.assertEqual(self.pool.find("New_Table"), [])
+
+    def test_5_csv(self):
+        """Unit Test to test exports on a reader and imports on the writer."""
+        csv_path = os.path.join(self.temp_dir.name, "pool.csv")
+        count = self.pool.export_csv("Pool_Table", csv_path, fields=["name", "age"])
+        self.assertEqual(count, self.pool.count("Pool_Table"))
+        self.pool.create_table("Csv_Table", {"name": "text", "age": "integer"})
+        inserted, rejected = self.pool.import_csv("Csv_Table", csv_path)
+        self.assertEqual((inserted, rejected), (count, []))
+        self.assertEqual(self.pool.count("Csv_Table"), count)
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.pool.close_conn()
+        self.temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,9 @@
 
 Author: Shobhit Khinvasara
 """
+import io
+import os
+import tempfile
 import unittest
 import contacts_db
 from contacts_db import ContactsDB
@@ -76,5 +79,949 @@ class TestContactsDb(unittest.TestCase):
         self.contacts_db.close_conn()
 
 
+class TestContactsDbBulk(unittest.TestCase):
+
+    """Unit Test Class for testing bulk operations.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table("Bulk_Table", {"name": "text", "age": "integer"})
+
+    def test_1_add_many(self):
+        """Unit Test to test adding many records from a generator."""
+        records = ({"name": "N" + str(i), "age": i} for i in range(25))
+        inserted, rejected = self.contacts_db.add_many(
+            "Bulk_Table", records, batch_size=10
+        )
+        self.assertEqual(inserted, 25)
+        self.assertEqual(rejected, [])
+        result = self.contacts_db.find("Bulk_Table", [["age", "equals", 24]], ["name"])
+        self.assertEqual(result, [{"name": "N24"}])
+
+    def test_2_add_many_rejects(self):
+        """Unit Test to test that invalid records are rejected but not fatal."""
+        records = [{"name": "OK", "age": 1}, {"name": 5}, {"id": 3}, "bad"]
+        inserted, rejected = self.contacts_db.add_many("Bulk_Table", records)
+        self.assertEqual(inserted, 1)
+        self.assertEqual([index for index, _ in rejected], [1, 2, 3])
+
+    def test_3_import_csv(self):
+        """Unit Test to test importing a CSV file mapped to the table fields."""
+        csv_file = io.StringIO(
+            "id,name,age,nickname\n9,CSV 1,31,x\n9,CSV 2,,y\n9,CSV 3,old,z\n"
+        )
+        inserted, rejected = self.contacts_db.import_csv(
+            "Bulk_Table", csv_file, batch_size=2
+        )
+        self.assertEqual(inserted, 2)
+        self.assertEqual([row for row, _ in rejected], [3])
+        result = self.contacts_db.find(
+            "Bulk_Table", [["name", "contains", "CSV"]], ["name", "age"]
+        )
+        self.assertEqual(result, [{"name": "CSV 1", "age": 31}, {"name": "CSV 2", "age": None}])
+
+    def test_4_export_csv(self):
+        """Unit Test to test exporting to a CSV file and importing it again."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, "export.csv")
+            count = self.contacts_db.export_csv(
+                "Bulk_Table", csv_path, [["age", "less_than", 3]], batch_size=2
+            )
+            self.assertEqual(count, 4)
+            with open(csv_path) as csv_file:
+                self.assertEqual(csv_file.readline().strip(), "id,name,age")
+
+            inserted, rejected = self.contacts_db.import_csv("Bulk_Table", csv_path)
+            self.assertEqual((inserted, rejected), (4, []))
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbWhere(unittest.TestCase):
+
+    """Unit Test Class for testing updates and deletes by filter.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table("Where_Table", {"phone": "text", "age": "integer"})
+        self.contacts_db.add_many(
+            "Where_Table",
+            ({"phone": "020-" + str(i), "age": i % 10} for i in range(100)),
+        )
+
+    def test_1_update_where(self):
+        """Unit Test to test that matching records are updated with bound values."""
+        result = self.contacts_db.update_where(
+            "Where_Table", [["age", "equals", 3]], {"phone": "022-'3'", "wrong": 1}
+        )
+        self.assertEqual(result, 10)
+        self.assertEqual(
+            self.contacts_db.count("Where_Table", [["phone", "is", "022-'3'"]]), 10
+        )
+        self.assertEqual(
+            self.contacts_db.update_where("Where_Table", [["age", "equals", 30]], {"age": 1}),
+            0,
+        )
+
+    def test_2_delete_where(self):
+        """Unit Test to test that matching records are deleted in chunks of ids."""
+        self.contacts_db.set_result_cache()
+        self.assertEqual(self.contacts_db.count("Where_Table", [["age", "less_than", 5]]), 50)
+        result = self.contacts_db.delete_where(
+            "Where_Table", [["age", "less_than", 5]], chunk_size=7
+        )
+        self.assertEqual(result, 50)
+        self.assertEqual(self.contacts_db.count("Where_Table", [["age", "less_than", 5]]), 0)
+        self.assertEqual(self.contacts_db.count("Where_Table"), 50)
+        self.assertEqual(
+            self.contacts_db.delete_where("Where_Table", [["age", "less_than", 5]]), 0
+        )
+
+    def test_3_invalid(self):
+        """Unit Test to test that filters matching every record and wrong data are rejected."""
+        with self.contacts_db.transaction():
+            with self.assertRaises(contacts_db.InvalidFilterError):
+                self.contacts_db.delete_where("Where_Table", [["wrong", "is", "A"]])
+
+            with self.assertRaises(contacts_db.IDError):
+                self.contacts_db.update_where("Where_Table", [["age", "equals", 5]], {"id": 1})
+
+            with self.assertRaises(ValueError):
+                self.contacts_db.delete_where("Where_Table", [["age", "equals", 5]], chunk_size=0)
+
+        self.assertEqual(self.contacts_db.count("Where_Table"), 50)
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbFind(unittest.TestCase):
+
+    """Unit Test Class for testing the find filter compiler.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table("Find_Table", {"name": "text", "age": "integer"})
+        self.contacts_db.add_many(
+            "Find_Table",
+            [{"name": "O'Brien", "age": 30}, {"name": "Smith", "age": 40}],
+        )
+
+    def test_1_bound_values(self):
+        """Unit Test to test that filter values are bound and not spliced into SQL."""
+        result = self.contacts_db.find(
+            "Find_Table", [["name", "contains", "'Bri"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "O'Brien"}])
+
+    def test_2_statement_reuse(self):
+        """Unit Test to test that filters of the same shape share a compiled query."""
+        self.contacts_db.clear_schema_cache()
+        for age in (30, 40, 50):
+            self.contacts_db.find(
+                "Find_Table", [["age", "greater_than_equal", age]], ["name"]
+            )
+
+        self.assertEqual(len(self.contacts_db._compiled_queries), 1)
+        result = self.contacts_db.find(
+            "Find_Table", [["age", "greater_than_equal", 40]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "Smith"}])
+
+    def test_3_iter_find(self):
+        """Unit Test to test streaming rows lazily from find."""
+        rows = self.contacts_db.find(
+            "Find_Table", [["age", "greater_than", 0]], ["name"], stream=True
+        )
+        self.assertEqual(next(rows), {"name": "O'Brien"})
+        self.assertEqual(list(rows), [{"name": "Smith"}])
+
+        rows = self.contacts_db.iter_find("Find_Table", [], ["age"], batch_size=1)
+        self.assertEqual([row["age"] for row in rows], [30, 40])
+
+    def test_4_find_page(self):
+        """Unit Test to test keyset pagination with continuation tokens."""
+        db = ContactsDB(":memory:")
+        db.create_table("Page_Table", {"name": "text", "age": "integer"})
+        records = [{"name": "N" + str(i), "age": i % 3} for i in range(7)]
+        db.add_many("Page_Table", records)
+
+        expected = db.find("Page_Table", [], ["id"], order_by=["-age"])
+        records, token = db.find_page(
+            "Page_Table", [], ["id"], order_by=["-age"], limit=3
+        )
+        pages = [records]
+        while token:
+            records, token = db.find_page(
+                "Page_Table", [], ["id"], order_by=["-age"], limit=3, after=token
+            )
+            pages.append(records)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        # NULLs sort first in ascending and last in descending order.
+        db.add_many("Page_Table", [{"age": 1}, {"name": "N1"}, {}])
+        for order_by in (["name"], ["-name"], ["name", "-age"], ["-name", "-age"]):
+            expected = db.find("Page_Table", [], ["id"], order_by=order_by)
+            records, token = db.find_page(
+                "Page_Table", [], ["id"], order_by=order_by, limit=2
+            )
+            while token:
+                page, token = db.find_page(
+                    "Page_Table", [], ["id"], order_by=order_by, limit=2, after=token
+                )
+                records += page
+
+            self.assertEqual(records, expected)
+
+        with self.assertRaises(contacts_db.InvalidFilterError):
+            db.find("Page_Table", [], order_by=["name"], after="bad-token")
+
+    def test_5_invalid_condition(self):
+        """Unit Test to test that unknown conditions are rejected."""
+        db = ContactsDB(":memory:")
+        db.create_table("Find_Table", {"name": "text"})
+        with self.assertRaises(contacts_db.InvalidFilterError):
+            db.find("Find_Table", [["name", "less_than", "A"]])
+
+    def test_6_row_formats(self):
+        """Unit Test to test the row formats of find and iter_find."""
+        fields = ["name", "age"]
+        self.assertEqual(
+            self.contacts_db.find("Find_Table", [], fields, row_format="tuple"),
+            [("O'Brien", 30), ("Smith", 40)],
+        )
+        rows = self.contacts_db.find("Find_Table", [], fields, row_format="row")
+        self.assertEqual([row["age"] for row in rows], [30, 40])
+        records = list(
+            self.contacts_db.iter_find("Find_Table", [], fields, row_format="record")
+        )
+        self.assertEqual([record.name for record in records], ["O'Brien", "Smith"])
+        self.assertEqual(records[1]._asdict(), {"name": "Smith", "age": 40})
+        with self.assertRaises(ValueError):
+            self.contacts_db.find("Find_Table", row_format="object")
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbFilterTree(unittest.TestCase):
+
+    """Unit Test Class for testing filter groups and list conditions.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Tree_Table", {"name": "text", "city": "text", "age": "integer"}
+        )
+        self.contacts_db.add_many(
+            "Tree_Table",
+            (
+                {"name": "N" + str(i), "city": "C" + str(i % 4), "age": i}
+                for i in range(40)
+            ),
+        )
+
+    def find_ages(self, filters, operator="AND"):
+        """Helper Function to get the ages of the records matching the filters."""
+        records = self.contacts_db.find("Tree_Table", filters, ["age"], operator)
+        return [record["age"] for record in records]
+
+    def test_1_groups(self):
+        """Unit Test to test nested and, or and not groups in one statement."""
+        filters = [
+            {"or": [["city", "is", "C1"], ["city", "is", "C2"]]},
+            ["age", "greater_than", 30],
+        ]
+        self.assertEqual(self.find_ages(filters), [33, 34, 37, 38])
+        sql_command, _, params = self.contacts_db._compile_find(
+            "Tree_Table", filters, ["age"], "AND"
+        )
+        self.assertIn("WHERE (city = ? OR city = ?) AND age > ?", sql_command)
+        self.assertEqual(params, ["C1", "C2", 30])
+
+        filters = [
+            {"not": {"or": [["age", "less_than", 36], ["city", "is", "C0"]]}},
+            {"and": [{"and": []}, ["wrong", "is", "A"]]},
+        ]
+        self.assertEqual(self.find_ages(filters), [37, 38, 39])
+        with self.contacts_db.transaction():
+            with self.assertRaises(contacts_db.InvalidFilterError):
+                self.contacts_db.find("Tree_Table", [{"xor": []}])
+
+    def test_2_list_conditions(self):
+        """Unit Test to test in, not_in, between and starts_with."""
+        self.assertEqual(self.find_ages([["age", "in", [3, 5, 99]]]), [3, 5])
+        filters = [["city", "not_in", ["C0", "C1", "C2"]], ["age", "less_than", 10]]
+        self.assertEqual(self.find_ages(filters), [3, 7])
+        self.assertEqual(self.find_ages([["age", "between", [8, 10]]]), [8, 9, 10])
+        self.assertEqual(
+            self.find_ages([["name", "starts_with", "N3"]]), [3] + list(range(30, 40))
+        )
+        self.assertEqual(self.find_ages([["name", "starts_with", "n3"]]), [])
+        self.assertEqual(contacts_db._prefix_upper_bound("ab"), "ac")
+        self.assertEqual(contacts_db._prefix_upper_bound(""), b"")
+
+        with self.contacts_db.transaction():
+            with self.assertRaises(contacts_db.InvalidFilterError):
+                self.contacts_db.find("Tree_Table", [["age", "between", [1]]])
+
+            with self.assertRaises(contacts_db.TypeMismatchError):
+                self.contacts_db.find("Tree_Table", [["age", "in", [1, "2"]]])
+
+    def test_3_cache_and_advice(self):
+        """Unit Test to test compiled statement reuse and index advice of filter groups."""
+        filters = [{"or": [["city", "in", ["C1", "C2"]], ["name", "starts_with", "N1"]]}]
+        self.find_ages(filters)
+        compiled = len(self.contacts_db._compiled_queries)
+        filters[0]["or"][0][2] = ["C3", "C0"]
+        self.assertEqual(self.find_ages(filters)[:3], [0, 1, 3])
+        self.assertEqual(len(self.contacts_db._compiled_queries), compiled)
+        self.find_ages([{"or": [["city", "in", ["C1"]], ["name", "starts_with", "N1"]]}])
+        self.assertEqual(len(self.contacts_db._compiled_queries), compiled + 1)
+
+        warnings = []
+        both = {"and": [["name", "is", "N1"], ["age", "between", [1, 2]]]}
+        advice = self.contacts_db._advise_indexes(
+            "Tree_Table", [{"or": [["city", "in", ["C1"]], both]}], "AND", (), warnings
+        )
+        self.assertEqual(
+            advice,
+            [
+                "CREATE INDEX idx_Tree_Table_city ON Tree_Table (city);",
+                "CREATE INDEX idx_Tree_Table_name_age ON Tree_Table (name, age);",
+            ],
+        )
+        advice = self.contacts_db._advise_indexes(
+            "Tree_Table",
+            [["city", "is", "C1"], {"not": ["name", "is", "N1"]}],
+            "OR",
+            (),
+            warnings,
+        )
+        self.assertEqual(advice, [])
+        self.assertIn("not can't use an index", warnings[-1])
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbIndexes(unittest.TestCase):
+
+    """Unit Test Class for testing index management.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Index_Table",
+            {"name": "text", "email": "text", "phone_number": "text"},
+            indexes=[{"fields": ["email"], "unique": True}],
+        )
+
+    def test_1_create_table_indexes(self):
+        """Unit Test to test indexes declared with the table."""
+        indexes = self.contacts_db.list_indexes("Index_Table")
+        self.assertEqual(
+            indexes,
+            [
+                {
+                    "name": "idx_Index_Table_email",
+                    "table": "Index_Table",
+                    "fields": ["email"],
+                    "unique": True,
+                }
+            ],
+        )
+        inserted, rejected = self.contacts_db.add_many(
+            "Index_Table", [{"email": "a@b.com"}, {"email": "a@b.com"}]
+        )
+        self.assertEqual((inserted, len(rejected)), (1, 1))
+
+    def test_2_create_index(self):
+        """Unit Test to test that a composite index is used by find."""
+        self.contacts_db.create_index("Index_Table", ["phone_number", "name"])
+        plan = self.contacts_db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM Index_Table WHERE phone_number = ?;",
+            ["236"],
+        ).fetchall()
+        self.assertIn("idx_Index_Table_phone_number_name", plan[0][3])
+
+    def test_3_drop_index(self):
+        """Unit Test to test index removal."""
+        self.contacts_db.drop_index("idx_Index_Table_phone_number_name")
+        names = [index["name"] for index in self.contacts_db.list_indexes()]
+        self.assertEqual(names, ["idx_Index_Table_email"])
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbFulltext(unittest.TestCase):
+
+    """Unit Test Class for testing full-text search.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Text_Table", {"name": "text", "phone_number": "text"}
+        )
+        self.contacts_db.add_many(
+            "Text_Table",
+            [
+                {"name": "John Smith", "phone_number": "236-1234"},
+                {"name": "Ann Lee", "phone_number": "555-9999"},
+            ],
+        )
+        self.contacts_db.enable_fulltext("Text_Table")
+
+    def test_1_match(self):
+        """Unit Test to test that contains filters use the full-text index."""
+        result = self.contacts_db.find(
+            "Text_Table", [["phone_number", "contains", "236"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "John Smith"}])
+        sql_command = list(self.contacts_db._compiled_queries.values())[-1][0]
+        self.assertIn("MATCH", sql_command)
+
+    def test_2_triggers(self):
+        """Unit Test to test that the index follows adds, updates and deletes."""
+        self.contacts_db.add("Text_Table", {"name": "Johnny Cash"})
+        self.contacts_db.update("Text_Table", 1, {"name": "Jane Smith"})
+        self.contacts_db.delete("Text_Table", 2)
+        result = self.contacts_db.find(
+            "Text_Table", [["name", "contains", "jo"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "Johnny Cash"}])
+        result = self.contacts_db.find(
+            "Text_Table", [["name", "does_not_contain", "smith"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "Johnny Cash"}])
+
+    def test_3_rebuild_and_disable(self):
+        """Unit Test to test rebuilding and removing the full-text index."""
+        self.assertTrue(self.contacts_db.rebuild_fulltext("Text_Table"))
+        self.assertTrue(self.contacts_db.disable_fulltext("Text_Table"))
+        self.assertIsNone(self.contacts_db.get_fulltext("Text_Table"))
+        self.assertNotIn("Text_Table_fts", self.contacts_db.list_tables())
+
+    def test_4_no_tokens(self):
+        """Unit Test to test that contains values without tokens fall back to LIKE."""
+        self.contacts_db.enable_fulltext("Text_Table")
+        result = self.contacts_db.find(
+            "Text_Table", [["phone_number", "contains", "123"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "Jane Smith"}])
+        result = self.contacts_db.find(
+            "Text_Table", [["phone_number", "contains", "-"]], ["name"]
+        )
+        self.assertEqual(result, [{"name": "Jane Smith"}])
+        sql_command = list(self.contacts_db._compiled_queries.values())[-1][0]
+        self.assertNotIn("MATCH", sql_command)
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbNormalizedKeys(unittest.TestCase):
+
+    """Unit Test Class for testing normalized phone and email keys.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Key_Table", {"name": "text", "phone": "text", "email": "text"}
+        )
+        self.contacts_db.add_many(
+            "Key_Table",
+            [
+                {"name": "A", "phone": "(020) 123-4567", "email": " Ann@Mail.com"},
+                {"name": "B", "phone": "+91 20.1234.5678", "email": "bob@mail.com"},
+                {"name": "C", "phone": "0201234567", "email": "cy@other.org"},
+            ],
+        )
+
+    def find_names(self, filters):
+        """Helper Function to get the names of the records matching the filters."""
+        records = self.contacts_db.find("Key_Table", filters, ["name"])
+        return [record["name"] for record in records]
+
+    def test_1_lookups(self):
+        """Unit Test to test that lookups on normalized fields use the key index."""
+        self.assertEqual(self.find_names([["phone", "is", "020 123 4567"]]), [])
+        for field in ("phone", "email"):
+            self.assertTrue(self.contacts_db.enable_normalized_key("Key_Table", field, field))
+
+        self.assertEqual(
+            self.contacts_db.get_normalized_keys("Key_Table"),
+            {"phone": "phone", "email": "email"},
+        )
+        self.assertNotIn("phone__phone_key", self.contacts_db.get_table_fields("Key_Table"))
+        self.assertEqual(
+            set(self.contacts_db.find("Key_Table", [["name", "is", "A"]])[0]),
+            {"id", "name", "phone", "email"},
+        )
+
+        self.assertEqual(self.find_names([["phone", "is", "020 123 4567"]]), ["A", "C"])
+        self.assertEqual(self.find_names([["phone", "starts_with", "+9120"]]), ["B"])
+        self.assertEqual(self.find_names([["email", "in", ["ANN@mail.com "]]]), ["A"])
+        self.assertEqual(self.find_names([["email", "is_not", "BOB@MAIL.COM"]]), ["A", "C"])
+        self.assertEqual(self.find_names([["phone", "contains", "123-"]]), ["A"])
+
+        result = self.contacts_db.explain("Key_Table", [["phone", "starts_with", "020"]])
+        self.assertIn("INDEX idx_Key_Table_phone__phone_key", result["plan"][0]["detail"])
+        self.assertEqual(result["params"], ["020", "021"])
+
+    def test_2_sync(self):
+        """Unit Test to test that keys follow writes and match the Python key functions."""
+        self.contacts_db.update("Key_Table", 3, {"phone": "030/555 12"})
+        self.contacts_db.update_where("Key_Table", [["name", "is", "B"]], {"email": "B@X.IO"})
+        self.contacts_db.add("Key_Table", {"name": "D", "phone": "030-555-12"})
+        self.assertEqual(self.find_names([["phone", "is", "03055512"]]), ["C", "D"])
+        self.assertEqual(self.find_names([["email", "is", "b@x.io"]]), ["B"])
+
+        values = [" (0)20 1.2-3+4/5 ", "Ünïcode@MAIL.Com ", ""]
+        for key_type, (expression, key) in contacts_db.NORMALIZED_KEY_TYPES.items():
+            for value in values:
+                row = self.contacts_db.conn.execute(
+                    "SELECT " + expression.format("?") + ";", [value]
+                ).fetchone()
+                self.assertEqual(row[0], key(value))
+
+    def test_3_disable(self):
+        """Unit Test to test removing keys and rejecting invalid fields and key types."""
+        with self.contacts_db.transaction():
+            with self.assertRaises(contacts_db.TypeMismatchError):
+                self.contacts_db.enable_normalized_key("Key_Table", "id", "phone")
+
+            with self.assertRaises(contacts_db.TypeMismatchError):
+                self.contacts_db.enable_normalized_key("Key_Table", "name", "fax")
+
+            with self.assertRaises(contacts_db.TableError):
+                self.contacts_db.enable_normalized_key("Key_Table", "phone", "phone")
+
+        self.assertTrue(self.contacts_db.disable_normalized_key("Key_Table", "phone"))
+        keys = self.contacts_db.get_normalized_keys("Key_Table")
+        self.assertEqual(keys, {"email": "email"})
+        indexes = self.contacts_db.list_indexes("Key_Table")
+        self.assertEqual([index["fields"] for index in indexes], [["email__email_key"]])
+        self.assertEqual(self.find_names([["phone", "is", "03055512"]]), [])
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbTransaction(unittest.TestCase):
+
+    """Unit Test Class for testing transactions and savepoints.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    def setUp(self):
+        """Set Up Method which runs before every test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table("Tx_Table", {"name": "text", "age": "integer"})
+
+    def test_1_commit_once(self):
+        """Unit Test to test that operations in a transaction commit once."""
+        statements = []
+        self.contacts_db.conn.set_trace_callback(statements.append)
+        with self.contacts_db.transaction():
+            for age in range(5):
+                self.contacts_db.add("Tx_Table", {"name": "ABC", "age": age})
+
+            self.contacts_db.update("Tx_Table", 1, {"name": "DEF"})
+            self.contacts_db.delete("Tx_Table", 2)
+
+        self.contacts_db.conn.set_trace_callback(None)
+        self.assertEqual(statements.count("COMMIT"), 1)
+        self.assertEqual(len(self.contacts_db.find("Tx_Table")), 4)
+
+    def test_2_rollback(self):
+        """Unit Test to test that a failing transaction is rolled back."""
+        with self.assertRaises(contacts_db.TypeMismatchError):
+            with self.contacts_db.transaction():
+                self.contacts_db.add("Tx_Table", {"name": "ABC", "age": 1})
+                self.contacts_db.add("Tx_Table", {"name": "DEF", "age": "1"})
+
+        self.assertEqual(self.contacts_db.find("Tx_Table"), [])
+
+    def test_3_savepoint(self):
+        """Unit Test to test that a nested savepoint rolls back on its own."""
+        with self.contacts_db.transaction():
+            self.contacts_db.add("Tx_Table", {"name": "ABC", "age": 1})
+            try:
+                with self.contacts_db.savepoint():
+                    self.contacts_db.add("Tx_Table", {"name": "DEF", "age": 2})
+                    raise ValueError("undo")
+            except ValueError:
+                pass
+
+        result = self.contacts_db.find("Tx_Table", [], ["name"])
+        self.assertEqual(result, [{"name": "ABC"}])
+
+    def tearDown(self):
+        """Tear Down Method which runs after every test."""
+        self.contacts_db.close_conn()
+
+
+class TestContactsDbSchemaCache(unittest.TestCase):
+
+    """Unit Test Class for testing the schema cache.
+
+    Attributes:
+        db_path (string): Path to the temporary database file.
+        temp_dir (TemporaryDirectory): Temporary directory holding the database.
+    """
+
+    def setUp(self):
+        """Set Up Method which runs before every test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "contacts.db")
+
+    def test_1_cached_lookups(self):
+        """Unit Test to test that schema lookups don't hit the database once cached."""
+        db = ContactsDB(self.db_path, schema_check_interval=60)
+        db.create_table("Cache_Table", {"name": "text"})
+        db.add("Cache_Table", {"name": "ABC"})
+
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        db.add("Cache_Table", {"name": "DEF"})
+        db.find("Cache_Table", [], ["name"])
+        db.conn.set_trace_callback(None)
+        db.close_conn()
+
+        self.assertFalse([s for s in statements if "sqlite_master" in s])
+        self.assertFalse([s for s in statements if "PRAGMA" in s.upper()])
+
+    def test_2_external_ddl(self):
+        """Unit Test to test that DDL from another connection invalidates the cache."""
+        db = ContactsDB(self.db_path, schema_check_interval=0)
+        db.create_table("Cache_Table", {"name": "text"})
+        self.assertEqual(
+            db.get_table_fields("Cache_Table"), {"id": "INTEGER", "name": "TEXT"}
+        )
+
+        other = ContactsDB(self.db_path)
+        other.delete_table("Cache_Table")
+        other.create_table("Cache_Table", {"name": "text", "age": "integer"})
+        other.close_conn()
+
+        self.assertEqual(
+            db.get_table_fields("Cache_Table"),
+            {"id": "INTEGER", "name": "TEXT", "age": "INTEGER"},
+        )
+        db.close_conn()
+
+    def test_3_profile(self):
+        """Unit Test to test applying connection tuning profiles."""
+        db = ContactsDB(self.db_path, profile="balanced")
+        self.assertEqual(db.conn.execute("PRAGMA journal_mode;").fetchone()[0], "wal")
+        self.assertEqual(db.conn.execute("PRAGMA synchronous;").fetchone()[0], 1)
+        result = db.set_profile("bulk-load")
+        self.assertEqual(result["synchronous"], 0)
+        with self.assertRaises(contacts_db.DatabaseError):
+            db.set_profile("fastest")
+
+        db.close_conn()
+
+    def test_4_external_create(self):
+        """Unit Test to test that tables created by another connection are found."""
+        db = ContactsDB(self.db_path, schema_check_interval=60)
+        db.create_table("Cache_Table", {"name": "text"})
+        db.add("Cache_Table", {"name": "ABC"})
+
+        other = ContactsDB(self.db_path)
+        other.create_table("Other_Table", {"name": "text"})
+        other.close_conn()
+
+        self.assertTrue(db.add("Other_Table", {"name": "ABC"}))
+        self.assertEqual(db.find("Other_Table", [], ["name"]), [{"name": "ABC"}])
+
+        other = ContactsDB(self.db_path)
+        other.delete_table("Cache_Table")
+        other.create_table("Cache_Table", {"name": "text", "age": "integer"})
+        other.close_conn()
+
+        self.assertTrue(db.add("Cache_Table", {"name": "DEF", "age": 3}))
+        self.assertEqual(db.find("Cache_Table", [["age", "equals", 3]], ["age"]), [{"age": 3}])
+        db.close_conn()
+
+    def test_5_default_interval(self):
+        """Unit Test to test that the default interval notices recreated tables at once."""
+        db = ContactsDB(self.db_path)
+        db.create_table("Cache_Table", {"name": "text"})
+        db.add("Cache_Table", {"name": "ABC"})
+
+        other = ContactsDB(self.db_path)
+        other.delete_table("Cache_Table")
+        other.create_table("Cache_Table", {"name": "text", "age": "integer"})
+        other.close_conn()
+
+        self.assertTrue(db.add("Cache_Table", {"name": "DEF", "age": 3}))
+        self.assertEqual(
+            db.find("Cache_Table", [], ["name", "age"]), [{"name": "DEF", "age": 3}]
+        )
+        db.close_conn()
+
+    def test_6_checked_once(self):
+        """Unit Test to test that the default interval checks the schema once per operation."""
+        db = ContactsDB(self.db_path)
+        db.create_table("Cache_Table", {"name": "text"})
+        db.add("Cache_Table", {"name": "ABC"})
+
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        db.add("Cache_Table", {"name": "DEF"})
+        db.find("Cache_Table", [["name", "is", "DEF"]], ["name"])
+        db.count("Cache_Table", [["name", "is", "ABC"]])
+        db.conn.set_trace_callback(None)
+        db.close_conn()
+
+        self.assertFalse([s for s in statements if "sqlite_master" in s])
+        pragmas = [s for s in statements if "PRAGMA" in s.upper()]
+        self.assertEqual(pragmas, ["PRAGMA schema_version;"] * 3)
+
+    def tearDown(self):
+        """Tear Down Method which runs after every test."""
+        self.temp_dir.cleanup()
+
+class TestContactsDbAggregate(unittest.TestCase):
+
+    """Unit Test Class for testing count, aggregate and distinct.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Aggregate_Table", {"name": "text", "city": "text", "age": "integer"}
+        )
+        self.contacts_db.add_many(
+            "Aggregate_Table",
+            [
+                {"name": "abc", "city": "Pune", "age": 20},
+                {"name": "def", "city": "Pune", "age": 40},
+                {"name": "ghi", "city": "Delhi", "age": 30},
+                {"name": "jkl", "age": 50},
+            ],
+        )
+
+    def test_1_count(self):
+        """Unit Test to test counting with and without filters."""
+        self.assertEqual(self.contacts_db.count("Aggregate_Table"), 4)
+        filters = [["age", "greater_than", 25], ["city", "is", "Pune"]]
+        self.assertEqual(self.contacts_db.count("Aggregate_Table", filters), 1)
+        self.assertEqual(self.contacts_db.count("Aggregate_Table", filters, "OR"), 4)
+
+    def test_2_aggregate(self):
+        """Unit Test to test grouped metrics."""
+        result = self.contacts_db.aggregate(
+            "Aggregate_Table",
+            ["city"],
+            {"n": "count", "max_age": ("max", "age"), "total": ["sum", "age"]},
+            [["age", "less_than", 50]],
+        )
+        self.assertEqual(
+            result,
+            [
+                {"city": "Delhi", "n": 1, "max_age": 30, "total": 30},
+                {"city": "Pune", "n": 2, "max_age": 40, "total": 60},
+            ],
+        )
+
+    def test_3_distinct(self):
+        """Unit Test to test distinct values of a field."""
+        self.contacts_db.create_table("Distinct_Table", {"city": "text"})
+        self.contacts_db.add_many(
+            "Distinct_Table", [{"city": "Pune"}, {"city": "Delhi"}, {"city": "Pune"}, {}]
+        )
+        self.assertEqual(
+            self.contacts_db.distinct("Distinct_Table", "city"), [None, "Delhi", "Pune"]
+        )
+
+    def test_4_invalid_metrics(self):
+        """Unit Test to test that invalid group_by fields and metrics are rejected."""
+        db = ContactsDB(":memory:")
+        db.create_table("Metric_Table", {"name": "text"})
+        with self.assertRaises(contacts_db.TypeMismatchError):
+            db.aggregate("Metric_Table", metrics={"x": ("avg", "name")})
+
+        db = ContactsDB(":memory:")
+        db.create_table("Metric_Table", {"name": "text"})
+        with self.assertRaises(contacts_db.InvalidFilterError):
+            db.distinct("Metric_Table", "town")
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
+
+class TestContactsDbExplain(unittest.TestCase):
+
+    """Unit Test Class for testing query plans, index advice and the slow query log.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table(
+            "Explain_Table", {"name": "text", "city": "text", "age": "integer"}
+        )
+        self.contacts_db.add_many(
+            "Explain_Table",
+            (
+                {"name": "N" + str(i), "city": "C" + str(i % 10), "age": i % 90}
+                for i in range(contacts_db.FULL_SCAN_ROWS)
+            ),
+        )
+
+    def test_1_full_scan_advice(self):
+        """Unit Test to test that full scans of large tables are flagged with an index."""
+        filters = [["age", "greater_than", 30], ["city", "is", "C1"], ["name", "contains", "1"]]
+        result = self.contacts_db.explain("Explain_Table", filters, ["name"])
+        self.assertIn("SELECT name FROM Explain_Table", result["sql"])
+        self.assertEqual(result["params"], [30, "C1", "%1%"])
+        self.assertTrue(result["full_scan"])
+        self.assertEqual(len(result["warnings"]), 1)
+        self.assertEqual(
+            result["advice"],
+            ["CREATE INDEX idx_Explain_Table_city_age ON Explain_Table (city, age);"],
+        )
+
+        result = self.contacts_db.explain("Explain_Table", filters, operator="OR")
+        self.assertEqual(result["advice"], [])
+        self.assertIn("can't use an index", result["warnings"][-1])
+
+    def test_2_indexed(self):
+        """Unit Test to test that no index is advised once the filters are indexed."""
+        self.contacts_db.create_index("Explain_Table", ["city", "age"])
+        result = self.contacts_db.explain(
+            "Explain_Table", [["city", "is", "C1"], ["age", "less_than", 5]]
+        )
+        self.assertFalse(result["full_scan"])
+        self.assertEqual((result["warnings"], result["advice"]), ([], []))
+        self.assertIn("USING INDEX", result["plan"][0]["detail"])
+
+        result = self.contacts_db.explain(
+            "Explain_Table", [["city", "is", "C1"]], order_by=["-name"]
+        )
+        self.assertTrue(result["temp_sort"])
+        self.assertEqual(
+            result["advice"],
+            ["CREATE INDEX idx_Explain_Table_city_name ON Explain_Table (city, name);"],
+        )
+
+    def test_3_keyset_seek(self):
+        """Unit Test to test that later pages seek in the index instead of scanning."""
+        self.contacts_db.create_index("Explain_Table", ["name"])
+        for order_by in (["name"], ["name", "-age"]):
+            _, token = self.contacts_db.find_page(
+                "Explain_Table", [], ["name"], order_by=order_by, limit=10
+            )
+            result = self.contacts_db.explain(
+                "Explain_Table", [], ["name"], order_by=order_by, limit=10, after=token
+            )
+            self.assertRegex(
+                result["plan"][0]["detail"], "^SEARCH .*INDEX idx_Explain_Table_name "
+            )
+
+        self.contacts_db.drop_index("idx_Explain_Table_name")
+
+    def test_4_slow_query_log(self):
+        """Unit Test to test that slow finds and aggregates are logged with their plan."""
+        logged = []
+        self.contacts_db.set_slow_query_log(0, logged.append)
+        self.contacts_db.find("Explain_Table", [["name", "is", "N5"]])
+        self.contacts_db.count("Explain_Table", [["name", "is", "N5"]])
+        self.contacts_db.set_slow_query_log(None)
+        self.contacts_db.find("Explain_Table", [["name", "is", "N5"]])
+
+        self.assertEqual([entry["op"] for entry in logged], ["find", "aggregate"])
+        self.assertEqual(list(self.contacts_db.slow_queries), logged)
+        self.assertTrue(logged[0]["full_scan"])
+        self.assertEqual(
+            logged[1]["advice"],
+            ["CREATE INDEX idx_Explain_Table_name ON Explain_Table (name);"],
+        )
+        with self.assertRaises(ValueError):
+            self.contacts_db.set_slow_query_log(-1)
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of test."""
+        self.contacts_db.close_conn()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,308 @@
+"""Parallel Import Pipeline for the Contacts Application Database API.
+
+The input file is split into byte ranges on line boundaries. Worker processes parse
+and validate the ranges, the calling process inserts the rows they return with
+batched executemany calls while the workers parse the next ranges.
+
+Author: Shobhit Khinvasara
+"""
+import os
+import re
+import csv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .contacts_db import IDError, TableError, TypeMismatchError
+    from .contacts_db import read_csv_header, validate_data
+except ImportError:
+    from contacts_db import IDError, TableError, TypeMismatchError
+    from contacts_db import read_csv_header, validate_data
+
+# supported input formats.
+# "csv": header row naming the fields, then one record per line.
+# "data": one record per line in the <field_name_1>=><data_1>|.. convention.
+IMPORT_FORMATS = ("csv", "data")
+
+
+def parse_value_str(value_str):
+    """Parse a value of the data or filter convention.
+
+    Args:
+        value_str (string): Text value enclosed in ("), or an integer value.
+
+    Returns:
+        str/int: Parsed value.
+
+    Raises:
+        ValueError: If the value is neither quoted text nor an integer.
+    """
+    # check if data is an integer
+    if not re.match('".+"', value_str) and value_str.isnumeric():
+        return int(value_str)
+
+    # check if data is a valid string
+    elif re.match('".+"', value_str) and not value_str.isnumeric():
+        return value_str.strip('"')
+
+    raise ValueError("Unsupported Data!")
+
+
+def parse_data_str(data_str):
+    """Parse a data string of the <field_name_1>=><data_1>|.. convention.
+
+    Args:
+        data_str (string): Data string to parse.
+
+    Returns:
+        dict: {field:value} of the data.
+
+    Raises:
+        ValueError: If the data string doesn't follow the convention.
+    """
+    data_dict = {}
+    for data in data_str.split("|"):
+        if not data:
+            continue
+
+        if len(data.split("=>")) != 2:
+            raise ValueError("Invalid Filter!")
+
+        key, val = data.split("=>")
+        data_dict[key] = parse_value_str(val)
+
+    return data_dict
+
+
+def parallel_import(
+    contacts_db,
+    table_name,
+    path,
+    file_format="csv",
+    workers=None,
+    chunk_size=4 * 1024 * 1024,
+    batch_size=10000,
+    max_pending=None,
+):
+    """Add the records of a file to the table, parsing it in several processes.
+
+    Records can't span lines, so quoted CSV cells with line breaks aren't supported.
+    At most max_pending parsed ranges wait for the writer, so memory stays bounded
+    when the workers parse faster than SQLite inserts.
+
+    Args:
+        contacts_db (ContactsDB): Database, the rows are inserted in this process.
+        table_name (string): Table Name.
+        path (string): Path to the input file, encoded as UTF-8.
+        file_format (str, optional): Format of the file, see IMPORT_FORMATS. CSV
+            columns are mapped like ContactsDB.import_csv does.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Approximate number of bytes per range.
+        batch_size (int, optional): Number of rows committed per transaction.
+        max_pending (int, optional): Maximum number of parsed ranges waiting for the
+            writer. Defaults to twice the number of workers.
+
+    Returns:
+        tuple: (inserted, rejected) where inserted is the number of rows added and
+            rejected is a list of (line, reason) for every line that was skipped.
+            line is the line number in the file, starting at 1.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError("Unsupported import format: " + str(file_format))
+
+    if chunk_size < 1 or batch_size < 1:
+        raise ValueError("chunk_size and batch_size need to be positive integers.")
+
+    if not contacts_db.does_table_exist(table_name):
+        raise TableError("Table " + table_name + " does not exist.")
+
+    all_fields = contacts_db.get_table_fields(table_name)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+
+    columns = None
+    first_line = 1
+    start = 0
+    if file_format == "csv":
+        columns, start = _read_csv_header(path, all_fields, table_name)
+        first_line = 2
+
+    inserted = 0
+    rejected = []
+    pending = deque()
+    with ProcessPoolExecutor(workers) as executor:
+        for range_start, range_end in _split_ranges(path, start, chunk_size):
+            pending.append(
+                executor.submit(
+                    _parse_range,
+                    path,
+                    range_start,
+                    range_end,
+                    file_format,
+                    columns,
+                    all_fields,
+                )
+            )
+            # back-pressure: wait for the writer before parsing further ahead.
+            if len(pending) >= max_pending:
+                count, first_line = _write_range(
+                    contacts_db, table_name, pending.popleft(), first_line, batch_size, rejected
+                )
+                inserted += count
+
+        while pending:
+            count, first_line = _write_range(
+                contacts_db, table_name, pending.popleft(), first_line, batch_size, rejected
+            )
+            inserted += count
+
+    return inserted, rejected
+
+
+def _read_csv_header(path, all_fields, table_name):
+    """Helper Function to map the columns of the CSV header to the table fields.
+
+    Args:
+        path (string): Path to the CSV file.
+        all_fields (dict): Dictionary where key is field name and value is data_type
+        table_name (string): Table Name.
+
+    Returns:
+        tuple: (columns, offset) where columns is a list of (position, field) and
+            offset is the byte offset of the first record.
+    """
+    with open(path, "rb") as input_file:
+        header_line = input_file.readline()
+        offset = input_file.tell()
+
+    reader = csv.reader([header_line.decode("utf-8-sig").rstrip("\r\n")])
+    return read_csv_header(reader, all_fields, table_name), offset
+
+
+def _split_ranges(path, start, chunk_size):
+    """Helper Function to split a file into byte ranges which start at a line.
+
+    Args:
+        path (string): Path to the file.
+        start (int): Byte offset of the first range.
+        chunk_size (int): Approximate number of bytes per range.
+
+    Yields:
+        tuple: (start, end) byte offsets of a range.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as input_file:
+        while start < size:
+            input_file.seek(min(start + chunk_size, size))
+            # finish the line the split point is in.
+            input_file.readline()
+            end = min(input_file.tell(), size)
+            yield start, end
+            start = end
+
+
+def _parse_range(path, start, end, file_format, columns, all_fields):
+    """Helper Function to parse and validate the lines of a range in a worker process.
+
+    Args:
+        path (string): Path to the file.
+        start (int): Byte offset of the range.
+        end (int): Byte offset after the range.
+        file_format (str): Format of the file.
+        columns (list): List of (position, field) of the mapped CSV columns.
+        all_fields (dict): Dictionary where key is field name and value is data_type
+
+    Returns:
+        tuple: (rows, errors, line_count) where rows is a list of (line, keys, values),
+            errors is a list of (line, reason) and line is the line in the range,
+            starting at 0.
+    """
+    # the first range of a file starts with its byte order mark, if it has one.
+    with open(path, "rb") as input_file:
+        input_file.seek(start)
+        lines = input_file.read(end - start).decode("utf-8-sig").split("\n")
+
+    # the last line ends with a line break, except at the end of a file without one.
+    if lines[-1] == "":
+        lines.pop()
+
+    rows = []
+    errors = []
+    for line_index, line in enumerate(lines):
+        line = line.rstrip("\r")
+        if not line:
+            continue
+
+        try:
+            if file_format == "csv":
+                keys, values = _convert_csv_line(line, columns, all_fields)
+            else:
+                data = parse_data_str(line)
+                keys = validate_data(all_fields, data)
+                values = tuple(data[key] for key in keys)
+        except (ValueError, TypeMismatchError, IDError) as e:
+            errors.append((line_index, str(e)))
+            continue
+
+        rows.append((line_index, keys, values))
+
+    return rows, errors, len(lines)
+
+
+def _convert_csv_line(line, columns, all_fields):
+    """Helper Function to convert a CSV line into the keys and values of a record.
+
+    Args:
+        line (string): CSV line.
+        columns (list): List of (position, field) of the mapped columns.
+        all_fields (dict): Dictionary where key is field name and value is data_type
+
+    Returns:
+        tuple: (keys, values) of the non empty cells.
+    """
+    cells = next(csv.reader([line]))
+    keys = []
+    values = []
+    for position, field in columns:
+        value = cells[position] if position < len(cells) else ""
+        if value == "":
+            continue
+
+        if all_fields[field] == "INTEGER":
+            try:
+                value = int(value)
+            except ValueError:
+                raise TypeMismatchError("Invalid data type for:" + field + ":" + value)
+
+        keys.append(field)
+        values.append(value)
+
+    return tuple(keys), tuple(values)
+
+
+def _write_range(contacts_db, table_name, future, first_line, batch_size, rejected):
+    """Helper Function to insert the rows a worker parsed from a range.
+
+    Args:
+        contacts_db (ContactsDB): Database.
+        table_name (string): Table Name.
+        future (Future): Future of _parse_range.
+        first_line (int): Line number in the file of the first line of the range.
+        batch_size (int): Number of rows committed per transaction.
+        rejected (list): List where (line, reason) of skipped lines is appended.
+
+    Returns:
+        tuple: (inserted, first_line) where first_line is the line number in the
+            file of the first line of the next range.
+    """
+    rows, errors, line_count = future.result()
+    range_rejected = list(errors)
+    inserted = 0
+    for index in range(0, len(rows), batch_size):
+        inserted += contacts_db.insert_batch(
+            table_name, rows[index : index + batch_size], range_rejected
+        )
+
+    range_rejected.sort()
+    rejected.extend((first_line + line, reason) for line, reason in range_rejected)
+    return inserted, first_line + line_count
@@ -0,0 +1,108 @@
+"""Unit Test for the Contacts Database Parallel Import Pipeline
+
+Author: Shobhit Khinvasara
+"""
+import os
+import tempfile
+import unittest
+import contacts_import
+from contacts_db import ContactsDB
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsImport(unittest.TestCase):
+
+    """Unit Test Class for testing the parallel import pipeline.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+        temp_dir (TemporaryDirectory): Temporary directory holding the input files.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.contacts_db = ContactsDB(":memory:")
+        self.contacts_db.create_table("Import_Table", {"name": "text", "age": "integer"})
+
+    def write_file(self, name, lines, encoding="utf-8"):
+        """Helper Function to write the lines of an input file."""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding=encoding) as input_file:
+            input_file.write("\n".join(lines) + "\n")
+
+        return path
+
+    def test_1_parse_data_str(self):
+        """Unit Test to test parsing of the data convention."""
+        data = contacts_import.parse_data_str('name=>"Joy"|age=>26')
+        self.assertEqual(data, {"name": "Joy", "age": 26})
+        with self.assertRaises(ValueError):
+            contacts_import.parse_data_str("name=>Joy")
+
+    def test_2_import_csv_ranges(self):
+        """Unit Test to test a CSV import split into many ranges with rejected lines."""
+        lines = ["name,age,id"] + ['"N, {0}",{0},1'.format(i) for i in range(200)]
+        lines[51] = "Bad,old"
+        lines[151] = ""
+        path = self.write_file("contacts.csv", lines)
+        inserted, rejected = contacts_import.parallel_import(
+            self.contacts_db,
+            "Import_Table",
+            path,
+            workers=2,
+            chunk_size=256,
+            batch_size=16,
+            max_pending=1,
+        )
+        self.assertEqual(inserted, 198)
+        self.assertEqual([line for line, _ in rejected], [52])
+        result = self.contacts_db.find("Import_Table", [["age", "equals", 199]], ["name"])
+        self.assertEqual(result, [{"name": "N, 199"}])
+
+    def test_3_import_data(self):
+        """Unit Test to test an import of the data convention."""
+        path = self.write_file(
+            "contacts.txt",
+            ['name=>"Joy"|age=>26', "name=>Sam", 'id=>5|name=>"Ken"', 'name=>"Ann"'],
+        )
+        inserted, rejected = contacts_import.parallel_import(
+            self.contacts_db, "Import_Table", path, "data", workers=2, chunk_size=8
+        )
+        self.assertEqual(inserted, 2)
+        self.assertEqual([line for line, _ in rejected], [2, 3])
+
+    def test_4_byte_order_mark(self):
+        """Unit Test to test that both import paths skip the byte order mark."""
+        self.contacts_db.create_table("Bom_Table", {"name": "text", "age": "integer"})
+        path = self.write_file("bom.csv", ["name,age", "Jürgen,30"], "utf-8-sig")
+        inserted, rejected = contacts_import.parallel_import(
+            self.contacts_db, "Bom_Table", path, workers=2
+        )
+        self.assertEqual((inserted, rejected), (1, []))
+        inserted, rejected = self.contacts_db.import_csv("Bom_Table", path)
+        self.assertEqual((inserted, rejected), (1, []))
+        with open(path, newline="", encoding="utf-8") as csv_file:
+            self.contacts_db.import_csv("Bom_Table", csv_file)
+
+        path = self.write_file("bom.txt", ['name=>"Joy"|age=>26'], "utf-8-sig")
+        inserted, rejected = contacts_import.parallel_import(
+            self.contacts_db, "Bom_Table", path, "data", workers=2
+        )
+        self.assertEqual((inserted, rejected), (1, []))
+        result = self.contacts_db.find("Bom_Table", fields=["name"])
+        self.assertEqual(
+            [r["name"] for r in result], ["Jürgen", "Jürgen", "Jürgen", "Joy"]
+        )
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.contacts_db.close_conn()
+        self.temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
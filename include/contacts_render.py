@@ -0,0 +1,156 @@
+"""Streaming Record Renderer for the Contacts Application.
+
+Records are consumed one chunk at a time and written to the output in one call per
+chunk, so rendering a large table needs neither the whole table in memory nor a
+write call per record.
+
+Author: Shobhit Khinvasara
+"""
+import csv
+import json
+import sys
+import itertools
+from operator import itemgetter
+
+# Supported output formats.
+# "table": aligned columns sized from the first records, "jsonl": one JSON object
+# per line, "csv" and "tsv": header row, then one row per record.
+RENDER_FORMATS = ("table", "jsonl", "csv", "tsv")
+
+# Number of records the column widths of a table are sized from.
+SAMPLE_SIZE = 100
+
+# Maximum width of a table column. Longer values overflow their column.
+MAX_COLUMN_WIDTH = 40
+
+# Number of records written per write call.
+CHUNK_SIZE = 1000
+
+
+def render(records, output_format="table", out=None, sample_size=SAMPLE_SIZE):
+    """Write records in an output format.
+
+    Args:
+        records (iterable): Iterable of dicts with {field:value}. Consumed incrementally.
+            The fields of the first record are the columns, every record needs them.
+        output_format (str, optional): Output format, see RENDER_FORMATS.
+        out (file, optional): Text file the output is written to. Defaults to sys.stdout.
+        sample_size (int, optional): Number of records table columns are sized from.
+
+    Returns:
+        int: Number of records written.
+    """
+    if output_format not in RENDER_FORMATS:
+        raise ValueError("Unsupported output format: " + str(output_format))
+
+    out = out or sys.stdout
+    records = iter(records)
+    if output_format == "jsonl":
+        return _write_chunks(out, records, lambda record: json.dumps(record, default=str))
+
+    first = next(records, None)
+    if first is None:
+        return 0
+
+    fields = list(first.keys())
+    if output_format == "table":
+        sample = [first] + list(itertools.islice(records, sample_size - 1))
+        return _render_table(out, fields, sample, records)
+
+    values = _values_getter(fields)
+    writer = csv.writer(out, delimiter="," if output_format == "csv" else "\t")
+    writer.writerow(fields)
+    count = 0
+    for chunk in _chunks(itertools.chain([first], records)):
+        writer.writerows(map(values, chunk))
+        count += len(chunk)
+
+    return count
+
+
+def _render_table(out, fields, sample, records):
+    """Helper Function to write records as a table with columns sized from a sample.
+
+    Args:
+        out (file): Text file the output is written to.
+        fields (list): List of fields, the columns of the table.
+        sample (list): First records, written first.
+        records (iterator): Remaining records.
+
+    Returns:
+        int: Number of records written.
+    """
+    widths = []
+    aligns = []
+    for field in fields:
+        values = [record.get(field) for record in sample]
+        width = max([len(field)] + [len(str(value)) for value in values])
+        widths.append(min(width, MAX_COLUMN_WIDTH))
+        # numbers are right aligned, like in a spreadsheet.
+        aligns.append(">" if any(map(_is_number, values)) else "<")
+
+    cells = [
+        "{%d!s:%s%d}" % (index, align, width)
+        for index, (align, width) in enumerate(zip(aligns, widths))
+    ]
+    template = "| " + " | ".join(cells) + " |"
+    names = [field.ljust(width) for field, width in zip(fields, widths)]
+    header = "| " + " | ".join(names) + " |"
+    separator = "|" + "|".join("-" * (width + 2) for width in widths) + "|"
+    out.write(header + "\n" + separator + "\n")
+    values = _values_getter(fields)
+    return _write_chunks(
+        out,
+        itertools.chain(sample, records),
+        lambda record: template.format(*values(record)),
+    )
+
+
+def _write_chunks(out, records, format_record):
+    """Helper Function to format records and write them one chunk at a time.
+
+    Args:
+        out (file): Text file the output is written to.
+        records (iterator): Records.
+        format_record (function): Function formatting a record into a line.
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    for chunk in _chunks(records):
+        out.write("\n".join(map(format_record, chunk)) + "\n")
+        count += len(chunk)
+
+    return count
+
+
+def _chunks(records):
+    """Helper Function to split records into lists of CHUNK_SIZE records."""
+    while True:
+        chunk = list(itertools.islice(records, CHUNK_SIZE))
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def _values_getter(fields):
+    """Helper Function to get a function returning the values of a record as a tuple.
+
+    Args:
+        fields (list): List of fields.
+
+    Returns:
+        function: Function taking a record.
+    """
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda record: (record[field],)
+
+    return itemgetter(*fields)
+
+
+def _is_number(value):
+    """Helper Function to check if a value is an int or float, but not a bool."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
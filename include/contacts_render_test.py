@@ -0,0 +1,87 @@
+"""Unit Test for the Contacts Streaming Record Renderer
+
+Author: Shobhit Khinvasara
+"""
+import io
+import json
+import unittest
+import contacts_render
+from contacts_render import render
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsRender(unittest.TestCase):
+
+    """Unit Test Class for testing the renderer.
+
+    Attributes:
+        records (list): Records rendered by the tests.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.records = [
+            {"id": 1, "name": "Joy", "city": "Pune, MH"},
+            {"id": 12, "name": "Samantha", "city": None},
+        ]
+
+    def test_1_table(self):
+        """Unit Test to test the column widths and alignment of a table."""
+        out = io.StringIO()
+        self.assertEqual(render(iter(self.records), "table", out), 2)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "| id | name     | city     |",
+                "|----|----------|----------|",
+                "|  1 | Joy      | Pune, MH |",
+                "| 12 | Samantha | None     |",
+            ],
+        )
+
+        # values after the sample overflow their column instead of being cut.
+        out = io.StringIO()
+        render(self.records + [{"id": 3, "name": "A" * 10, "city": ""}], "table", out, 2)
+        self.assertEqual(out.getvalue().splitlines()[-1], "|  3 | AAAAAAAAAA |          |")
+
+    def test_2_delimited(self):
+        """Unit Test to test csv and tsv output written in several chunks."""
+        chunk_size = contacts_render.CHUNK_SIZE
+        contacts_render.CHUNK_SIZE = 1
+        try:
+            out = io.StringIO()
+            self.assertEqual(render(self.records, "csv", out), 2)
+        finally:
+            contacts_render.CHUNK_SIZE = chunk_size
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["id,name,city", '1,Joy,"Pune, MH"', "12,Samantha,"],
+        )
+
+        out = io.StringIO()
+        render(self.records, "tsv", out)
+        self.assertEqual(out.getvalue().splitlines()[1], "1\tJoy\tPune, MH")
+
+        out = io.StringIO()
+        render([{"name": "Joy"}], "csv", out)
+        self.assertEqual(out.getvalue().splitlines(), ["name", "Joy"])
+
+    def test_3_jsonl(self):
+        """Unit Test to test jsonl output, empty input and unsupported formats."""
+        out = io.StringIO()
+        render(self.records, "jsonl", out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.records)
+
+        out = io.StringIO()
+        self.assertEqual(render([], "table", out), 0)
+        self.assertEqual(out.getvalue(), "")
+        with self.assertRaises(ValueError):
+            render(self.records, "xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
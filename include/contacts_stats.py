@@ -0,0 +1,317 @@
+"""Instrumentation for the Contacts Application Database API.
+
+An instrumented ContactsDB times every public operation and the phases it spends
+its time in, and emits one event per operation to the sinks of its Instrumentation.
+Sinks are callables taking the event, like HistogramSink, JsonLinesSink or any
+function used as a callback.
+
+Example event:
+    {"op": "find", "table": "Contacts", "ok": True, "error": None, "ms": 0.412,
+     "phases": {"schema": 0.004, "compile": 0.021, "execute": 0.105, "materialize": 0.266},
+     "rows": 42, "statements": ["SELECT name FROM Contacts WHERE city = ?"],
+     "time": 1760000000.0}
+
+Author: Shobhit Khinvasara
+"""
+import json
+import time
+import threading
+from collections import deque
+
+# Phases of an operation.
+# "schema": table and field lookups, "compile": building SQL from filters,
+# "execute": running statements, "materialize": fetching rows and building records,
+# "commit": committing the transaction.
+PHASES = ("schema", "compile", "execute", "materialize", "commit")
+
+# Maximum number of distinct statements recorded per operation.
+MAX_STATEMENTS = 20
+
+
+def latency_summary(latencies):
+    """Get the percentiles of a list of latencies.
+
+    Args:
+        latencies (iterable): Latencies in milliseconds.
+
+    Returns:
+        dict: Dictionary with p50_ms, p95_ms, p99_ms and max_ms.
+    """
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(latencies[int(len(latencies) * 0.50)], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)], 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+class Instrumentation(object):
+    """Times the operations of ContactsDB objects and emits them to sinks.
+
+    One Instrumentation can be shared by several ContactsDB objects, also from
+    different threads, as long as its sinks are thread safe.
+
+    Example:
+        histogram = HistogramSink()
+        contacts_db.set_instrumentation(Instrumentation([histogram, print]))
+        contacts_db.find("Contacts", [["city", "is", "Pune"]])
+        histogram.stats()
+
+    Attributes:
+        sinks (list): Callables every event is passed to.
+    """
+
+    def __init__(self, sinks=None):
+        """Initializes the instrumentation.
+
+        Args:
+            sinks (list, optional): Callables every event is passed to.
+        """
+        self.sinks = list(sinks or [])
+
+    def add_sink(self, sink):
+        """Add a sink.
+
+        Args:
+            sink (function): Callable the events are passed to.
+        """
+        self.sinks.append(sink)
+
+    def wrap(self, contacts_db, name, phase):
+        """Build the instrumented version of a ContactsDB method.
+
+        Outside of an operation, public methods start one and helper methods run
+        as they are. Inside of an operation, methods with a phase are timed as that
+        phase and other methods run as part of the operation.
+
+        Args:
+            contacts_db (ContactsDB): Database.
+            name (string): Method name.
+            phase (str): Phase of the method, see PHASES. None if it has none.
+
+        Returns:
+            function: Instrumented method.
+        """
+        function = getattr(type(contacts_db), name).__get__(contacts_db)
+        public = not name.startswith("_")
+
+        def method(*args, **kwargs):
+            trace = contacts_db._trace
+            if trace is None:
+                if not public:
+                    return function(*args, **kwargs)
+
+                return self._run_operation(contacts_db, name, function, args, kwargs)
+
+            if phase is None:
+                return function(*args, **kwargs)
+
+            return trace.run_phase(phase, function, args, kwargs)
+
+        method.__name__ = name
+        method.__doc__ = function.__doc__
+        return method
+
+    def emit(self, event):
+        """Pass an event to all sinks.
+
+        A failing sink doesn't fail the operation, the error is reported instead.
+
+        Args:
+            event (dict): Event of an operation.
+        """
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print("Instrumentation Sink Failed:", repr(e))
+
+    def _run_operation(self, contacts_db, name, function, args, kwargs):
+        """Helper Function to run a public method as a timed operation.
+
+        Args:
+            contacts_db (ContactsDB): Database.
+            name (string): Method name.
+            function (function): Bound method.
+            args (tuple): Positional arguments.
+            kwargs (dict): Keyword arguments.
+
+        Returns:
+            object: Return value of the method.
+        """
+        trace = _Trace()
+        contacts_db._trace = trace
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            contacts_db._trace = None
+            table_name = args[0] if args and isinstance(args[0], str) else None
+            self.emit(trace.event(name, table_name, elapsed))
+
+
+class _Trace(object):
+    """Phase times, rows and statements of the running operation."""
+
+    def __init__(self):
+        self.phases = {}
+        self.rows = 0
+        self.statements = []
+        self.error = None
+        self._children = []
+
+    def run_phase(self, phase, function, args, kwargs):
+        """Run a method and add its time, without the time of nested phases, to a phase.
+
+        Execute phases get (cursor, sql_command, ..) and return the cursor,
+        materialize phases return the records.
+        """
+        if phase == "execute" and len(self.statements) < MAX_STATEMENTS:
+            if args[1] not in self.statements:
+                self.statements.append(args[1])
+
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.fail(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - self._children.pop()
+            self.phases[phase] = self.phases.get(phase, 0.0) + own
+            if self._children:
+                self._children[-1] += elapsed
+
+        if phase == "execute" and result.rowcount > 0:
+            self.rows += result.rowcount
+        elif phase == "materialize":
+            self.rows += len(result)
+
+        return result
+
+    def fail(self, error):
+        """Record the first error raised in the operation, also if it was handled."""
+        if self.error is None:
+            self.error = type(error).__name__ + ": " + str(error)
+
+    def event(self, name, table_name, elapsed):
+        """Build the event of the finished operation."""
+        return {
+            "op": name,
+            "table": table_name,
+            "ok": self.error is None,
+            "error": self.error,
+            "ms": round(elapsed * 1000, 3),
+            "phases": {
+                phase: round(self.phases[phase] * 1000, 3)
+                for phase in PHASES
+                if phase in self.phases
+            },
+            "rows": self.rows,
+            "statements": self.statements,
+            "time": time.time(),
+        }
+
+
+class HistogramSink(object):
+    """Sink keeping the latencies of the last events of every operation in memory.
+
+    Attributes:
+        window (int): Number of latencies kept per operation.
+    """
+
+    def __init__(self, window=1000):
+        """Initializes an empty histogram.
+
+        Args:
+            window (int, optional): Number of latencies kept per operation.
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._totals = {}
+
+    def __call__(self, event):
+        """Record an event."""
+        with self._lock:
+            op = event["op"]
+            if op not in self._latencies:
+                self._latencies[op] = deque(maxlen=self.window)
+                self._totals[op] = dict.fromkeys(("count", "failed", "rows") + PHASES, 0)
+
+            self._latencies[op].append(event["ms"])
+            totals = self._totals[op]
+            totals["count"] += 1
+            totals["failed"] += not event["ok"]
+            totals["rows"] += event["rows"]
+            for phase, elapsed_ms in event["phases"].items():
+                totals[phase] += elapsed_ms
+
+    def stats(self):
+        """Get the latency stats of every operation.
+
+        Returns:
+            dict: {op: {count, failed, rows, p50_ms, p95_ms, p99_ms, max_ms, <phase>_ms}}
+                The percentiles are of the last window events, <phase>_ms is the
+                average time of all events spent in the phase.
+        """
+        stats = {}
+        with self._lock:
+            for op, latencies in self._latencies.items():
+                totals = self._totals[op]
+                op_stats = {
+                    "count": totals["count"],
+                    "failed": totals["failed"],
+                    "rows": totals["rows"],
+                }
+                op_stats.update(latency_summary(latencies))
+                for phase in PHASES:
+                    op_stats[phase + "_ms"] = round(totals[phase] / totals["count"], 3)
+
+                stats[op] = op_stats
+
+        return stats
+
+    def clear(self):
+        """Drop all recorded events."""
+        with self._lock:
+            self._latencies.clear()
+            self._totals.clear()
+
+
+class JsonLinesSink(object):
+    """Sink writing every event as one line of JSON.
+
+    Attributes:
+        log_file (file): File the events are written to.
+    """
+
+    def __init__(self, log_file):
+        """Opens the log.
+
+        Args:
+            log_file (string or file): Path of a file the events are appended to,
+                or a text file object.
+        """
+        self._owned = isinstance(log_file, str)
+        self.log_file = open(log_file, "a") if self._owned else log_file
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """Write an event."""
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self.log_file.write(line)
+            self.log_file.flush()
+
+    def close(self):
+        """Closes the log if it was opened from a path."""
+        if self._owned:
+            self.log_file.close()
@@ -0,0 +1,109 @@
+"""Unit Test for the Contacts Database Instrumentation
+
+Author: Shobhit Khinvasara
+"""
+import io
+import json
+import unittest
+from contacts_db import ContactsDB, TableError
+from contacts_stats import HistogramSink, Instrumentation, JsonLinesSink
+
+unittest.TestLoader.sortTestMethodsUsing = None
+
+
+class TestContactsStats(unittest.TestCase):
+
+    """Unit Test Class for testing the instrumentation.
+
+    Attributes:
+        contacts_db (ContactsDB): Database Connection Object.
+        events (list): Events passed to the callback sink.
+        histogram (HistogramSink): Histogram sink.
+        log_file (StringIO): File of the JSON lines sink.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """Set Up Method which runs once at the start of test."""
+        self.events = []
+        self.histogram = HistogramSink()
+        self.log_file = io.StringIO()
+        self.contacts_db = ContactsDB(
+            ":memory:",
+            instrumentation=Instrumentation(
+                [self.histogram, JsonLinesSink(self.log_file), self.events.append]
+            ),
+        )
+        self.contacts_db.create_table("Stats_Table", {"name": "text", "age": "integer"})
+        self.contacts_db.add_many(
+            "Stats_Table", [{"name": "N" + str(i), "age": i} for i in range(20)]
+        )
+
+    def setUp(self):
+        """Set Up Method which runs before every test."""
+        del self.events[:]
+
+    def test_1_find_phases(self):
+        """Unit Test to test the phases, rows and statement of a find."""
+        result = self.contacts_db.find("Stats_Table", [["age", "less_than", 5]], ["name"])
+        self.assertEqual(len(result), 5)
+        self.assertEqual(len(self.events), 1)
+
+        event = self.events[0]
+        self.assertEqual((event["op"], event["table"]), ("find", "Stats_Table"))
+        self.assertTrue(event["ok"])
+        self.assertEqual(event["rows"], 5)
+        self.assertEqual(
+            set(event["phases"]), {"schema", "compile", "execute", "materialize"}
+        )
+        self.assertLessEqual(sum(event["phases"].values()), event["ms"] + 0.01)
+        self.assertEqual(len(event["statements"]), 1)
+        self.assertIn("SELECT name FROM Stats_Table", event["statements"][0])
+
+        logged = json.loads(self.log_file.getvalue().splitlines()[-1])
+        self.assertEqual(logged["op"], "find")
+
+    def test_2_nested_operations(self):
+        """Unit Test to test that methods called by an operation are part of it."""
+        self.assertEqual(self.contacts_db.count("Stats_Table"), 20)
+        self.contacts_db.update("Stats_Table", 1, {"age": 50})
+        self.assertEqual([event["op"] for event in self.events], ["count", "update"])
+        self.assertEqual(self.events[1]["rows"], 1)
+        self.assertIn("commit", self.events[1]["phases"])
+
+        stats = self.histogram.stats()
+        self.assertEqual(stats["count"]["count"], 1)
+        self.assertIn("p99_ms", stats["count"])
+        self.assertGreaterEqual(stats["add_many"]["rows"], 20)
+
+    def test_3_failures(self):
+        """Unit Test to test failed operations and disabling the instrumentation."""
+        db = ContactsDB(":memory:", instrumentation=Instrumentation([self.events.append]))
+        db.create_table("Stats_Table", {"name": "text"})
+        with db.transaction():
+            # nothing to set is an SQL syntax error.
+            self.assertFalse(db.update("Stats_Table", 1, {}))
+            with self.assertRaises(TableError):
+                db.add("Missing_Table", {"name": "A"})
+
+        failed = [event for event in self.events if not event["ok"]]
+        self.assertEqual([event["op"] for event in failed], ["update", "add"])
+        self.assertIn("OperationalError", failed[0]["error"])
+        self.assertEqual(failed[0]["statements"][-1], "UPDATE Stats_Table SET  WHERE id=1")
+        self.assertIn("TableError", failed[1]["error"])
+
+        db.set_instrumentation(None)
+        del self.events[:]
+        db.find("Stats_Table")
+        self.assertEqual(self.events, [])
+        self.assertNotIn("find", db.__dict__)
+        db.close_conn()
+
+    @classmethod
+    def tearDownClass(self):
+        """Tear Down Method which runs once at the end of the test."""
+        self.contacts_db.close_conn()
+
+
+if __name__ == "__main__":
+    unittest.main()